@@ -0,0 +1,74 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
+from uuid import UUID
+
+from sqlalchemy import bindparam, update
+
+from app.config import Config
+from app.core.model import APIKey
+from app.core.session import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+class APIKeyUsageTracker:
+    """
+    Aggregates API key ``last_used_at`` in memory and writes it out in bulk.
+
+    Authenticating a request only records a timestamp in a dict; every
+    ``flush_interval`` seconds one executemany UPDATE writes the latest use of
+    each key seen since the last flush. The value is therefore up to one
+    interval stale, and uses in the last interval before a crash are lost.
+    """
+
+    def __init__(self, flush_interval: float | None = None):
+        self.flush_interval = flush_interval or Config.API_KEY_LAST_USED_FLUSH_INTERVAL
+        self._pending: dict[str, datetime] = {}
+        self._task: asyncio.Task | None = None
+
+    def touch(self, api_key_id: str) -> None:
+        self._pending[api_key_id] = datetime.now(timezone.utc)
+
+    async def flush(self) -> None:
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+        # Core UPDATE on the table (not the ORM entity) so executemany runs in one
+        # round trip and keys deleted in the meantime are simply not matched
+        table = APIKey.__table__
+        statement = (
+            update(table)
+            .where(table.c.id == bindparam("key_id"))
+            .values(last_used_at=bindparam("used_at"))
+        )
+        try:
+            async with AsyncSessionLocal() as session:
+                await session.execute(
+                    statement,
+                    [{"key_id": UUID(key_id), "used_at": used_at} for key_id, used_at in pending.items()],
+                )
+                await session.commit()
+        except Exception as e:
+            # Keep the timestamps for the next round unless newer ones arrived
+            for key_id, used_at in pending.items():
+                self._pending.setdefault(key_id, used_at)
+            logger.warning(f"Flushing API key usage failed: {e!r}")
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+
+
+api_key_usage = APIKeyUsageTracker()
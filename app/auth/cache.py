@@ -0,0 +1,240 @@
+import asyncio
+import logging
+import time
+from uuid import UUID
+
+import orjson
+import redis.asyncio as aioredis
+from cachetools import TTLCache
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.config import Config
+from app.core.model import APIKey, User
+from app.core.redis import add_jti_blocklist, get_redis, token_in_blocklist
+
+logger = logging.getLogger(__name__)
+
+AUTH_EVENTS_CHANNEL = "auth:events"
+
+
+class RevokedTokenCache:
+    """
+    Local copy of the Redis token blocklist.
+
+    While the sync task is subscribed to the auth events channel, a JTI that is
+    not in the local set is known to be valid and no Redis call is made. Until
+    the first sync, or after the subscription dropped, lookups go to Redis.
+    A token revoked on another instance is seen here once its event arrives,
+    usually within milliseconds.
+    """
+
+    def __init__(self):
+        self._expiry: dict[str, float] = {}  # jti -> monotonic expiry
+        self.synced = False
+
+    def add(self, jti: str, ttl: float | None = None) -> None:
+        self._expiry[jti] = time.monotonic() + (ttl or Config.JTI_EXPIRY_SECOND)
+
+    def prune(self) -> None:
+        now = time.monotonic()
+        for jti in [jti for jti, expiry in self._expiry.items() if expiry <= now]:
+            del self._expiry[jti]
+
+    async def load(self, r: aioredis.Redis) -> None:
+        """Copy the current blocklist from Redis."""
+        async for key in r.scan_iter(match="blocklist:*", count=1000):
+            ttl = await r.ttl(key)
+            if ttl > 0:
+                self.add(key.removeprefix("blocklist:"), ttl)
+
+    async def contains(self, jti: str) -> bool:
+        expiry = self._expiry.get(jti)
+        if expiry is not None and expiry > time.monotonic():
+            return True
+        if self.synced:
+            return False
+        return await token_in_blocklist(jti)
+
+
+class UserCache:
+    """In-process TTL cache of users by id, invalidated through auth events."""
+
+    def __init__(self, maxsize: int | None = None, ttl: float | None = None):
+        self._users: TTLCache = TTLCache(
+            maxsize=maxsize or Config.AUTH_USER_CACHE_SIZE,
+            ttl=ttl or Config.AUTH_USER_CACHE_TTL,
+        )
+
+    async def get(self, user_id: str, session: AsyncSession) -> User | None:
+        user = self._users.get(user_id)
+        if user is None:
+            user = await session.get(User, UUID(user_id))
+            if user is not None:
+                # Detached copy, so the cached object never touches another session
+                user = User(**user.model_dump())  # hashed_password is excluded from dumps
+                self._users[user_id] = user
+        return user
+
+    def invalidate(self, user_id: str) -> None:
+        self._users.pop(user_id, None)
+
+
+class APIKeyCache:
+    """
+    API keys by hash: in-process TTL cache, then Redis, then the database.
+
+    Entries hold what authentication needs (key id, owner, role, active flag),
+    so they are evicted with their owner by ``invalidate_user``; Redis keeps the
+    hashes of each owner's cached keys in a set for that. Unknown hashes are
+    cached locally only, in a smaller cache of their own, so guessing keys can
+    neither fill Redis nor push valid keys out.
+    """
+
+    def __init__(self, maxsize: int | None = None, ttl: float | None = None):
+        self.ttl = ttl or Config.API_KEY_CACHE_TTL
+        self._keys: TTLCache = TTLCache(maxsize=maxsize or Config.API_KEY_CACHE_SIZE, ttl=self.ttl)
+        self._unknown: TTLCache = TTLCache(
+            maxsize=Config.API_KEY_NEGATIVE_CACHE_SIZE, ttl=Config.API_KEY_NEGATIVE_CACHE_TTL
+        )
+
+    @staticmethod
+    def redis_key(key_hash: str) -> str:
+        return f"apikey:{key_hash}"
+
+    @staticmethod
+    def user_redis_key(user_id: str) -> str:
+        return f"apikey_user:{user_id}"
+
+    async def get(self, key_hash: str, session: AsyncSession) -> dict | None:
+        entry = self._keys.get(key_hash)
+        if entry is None:
+            if key_hash in self._unknown:
+                return None
+            r = get_redis()
+            raw = await r.get(self.redis_key(key_hash))
+            if raw is not None:
+                entry = orjson.loads(raw)
+            else:
+                entry = await self._load(key_hash, session)
+                if not entry:
+                    self._unknown[key_hash] = True
+                    return None
+                user_key = self.user_redis_key(entry["user"]["user_id"])
+                async with r.pipeline(transaction=True) as pipe:
+                    pipe.set(self.redis_key(key_hash), orjson.dumps(entry), ex=int(self.ttl))
+                    pipe.sadd(user_key, key_hash)
+                    pipe.expire(user_key, int(self.ttl))
+                    await pipe.execute()
+            self._keys[key_hash] = entry
+        return entry
+
+    @staticmethod
+    async def _load(key_hash: str, session: AsyncSession) -> dict:
+        statement = (
+            select(APIKey, User)
+            .join(User, User.id == APIKey.user_id)
+            .where(APIKey.key_hash == key_hash)
+        )
+        row = (await session.exec(statement)).first()
+        if row is None:
+            return {}
+        api_key, user = row
+        return {
+            "id": str(api_key.id),
+            "is_active": api_key.is_active,
+            "user": {"email": user.email, "user_id": str(user.id), "role": user.role},
+        }
+
+    def invalidate(self, key_hash: str) -> None:
+        self._keys.pop(key_hash, None)
+        self._unknown.pop(key_hash, None)
+
+    def invalidate_user(self, user_id: str) -> None:
+        """Drop the local entries of every key owned by ``user_id``."""
+        owned = [key_hash for key_hash, entry in self._keys.items() if entry["user"]["user_id"] == user_id]
+        for key_hash in owned:
+            self._keys.pop(key_hash, None)
+
+
+revoked_tokens = RevokedTokenCache()
+user_cache = UserCache()
+api_key_cache = APIKeyCache()
+
+
+async def publish(event: dict) -> None:
+    await get_redis().publish(AUTH_EVENTS_CHANNEL, orjson.dumps(event))
+
+
+async def revoke_token(jti: str) -> None:
+    """Blocklist a token in Redis and tell every instance about it."""
+    await add_jti_blocklist(jti)
+    revoked_tokens.add(jti)
+    await publish({"type": "revoked", "jti": jti, "ttl": Config.JTI_EXPIRY_SECOND})
+
+
+async def is_token_revoked(jti: str) -> bool:
+    return await revoked_tokens.contains(jti)
+
+
+async def invalidate_user(user_id: UUID | str) -> None:
+    """
+    Drop a user, and the cached API keys that carry their role, from every
+    instance's cache, e.g. after a role or password change.
+    """
+    user_id = str(user_id)
+    user_cache.invalidate(user_id)
+    api_key_cache.invalidate_user(user_id)
+    r = get_redis()
+    user_key = APIKeyCache.user_redis_key(user_id)
+    key_hashes = await r.smembers(user_key)
+    await r.delete(user_key, *[APIKeyCache.redis_key(key_hash) for key_hash in key_hashes])
+    await publish({"type": "user", "user_id": user_id})
+
+
+async def invalidate_api_key(key_hash: str) -> None:
+    """Forget a key everywhere after it was deactivated, renamed or deleted."""
+    api_key_cache.invalidate(key_hash)
+    await get_redis().delete(APIKeyCache.redis_key(key_hash))
+    await publish({"type": "api_key", "key_hash": key_hash})
+
+
+def handle_event(event: dict) -> None:
+    if event.get("type") == "revoked":
+        revoked_tokens.add(event["jti"], event.get("ttl"))
+    elif event.get("type") == "user":
+        user_cache.invalidate(event["user_id"])
+        api_key_cache.invalidate_user(event["user_id"])
+    elif event.get("type") == "api_key":
+        api_key_cache.invalidate(event["key_hash"])
+
+
+async def sync_auth_cache(retry_delay: float = 1.0) -> None:
+    """
+    Keep the local caches in sync with other instances. Runs for the lifetime of
+    the app; on a lost subscription it falls back to Redis lookups and resyncs.
+    """
+    while True:
+        pubsub = get_redis().pubsub()
+        try:
+            await pubsub.subscribe(AUTH_EVENTS_CHANNEL)
+            # Subscribe first, then load, so no revocation falls in between
+            await revoked_tokens.load(get_redis())
+            revoked_tokens.synced = True
+            logger.info("Auth cache synced")
+            last_prune = time.monotonic()
+            while True:
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if message is not None:
+                    handle_event(orjson.loads(message["data"]))
+                if time.monotonic() - last_prune > 60:
+                    revoked_tokens.prune()
+                    last_prune = time.monotonic()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Auth cache sync lost, falling back to Redis: {e!r}")
+            await asyncio.sleep(retry_delay)
+        finally:
+            revoked_tokens.synced = False
+            await pubsub.aclose()
@@ -1,18 +1,20 @@
 import jwt
 from fastapi.security import OAuth2PasswordBearer
 from typing import Annotated, Any
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, Security, status
 from passlib.exc import InvalidTokenError
 
 from app.core.dependency import SessionDep
 from app.config import Config
-from app.core.redis import token_in_blocklist
-from app.auth.services import UserService
+from app.auth.cache import api_key_cache, is_token_revoked, user_cache
+from app.auth.api_key_usage import api_key_usage
 from app.core.model import User
+from app.core.rate_limit import rate_limiter
+from app.utility.security import api_key_header, hash_api_key
 
 
-user_service = UserService()
 oauth_scheme = OAuth2PasswordBearer(tokenUrl="login")
+optional_oauth_scheme = OAuth2PasswordBearer(tokenUrl="login", auto_error=False)
 
 
 class TokenBearer:
@@ -22,16 +24,25 @@ class TokenBearer:
         headers={"WWW-Authenticate": "Bearer"},
     )
 
-    async def __call__(self, token: Annotated[str, Depends(oauth_scheme)]):
+    async def __call__(self, request: Request, token: Annotated[str, Depends(oauth_scheme)]):
+        # Routes often depend on the bearer twice (directly and through
+        # get_current_user); decode and check the token once per request.
+        cached = getattr(request.state, "token", None)
+        if cached is not None and cached[0] == token:
+            payload = cached[1]
+            self.verify_token_data(payload)
+            return payload
+
         try:
             payload = jwt.decode(
                 token, Config.SECRET_KEY, algorithms=[Config.ALGORITHM]
             )
             jti = payload.get("jti")
 
-            if jti is None or await token_in_blocklist(jti):
+            if jti is None or await is_token_revoked(jti):
                 raise self.credentials_exception
 
+            request.state.token = (token, payload)
             self.verify_token_data(payload)
             return payload
 
@@ -64,12 +75,80 @@ class RefreshTokenBearer(TokenBearer):
             )
 
 
+class PrincipalBearer:
+    """
+    Authenticate either a user (Bearer JWT) or a machine client (X-API-Key).
+
+    Returns a token-shaped payload, ``{"user": {...}, "api_key_id": ...}``, so
+    routes written for AccessTokenBearer work with both. API keys are resolved
+    through the key cache, and their last use is recorded in memory and
+    flushed in bulk.
+    """
+
+    credentials_exception = TokenBearer.credentials_exception
+
+    async def __call__(
+        self,
+        request: Request,
+        session: SessionDep,
+        token: Annotated[str | None, Depends(optional_oauth_scheme)],
+        api_key: Annotated[str | None, Security(api_key_header)],
+    ) -> dict:
+        if api_key:
+            entry = await api_key_cache.get(hash_api_key(api_key), session)
+            if entry is None or not entry["is_active"]:
+                raise self.credentials_exception
+            api_key_usage.touch(entry["id"])
+            return {"user": entry["user"], "api_key_id": entry["id"]}
+        if token:
+            payload = await AccessTokenBearer()(request, token)
+            return {**payload, "api_key_id": None}
+        raise self.credentials_exception
+
+
+def principal_key(principal: dict) -> str:
+    """Identity of a PrincipalBearer caller: each API key counts on its own."""
+    if principal.get("api_key_id"):
+        return f"api_key:{principal['api_key_id']}"
+    return f"user:{principal['user']['user_id']}"
+
+
+async def principal_user(principal: dict, session: SessionDep) -> User:
+    """The user behind a PrincipalBearer caller, API keys included."""
+    user = await user_cache.get(principal["user"]["user_id"], session)
+    if user is None:
+        raise PrincipalBearer.credentials_exception
+    return user
+
+
+class RateLimit:
+    """
+    Authenticate like PrincipalBearer, then take a token from the caller's
+    bucket for ``name``. Returns the principal, so it replaces PrincipalBearer
+    on the route.
+
+    With ``output_tokens`` the caller's LLM output-token budget must not be
+    exhausted either; it is debited after the reply has been generated.
+    """
+
+    def __init__(self, name: str, output_tokens: bool = False):
+        self.name = name
+        self.output_tokens = output_tokens
+
+    async def __call__(self, principal: Annotated[dict, Depends(PrincipalBearer())]) -> dict:
+        caller = principal_key(principal)
+        if self.output_tokens:
+            # Check the budget before taking a request token, so a caller in
+            # debt does not also burn through its request limit
+            await rate_limiter.ensure_available("llm_output_tokens", caller)
+        await rate_limiter.hit(self.name, caller)
+        return principal
+
+
 async def get_current_user(
     token_details: Annotated[dict, Depends(AccessTokenBearer())], session: SessionDep
 ):
-    user_email = token_details["user"]["email"]
-    user = await user_service.get_user_by_field("email", user_email, session)
-    return user
+    return await user_cache.get(token_details["user"]["user_id"], session)
 
 
 class RoleChecker:
@@ -17,7 +17,7 @@ from app.core.dependency import SessionDep
 from app.auth.services import UserService
 from app.auth.dependency import get_current_user, RefreshTokenBearer, AccessTokenBearer
 from app.utility.security import create_access_token
-from app.core.redis import add_jti_blocklist
+from app.auth.cache import revoke_token
 
 
 user_service = UserService()
@@ -62,9 +62,9 @@ async def get_new_access_token(
 
 
 @oauth_router.get("/logout")
-async def revoke_token(token_detail: Annotated[dict, Depends(AccessTokenBearer())]):
+async def logout(token_detail: Annotated[dict, Depends(AccessTokenBearer())]):
     jti = token_detail["jti"]
-    await add_jti_blocklist(jti)
+    await revoke_token(jti)
     return JSONResponse(
         status_code=status.HTTP_200_OK, content={"message": "Logged out successfully"}
     )
@@ -99,13 +99,9 @@ class APIKeyUpdate(BaseModel):
     is_active: bool | None = None
 
 
-class APIKeyLastUserUpdate(BaseModel):
-    last_user_at: datetime
-
-
 class APIKeyResponse(APIKeyBase):
     id: UUID
-    key: str
+    prefix: str
     user_id: UUID
     last_used_at: datetime | None = None
     created_at: datetime
@@ -113,3 +109,7 @@ class APIKeyResponse(APIKeyBase):
 
     class Config:
         from_attributes = True
+
+
+class APIKeyCreatedResponse(APIKeyResponse):
+    key: str  # only returned once, at creation
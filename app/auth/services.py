@@ -6,8 +6,6 @@ from fastapi.responses import JSONResponse
 from datetime import timedelta
 from uuid import UUID
 from fastapi_pagination.ext.sqlmodel import apaginate
-import secrets
-from datetime import datetime
 from fastapi_pagination import Page
 
 from app.auth.schema import (
@@ -18,8 +16,8 @@ from app.auth.schema import (
     PasswordResetConfirm,
     UserModel,
     APIKeyResponse,
+    APIKeyCreatedResponse,
     APIKeyUpdate,
-    APIKeyLastUserUpdate
 )
 from app.config import Config
 from app.core.model import User, APIKey
@@ -31,12 +29,15 @@ from app.error import (
 )
 from app.utility.security import (
     encode_url_safe_token,
-    get_hashed_password,
+    hash_password,
     decode_url_safe_token,
-    verify_password,
+    verify_and_update_password,
     create_access_token,
+    generate_api_key,
+    hash_api_key,
 )
 from app.celery_task import send_email
+from app.auth.cache import invalidate_api_key, invalidate_user
 
 templates = Jinja2Templates(
     directory="app/auth/html_template_mail"
@@ -56,7 +57,7 @@ class UserService:
     async def create_user(self, user_data: CreateUserModel, session: AsyncSession):
         user_data_dict = user_data.model_dump(exclude={"password"})
         new_user = User(**user_data_dict)
-        new_user.hashed_password = get_hashed_password(user_data.password)
+        new_user.hashed_password = await hash_password(user_data.password)
         new_user.role = "user"
         session.add(new_user)
         await session.commit()
@@ -66,6 +67,7 @@ class UserService:
         for key, value in user_data.items():
             setattr(user, key, value)
         await session.commit()
+        await invalidate_user(user.id)
         return user
 
     async def signup_user(self, user_data: CreateUserModel, session: AsyncSession):
@@ -121,8 +123,14 @@ class UserService:
         user = await self.get_user_by_field("email", email, session)
 
         if user is not None:
-            password_valid = verify_password(password, user.hashed_password)
+            password_valid, new_hash = await verify_and_update_password(
+                password, user.hashed_password
+            )
             if password_valid:
+                if new_hash is not None:
+                    # Stored hash uses an old scheme or cost, upgrade it transparently
+                    await self.update_user(user, {"hashed_password": new_hash}, session)
+
                 access_token = create_access_token(
                     user_data={
                         "email": user.email,
@@ -184,7 +192,7 @@ class UserService:
             user = await self.get_user_by_field("email", user_email, session)
             if not user:
                 raise UseNotFound()
-            hashed_password = get_hashed_password(new_password)
+            hashed_password = await hash_password(new_password)
             await self.update_user(user, {"hashed_password": hashed_password}, session)
 
             return JSONResponse(
@@ -202,16 +210,19 @@ class APIKeyServices:
         statement = select(APIKey).where(APIKey.user_id == user_id.id)
         return await apaginate(session, statement)
 
-    async def create_api_key(self, user_id: UserModel, name: str, session: AsyncSession) -> APIKeyResponse:
+    async def create_api_key(self, user_id: UserModel, name: str, session: AsyncSession) -> APIKeyCreatedResponse:
+        key = generate_api_key()
         api_key = APIKey(
-            key = f"sk-{secrets.token_hex(32)}",
+            key_hash=hash_api_key(key),
+            prefix=key[:11],
             name=name,
             user_id=user_id.id,
             is_active = True,
         )
         session.add(api_key)
         await session.commit()
-        return api_key
+        # The plaintext key is only ever returned here
+        return APIKeyCreatedResponse.model_validate({**api_key.model_dump(), "key": key})
 
     async def get_api_key(self, api_key_id: str, session: AsyncSession) -> APIKeyResponse:
         statement = select(APIKey).where(APIKey.id == UUID(api_key_id))
@@ -222,7 +233,7 @@ class APIKeyServices:
         return api_key
 
     async def get_api_key_by_key(self, api_key: str, session: AsyncSession) -> APIKeyResponse:
-        statement = select(APIKey).where(APIKey.key == api_key)
+        statement = select(APIKey).where(APIKey.key_hash == hash_api_key(api_key))
         result = await session.exec(statement)
         api_key = result.first()
         if api_key is None:
@@ -234,19 +245,12 @@ class APIKeyServices:
         for key, value in update_data.model_dump(exclude_unset=True).items():
             setattr(api_key_self, key, value)
         await session.commit()
+        await invalidate_api_key(api_key_self.key_hash)
         return APIKeyResponse.model_validate(api_key_self)
 
     async def delete_api_key(self, api_key_id: str, session: AsyncSession):
         api_key_self = await self.get_api_key(api_key_id, session)
         await session.delete(api_key_self)
         await session.commit()
+        await invalidate_api_key(api_key_self.key_hash)
         return JSONResponse(status_code=204, content={"message": "Api key is deleted successfully"})
-
-    async def update_last_user(self, api_key: str, session: AsyncSession) -> APIKeyResponse:
-        api_key_self = await self.get_api_key_by_key(api_key, session)
-        time_now =  datetime.now(datetime.UTC)
-        data_update = APIKeyLastUserUpdate(last_user_at=time_now)
-        for key, value in data_update.model_dump(exclude_unset=True).items():
-            setattr(api_key_self, key, value)
-        await session.commit()
-        return api_key_self
@@ -1,5 +1,5 @@
 from fastapi import APIRouter, status, Depends
-from fastapi_pagination import Page
+from app.core.pagination import KeysetPage
 from typing import Annotated
 
 from app.auth.schema import UserModel
@@ -13,7 +13,7 @@ chat_services = ChatService()
 chat_router = APIRouter()
 
 
-@chat_router.get("/", response_model=Page[ChatResponse], dependencies=[Depends(AccessTokenBearer())])
+@chat_router.get("/", response_model=KeysetPage[ChatResponse], dependencies=[Depends(AccessTokenBearer())])
 async def get_all_chat(session: SessionDep):
     categories = await chat_services.get_all_chat(session)
     return categories
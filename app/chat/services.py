@@ -2,12 +2,11 @@ from fastapi import HTTPException
 from fastapi.responses import JSONResponse
 from sqlmodel.ext.asyncio.session import AsyncSession
 from app.core.model import Chat
-from sqlmodel import select, desc
-from fastapi_pagination.ext.sqlmodel import apaginate
+from sqlmodel import select
+from app.core.pagination import keyset_paginate
 from uuid import UUID
 from app.auth.schema import UserModel
 from app.utility.chat_history import SimpleRedisHistory
-from app.config import Config
 import logging
 
 logger = logging.getLogger(__name__)
@@ -22,8 +21,7 @@ class ChatService:
         return new_chat
 
     async def get_all_chat(self, session: AsyncSession):
-        statement = select(Chat).order_by(desc(Chat.created_at))
-        return await apaginate(session, statement)
+        return await keyset_paginate(session, select(Chat), Chat)
 
     async def get_chat_id(self, chat_id: str, session: AsyncSession):
         chat_uuid = UUID(chat_id)
@@ -34,9 +32,7 @@ class ChatService:
 
     async def delete_chat(self, chat_id: str, session: AsyncSession):
         # Step 1 delete history in cache
-        history_service = SimpleRedisHistory(
-            session_id=chat_id, redis_url=Config.REDIS_URL, ttl=3600
-        )
+        history_service = SimpleRedisHistory(session_id=chat_id)
         await history_service.clear()
 
         # Step 2 delete in database
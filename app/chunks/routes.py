@@ -1,5 +1,5 @@
 from fastapi import APIRouter, status, Depends
-from fastapi_pagination import Page
+from app.core.pagination import KeysetPage
 from app.chunks.schema import ChunkResponse
 from app.chunks.services import ChunkService
 from app.core.dependency import SessionDep
@@ -17,13 +17,13 @@ async def create_chunks(document_id: str, user: Annotated[UserModel, Depends(get
     return new_chunks
 
 
-@chunks_router.get("/", response_model=Page[ChunkResponse], dependencies=[Depends(AccessTokenBearer())])
+@chunks_router.get("/", response_model=KeysetPage[ChunkResponse], dependencies=[Depends(AccessTokenBearer())])
 async def get_all_chunks(session: SessionDep):
     chunks = await chunk_services.get_all_chunks(session)
     return chunks
 
 
-@chunks_router.get("/{document_id}", response_model=Page[ChunkResponse], dependencies=[Depends(AccessTokenBearer())])
+@chunks_router.get("/{document_id}", response_model=KeysetPage[ChunkResponse], dependencies=[Depends(AccessTokenBearer())])
 async def get_chunks_from_document_id(document_id: str, session: SessionDep):
     chunks = await chunk_services.get_chunk_from_doc_id(document_id, session)
     return chunks
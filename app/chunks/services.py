@@ -4,9 +4,8 @@ from pathlib import Path
 from app.utility.doc_processor import DocProcessor
 from app.chunks.schema import CreateChunk, ChunkResponse
 from app.document.schema import UpdateDocumentDB
-from sqlmodel import insert, select, desc
-from fastapi_pagination import Page
-from fastapi_pagination.ext.sqlmodel import apaginate
+from sqlmodel import insert, select
+from app.core.pagination import KeysetPage, keyset_paginate
 from app.core.model import Chunk
 from fastapi.responses import JSONResponse
 import logging
@@ -58,11 +57,10 @@ class ChunkService:
             if temp_path and Path(temp_path).exists():
                 Path(temp_path).unlink()
 
-    async def get_all_chunks(self, session: AsyncSession) -> Page[ChunkResponse]:
-            statement = select(Chunk).order_by(desc(Chunk.created_at))
-            return await apaginate(session, statement)
+    async def get_all_chunks(self, session: AsyncSession) -> KeysetPage[ChunkResponse]:
+        return await keyset_paginate(session, select(Chunk), Chunk)
 
-    async def get_chunk_from_doc_id(self, document_id: str, session: AsyncSession) -> Page[ChunkResponse]:
+    async def get_chunk_from_doc_id(self, document_id: str, session: AsyncSession) -> KeysetPage[ChunkResponse]:
         statement = select(Chunk).where(Chunk.document_id == document_id)
-        return await apaginate(session, statement)
+        return await keyset_paginate(session, statement, Chunk, descending=False)
 
@@ -1,18 +1,64 @@
+from pydantic import BaseModel, Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pathlib import Path
+from typing import Literal
 
 
 BASE_DIR = Path(__file__).resolve().parent
 ENV_PATH = BASE_DIR.parent / ".env"
 
+class LLMProviderSettings(BaseModel):
+    type: Literal["ollama", "openai"] = "ollama"
+    base_url: str  # for "openai" include the version prefix, e.g. https://api.openai.com/v1
+    model: str
+    api_key: str | None = None
+    timeout: float = 120.0
+    connect_timeout: float = 5.0
+    max_retries: int = 2
+    retry_backoff: float = 0.5
+    temperature: float = 0.01
+    max_tokens: int = 1024
+    max_concurrency: int | None = None
+
+
+class RateLimitSettings(BaseModel):
+    capacity: int = Field(gt=0)  # burst size
+    # Must refill: the bucket expires once it would be full again
+    refill_per_second: float = Field(gt=0)
+
+
 class Settings(BaseSettings):
     DATABASE_URL_ASYNCPG_DRIVER: str
     DATABASE_URL_PSYCOPG_DRIVER: str
     PSYCOPG_CONNECT: str
+    # Connection pool shared by the ORM and raw vector queries
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_CACHE_SIZE: int = 100
     MINIO_URL: str
     MINIO_ACCESS_KEY: str
     MINIO_SECRET_KEY: str
     BUCKET_NAME: str
+    MINIO_SECURE: bool = False
+    # Presigned URLs are signed for the host clients use, which may differ from
+    # MINIO_URL (the address inside the compose network)
+    MINIO_PUBLIC_URL: str | None = None
+    MINIO_PUBLIC_SECURE: bool | None = None  # defaults to MINIO_SECURE
+    MINIO_REGION: str = "us-east-1"
+    PRESIGNED_UPLOAD_EXPIRY: int = 900
+    PRESIGNED_DOWNLOAD_EXPIRY: int = 300
+    UPLOAD_MAX_SIZE: int = 100 * 1024 * 1024
+    UPLOAD_SWEEP_INTERVAL: int = 3600  # seconds between removals of never-finalized uploads
+    # Blocking MinIO calls run on MINIO_IO_WORKERS threads; multipart uploads
+    # use several connections each, hence the larger connection pool
+    MINIO_IO_WORKERS: int = 8
+    MINIO_MAX_CONNECTIONS: int = 16
+    MINIO_CONNECT_TIMEOUT: float = 5.0
+    MINIO_READ_TIMEOUT: float = 60.0
+    MINIO_REMOVE_BATCH_SIZE: int = 1000  # keys per multi-object delete request (S3 maximum)
 
     SECRET_KEY: str
     SALT: str
@@ -20,9 +66,47 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int
     JTI_EXPIRY_SECOND: int
     REFRESH_TOKEN_EXPIRE_DAYS: int
+    # Password hashing: new hashes use this scheme and cost; older hashes are
+    # upgraded on the next successful login
+    PASSWORD_HASH_SCHEME: str = "sha512_crypt"
+    PASSWORD_HASH_ROUNDS: int | None = None  # scheme default when unset
+    PASSWORD_LEGACY_SCHEMES: list[str] = ["sha512_crypt"]
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 64
+    AUTH_USER_CACHE_SIZE: int = 10_000
+    AUTH_USER_CACHE_TTL: float = 60.0
+    API_KEY_CACHE_SIZE: int = 10_000
+    API_KEY_CACHE_TTL: float = 300.0
+    # Unknown key hashes, kept apart so guessed keys cannot evict valid ones
+    API_KEY_NEGATIVE_CACHE_SIZE: int = 1_000
+    API_KEY_NEGATIVE_CACHE_TTL: float = 30.0
+    API_KEY_LAST_USED_FLUSH_INTERVAL: float = 30.0
 
 
     REDIS_URL: str
+    REDIS_MAX_CONNECTIONS: int = 50
+    REDIS_HEALTH_CHECK_INTERVAL: int = 30
+    CHAT_HISTORY_TTL: int = 3600
+    CHAT_HISTORY_MAX_LENGTH: int = 50
+    CHAT_HISTORY_REHYDRATE_LIMIT: int = 20  # messages reloaded from Postgres after the list expired
+
+    # Chat message persistence: "sync" commits each message, "write_behind"
+    # queues it in a Redis Stream that is flushed to Postgres in batches
+    MESSAGE_WRITE_MODE: Literal["sync", "write_behind"] = "sync"
+    MESSAGE_STREAM: str = "messages:write"
+    MESSAGE_DEAD_LETTER_STREAM: str = "messages:dead"  # entries that can never be inserted
+    MESSAGE_STREAM_GROUP: str = "message-writer"
+    MESSAGE_FLUSH_BATCH_SIZE: int = 200
+    MESSAGE_FLUSH_INTERVAL: float = 0.2
+    MESSAGE_CLAIM_IDLE: float = 60.0
+
+    # Knowledge base deletion: a KB with more chunks than KB_DELETE_INLINE_MAX_CHUNKS
+    # is deleted by a background job, KB_DELETE_BATCH_SIZE documents per transaction
+    KB_DELETE_INLINE_MAX_CHUNKS: int = 10_000
+    KB_DELETE_BATCH_SIZE: int = 20
+    KB_DELETE_LOCK_TTL: int = 300
+    KB_DELETE_STATUS_TTL: int = 86_400
+
     MAIL_USERNAME: str
     MAIL_PASSWORD: str
     MAIL_FROM: str
@@ -32,8 +116,85 @@ class Settings(BaseSettings):
     BACKEND_URL: str
 
     EMBEDDING_MODEL: str
+    # "local": every API process loads the embedding model; "worker": API
+    # processes send texts to the embedding workers (python -m app.embedding.worker)
+    EMBEDDING_MODE: Literal["local", "worker"] = "local"
+    EMBEDDING_THREADS: int = 1
+    EMBEDDING_WORKER_SOCKETS: list[str] = ["/run/embedding/embedding.sock"]
+    EMBEDDING_WORKER_CONNECTIONS: int = 4  # per API process
+    EMBEDDING_WORKER_TIMEOUT: float = 30.0
+    # Concurrent encode calls are merged into one forward pass of up to
+    # EMBEDDING_BATCH_MAX_SIZE texts, waiting at most EMBEDDING_BATCH_MAX_WAIT
+    # seconds for the batch to fill
+    EMBEDDING_BATCHING: bool = True
+    EMBEDDING_BATCH_MAX_SIZE: int = 32
+    EMBEDDING_BATCH_MAX_WAIT: float = 0.005
     LLM_MODEL:str
     OLLAMA_HOST:str
+    LLM_KEEP_ALIVE: str = "30m"
+    LLM_WARMUP_TIMEOUT: float = 300.0
+    # Load and run the embedding model and tokenizers at startup, in the
+    # background; readiness waits for it
+    MODEL_WARMUP: bool = True
+
+    # Extra LLM providers by name, e.g. {"openai": {"type": "openai", "base_url": ..., "model": ...}}.
+    # "ollama" is always defined from OLLAMA_HOST/LLM_MODEL unless overridden here.
+    LLM_PROVIDERS: dict[str, LLMProviderSettings] = {}
+    LLM_DEFAULT_PROVIDER: str = "ollama"
+
+    # Logging: records go through a queue to a writer thread, as JSON lines
+    LOG_LEVEL: str = "INFO"  # app.* loggers
+    LOG_LEVEL_LIBRARIES: str = "WARNING"  # everything else
+    LOG_JSON: bool = True
+    # Access log: one record per request, sampled per route template, e.g.
+    # {"/metrics": 0.0, "/v1/health/live": 0.01}. Server errors and requests
+    # slower than ACCESS_LOG_SLOW_SECONDS are always logged. Disabling it keeps
+    # the request ids.
+    ACCESS_LOG_ENABLED: bool = True
+    ACCESS_LOG_SAMPLE_RATE: float = 1.0
+    ACCESS_LOG_SAMPLE_RATES: dict[str, float] = {}
+    ACCESS_LOG_SLOW_SECONDS: float = 1.0
+
+    # Shared outbound HTTP client
+    HTTP2: bool = True
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_KEEPALIVE_EXPIRY: float = 30.0
+
+    # LLM admission control
+    LLM_MAX_CONCURRENCY: int = 2
+    LLM_MODEL_CONCURRENCY: dict[str, int] = {}
+    LLM_MAX_QUEUE: int = 32
+    LLM_MAX_QUEUED_PER_TENANT: int = 4
+    LLM_ADMISSION_GRACE_SECONDS: float = 10.0
+    LLM_RETRY_AFTER_SECONDS: int = 5
+
+    # Token-bucket rate limits per caller (user or API key), by limit name.
+    # "llm_output_tokens" is debited with the generated tokens after each reply.
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMITS: dict[str, RateLimitSettings] = {
+        "chat": RateLimitSettings(capacity=10, refill_per_second=0.2),
+        "summary": RateLimitSettings(capacity=3, refill_per_second=0.01),
+        "search": RateLimitSettings(capacity=30, refill_per_second=1.0),
+        "llm_output_tokens": RateLimitSettings(capacity=20_000, refill_per_second=20.0),
+    }
+    # Per caller overrides, e.g. {"api_key:<id>": {"search": {"capacity": 100, "refill_per_second": 10}}}
+    RATE_LIMIT_OVERRIDES: dict[str, dict[str, RateLimitSettings]] = {}
+
+    # Prompt assembly
+    PROMPT_TOKENIZER: str | None = None  # defaults to EMBEDDING_MODEL
+    PROMPT_MAX_TOKENS: int = 3072
+    PROMPT_HISTORY_MAX_TOKENS: int = 1024
+    PROMPT_HISTORY_MAX_MESSAGES: int = 10
+
+    # Chat memory: "window" sends the last messages as they are, "summary" also
+    # keeps a rolling LLM summary of everything older than CHAT_SUMMARY_WINDOW
+    CHAT_MEMORY_MODE: Literal["window", "summary"] = "window"
+    CHAT_SUMMARY_WINDOW: int = 6
+    CHAT_SUMMARY_MAX_TOKENS: int = 256
+    # Lock held by a summary update for one summarization call, queueing in the
+    # LLM gateway included; keep it above the provider timeout (120s by default)
+    CHAT_SUMMARY_LOCK_TIMEOUT: float = 180.0
 
     DOMAIN_NAME: str
     VERSION: str
@@ -0,0 +1,49 @@
+import logging
+
+import httpx
+
+from app.config import Config
+from app.core.log import request_id_var
+
+logger = logging.getLogger(__name__)
+
+_client: httpx.AsyncClient | None = None
+
+
+async def propagate_request_id(request: httpx.Request) -> None:
+    """Send the id of the request being handled along, to correlate provider logs."""
+    request_id = request_id_var.get()
+    if request_id is not None:
+        request.headers["X-Request-ID"] = request_id
+
+
+def init_http_client() -> httpx.AsyncClient:
+    """Create the shared outbound HTTP client. Called from the app lifespan."""
+    global _client
+    if _client is None:
+        logger.info("Create shared HTTP client.")
+        _client = httpx.AsyncClient(
+            http2=Config.HTTP2,
+            limits=httpx.Limits(
+                max_connections=Config.HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=Config.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=Config.HTTP_KEEPALIVE_EXPIRY,
+            ),
+            event_hooks={"request": [propagate_request_id]},
+        )
+    return _client
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Shared pooled client (keep-alive, HTTP/2 where the server offers it).
+    Callers pass their own timeouts per request.
+    """
+    return _client or init_http_client()
+
+
+async def close_http_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
@@ -0,0 +1,97 @@
+import copy
+import logging
+import queue
+import sys
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+import orjson
+
+from app.config import Config
+
+# Id of the request being handled, set by the access log middleware and
+# added to every log record and outbound LLM request made while handling it
+request_id_var: ContextVar[str | None] = ContextVar("request_id", default=None)
+
+
+class RequestIdFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line; access records carry their fields under "http"."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            entry["request_id"] = request_id
+        http = getattr(record, "http", None)
+        if http:
+            entry["http"] = http
+        if record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return orjson.dumps(entry, default=str).decode()
+
+
+class LocalQueueHandler(QueueHandler):
+    """
+    Hands records to the listener thread as they are, without formatting them
+    on the calling thread (the listener's handler does that); only the message
+    and traceback are resolved, while their arguments are still valid.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+_listener: QueueListener | None = None
+_handler: QueueHandler | None = None
+
+
+def init_logging() -> None:
+    """
+    Route all log records through a queue to a thread that formats and writes
+    them, so logging never blocks the event loop on I/O. Called from the app
+    lifespan.
+    """
+    global _listener, _handler
+    if _listener is not None:
+        return
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(
+        JSONFormatter() if Config.LOG_JSON
+        else logging.Formatter("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s")
+    )
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    _handler = LocalQueueHandler(log_queue)
+    _handler.addFilter(RequestIdFilter())
+    root = logging.getLogger()
+    root.addHandler(_handler)
+    root.setLevel(Config.LOG_LEVEL_LIBRARIES)
+    logging.getLogger("app").setLevel(Config.LOG_LEVEL)
+    _listener = QueueListener(log_queue, output)
+    _listener.start()
+
+
+def close_logging() -> None:
+    """Write out the queued records and stop the listener thread."""
+    global _listener, _handler
+    if _listener is not None:
+        _listener.stop()
+        logging.getLogger().removeHandler(_handler)
+        _listener = _handler = None
@@ -0,0 +1,133 @@
+import os
+
+from fastapi import Response
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+# With several workers (uvicorn --workers N, gunicorn), set
+# PROMETHEUS_MULTIPROC_DIR to an empty directory shared by them: every process
+# writes its samples there and /metrics, whichever worker answers, reports the
+# sum. Gauges use "livesum" so that values of exited workers are dropped.
+MULTIPROCESS = "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+# HTTP requests, by route template (not the raw path, to bound the label values)
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Time from request start to the end of the response body",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS + (60, 120),
+)
+HTTP_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "Requests being handled", ["method"], multiprocess_mode="livesum"
+)
+
+
+# Stages of a chat turn and of search
+STAGE_DURATION = Histogram(
+    "rag_stage_duration_seconds",
+    "Duration of a retrieval or generation stage "
+    "(query_encode, vector_search, mmr, content_fetch, rewrite_llm)",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+
+
+# LLM streams, by provider and operation (rewrite, answer, summary)
+LLM_TIME_TO_FIRST_TOKEN = Histogram(
+    "llm_time_to_first_token_seconds",
+    "Time from sending a completion request to its first text delta, retries included",
+    ["provider", "operation"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, 120),
+)
+LLM_TOKENS_PER_SECOND = Histogram(
+    "llm_tokens_per_second",
+    "Text deltas (about one token each) streamed per second after the first one",
+    ["provider", "operation"],
+    buckets=(1, 2.5, 5, 10, 20, 30, 50, 75, 100, 200, 500),
+)
+LLM_STREAM_DURATION = Histogram(
+    "llm_stream_duration_seconds",
+    "Duration of a completed completion stream",
+    ["provider", "operation"],
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300),
+)
+
+
+# LLM gateway
+LLM_QUEUE_DEPTH = Gauge(
+    "llm_queue_depth", "Chat requests waiting for an LLM slot", ["provider"], multiprocess_mode="livesum"
+)
+LLM_IN_FLIGHT = Gauge(
+    "llm_in_flight", "Chat requests currently holding an LLM slot", ["provider"], multiprocess_mode="livesum"
+)
+LLM_QUEUE_WAIT = Histogram(
+    "llm_queue_wait_seconds",
+    "Time spent waiting for an LLM slot",
+    ["provider"],
+    buckets=(0.005, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120),
+)
+LLM_REJECTED = Counter(
+    "llm_rejected_total", "Chat requests rejected by admission control", ["provider", "reason"]
+)
+
+
+# Rate limiting
+RATE_LIMITED = Counter(
+    "rate_limited_total", "Requests rejected by the token-bucket rate limiter", ["limit"]
+)
+
+
+# Database connection pool, updated by the pool on every checkout and return
+DB_POOL_CHECKED_OUT = Gauge("db_pool_checked_out", "Database connections in use", multiprocess_mode="livesum")
+DB_POOL_IDLE = Gauge("db_pool_idle", "Idle database connections in the pool", multiprocess_mode="livesum")
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow", "Database connections open beyond the pool size", multiprocess_mode="livesum"
+)
+DB_POOL_WAIT = Histogram(
+    "db_pool_wait_seconds",
+    "Time to check out a database connection, including connecting",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+
+
+DB_COMMIT_DURATION = Histogram(
+    "db_commit_duration_seconds",
+    "Time of a session commit, including the flush of pending changes",
+    buckets=LATENCY_BUCKETS,
+)
+
+
+# Redis, by command; pipelines are timed as a whole under "pipeline"
+REDIS_COMMAND_DURATION = Histogram(
+    "redis_command_duration_seconds",
+    "Round trip of a Redis command",
+    ["command"],
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1, 5),
+)
+
+
+def metrics_response() -> Response:
+    """Render the metrics in Prometheus text format, of all workers in multiprocess mode."""
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(content=generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+
+
+def mark_process_dead() -> None:
+    """Drop the live gauges of this worker; called when it shuts down."""
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(os.getpid())
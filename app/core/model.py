@@ -22,9 +22,9 @@ class Embedding(SQLModel, table=True):
     """
     id: int = Field(default=None, primary_key=True)
     username: str = Field(default=None, nullable=False)
-    chunk_id: UUID = Field(default=None, foreign_key="chunk.id", nullable=False, index=True)
+    chunk_id: UUID = Field(default=None, foreign_key="chunk.id", ondelete="CASCADE", nullable=False, index=True)
     vector: Any | None = Field(sa_column=sa.Column(Vector(768)))
-    document_id: UUID = Field(default=None, foreign_key="document.id", nullable=False)
+    document_id: UUID = Field(default=None, foreign_key="document.id", ondelete="CASCADE", nullable=False, index=True)
     created_at: datetime = Field(
         sa_column=Column(DateTime(timezone=True), server_default=func.now())
     )
@@ -72,11 +72,12 @@ class APIKey(SQLModel, table=True):
     __tablename__ = "api_key"
 
     id: UUID = Field(default_factory=uuid4, primary_key=True)
-    key: str = Field(default=None, unique=True, index=True, nullable=False)
+    key_hash: str = Field(default=None, unique=True, index=True, nullable=False, max_length=64)  # sha256 of the key
+    prefix: str = Field(default=None, nullable=False, max_length=16)  # shown to identify the key
     name: str = Field(default=None, nullable=False)
-    user_id: UUID = Field(default=None, foreign_key="user.id", nullable=False)
+    user_id: UUID = Field(default=None, foreign_key="user.id", nullable=False, index=True)
     is_active: bool = Field(default=True, nullable=False)
-    last_user_at: datetime | None = Field(sa_column=Column(DateTime(timezone=True), nullable=True))
+    last_used_at: datetime | None = Field(sa_column=Column(DateTime(timezone=True), nullable=True))
     created_at: datetime = Field(
         sa_column=Column(DateTime(timezone=True), server_default=func.now())
     )
@@ -95,6 +96,7 @@ class KnowledgeBase(SQLModel, table=True):
     name: str = Field(default=None, max_length=255, nullable=False)
     description: str | None = Field(default=None, max_length=1024)
     username: str = Field(default=None, nullable=False)
+    llm_provider: str | None = Field(default=None, max_length=64)
     created_at: datetime = Field(
         sa_column=Column(DateTime(timezone=True), server_default=func.now())
     )
@@ -104,13 +106,20 @@ class KnowledgeBase(SQLModel, table=True):
         )
     )
 
-    documents: list["Document"] = Relationship(back_populates="knowledge_base", cascade_delete=True)
+    # Children are removed by ON DELETE CASCADE in the database, not loaded and
+    # deleted one by one by the ORM (passive_deletes)
+    documents: list["Document"] = Relationship(
+        back_populates="knowledge_base", cascade_delete=True, passive_deletes=True
+    )
 
 class Document(SQLModel, table=True):
     id: UUID = Field(default_factory=uuid4, primary_key=True)
     username: str = Field(default=None, nullable=False)
-    knowledge_base_id: UUID = Field(default=None, foreign_key="knowledge_base.id", nullable=False)
-    object_path: str = Field(default=None, max_length=255)
+    knowledge_base_id: UUID = Field(
+        default=None, foreign_key="knowledge_base.id", ondelete="CASCADE", nullable=False, index=True
+    )
+    # Indexed for the "still referenced" check before objects are removed
+    object_path: str = Field(default=None, index=True, max_length=255)
     file_name: str = Field(default=None, max_length=255)
     file_size: int = Field(default=None, nullable=False)
     content_type: str = Field(default=None, max_length=128)
@@ -125,13 +134,13 @@ class Document(SQLModel, table=True):
         )
     )
 
-    chunks: list["Chunk"] = Relationship(back_populates="documents", cascade_delete=True)
+    chunks: list["Chunk"] = Relationship(back_populates="documents", cascade_delete=True, passive_deletes=True)
     knowledge_base: Optional["KnowledgeBase"] = Relationship(back_populates="documents")
 
 class Chunk(SQLModel, table=True):
     id: UUID = Field(default_factory=uuid4, primary_key=True)
     username: str = Field(default=None, nullable=False)
-    document_id: UUID = Field(default=None, foreign_key="document.id", nullable=False)
+    document_id: UUID = Field(default=None, foreign_key="document.id", ondelete="CASCADE", nullable=False)
     content: str = Field(default=None, max_length=1024, index=True)
     created_at: datetime = Field(
         sa_column=Column(DateTime(timezone=True), server_default=func.now())
@@ -143,7 +152,7 @@ class Chunk(SQLModel, table=True):
     )
 
     documents: list["Document"] = Relationship(back_populates="chunks")
-    embedding: Embedding | None = Relationship(back_populates="chunk", cascade_delete=True)
+    embedding: Embedding | None = Relationship(back_populates="chunk", cascade_delete=True, passive_deletes=True)
 
 
 class Chat(SQLModel, table=True):
@@ -157,13 +166,13 @@ class Chat(SQLModel, table=True):
             DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
         )
     )
-    messages: list["Message"] = Relationship(back_populates="chat", cascade_delete=True)
+    messages: list["Message"] = Relationship(back_populates="chat", cascade_delete=True, passive_deletes=True)
 
 class Message(SQLModel, table=True):
     id: UUID = Field(default_factory=uuid4, primary_key=True)
     content: str | None = Field(default=None, sa_column=sa.Column(Text, nullable=False))
     role: str | None = Field(default=None, max_length=32, nullable=False)
-    chat_id: UUID = Field(default=None, foreign_key="chat.id", nullable=False)
+    chat_id: UUID = Field(default=None, foreign_key="chat.id", ondelete="CASCADE", nullable=False)
     created_at: datetime = Field(
         sa_column=Column(DateTime(timezone=True), server_default=func.now())
     )
@@ -173,3 +182,24 @@ class Message(SQLModel, table=True):
         )
     )
     chat: Chat | None = Relationship(back_populates="messages")
+
+
+# Recent messages of a chat, newest first (history rehydration, listing)
+message_chat_index = Index(
+    "ix_message_chat_id_created_at_id",
+    Message.chat_id,
+    Message.created_at,
+    Message.id,
+)
+
+# Keyset pagination of list endpoints on (created_at, id), see app/core/pagination.py
+message_created_index = Index("ix_message_created_at_id", Message.created_at, Message.id)
+chat_created_index = Index("ix_chat_created_at_id", Chat.created_at, Chat.id)
+document_created_index = Index("ix_document_created_at_id", Document.created_at, Document.id)
+chunk_created_index = Index("ix_chunk_created_at_id", Chunk.created_at, Chunk.id)
+chunk_document_index = Index(
+    "ix_chunk_document_id_created_at_id",
+    Chunk.document_id,
+    Chunk.created_at,
+    Chunk.id,
+)
@@ -0,0 +1,113 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Callable
+
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class ModelRegistry:
+    """
+    Tokenizers, embedders and Docling parsers of the process, loaded on first use.
+
+    Importing the app loads none of them: transformers, sentence-transformers
+    and Docling are imported by the loader functions below. The lifespan calls
+    ``warmup`` in the background, and the readiness endpoint reports 503 until
+    it is done, so the first chat or search request does not pay for loading
+    the models. Loading is guarded by a lock; the registry can be used from
+    worker threads.
+    """
+
+    def __init__(self):
+        self._resources: dict[tuple[str, str], Any] = {}
+        self._lock = threading.RLock()
+        self.ready = False
+        self.warmup_error: str | None = None
+
+    def _get(self, kind: str, name: str, load: Callable[[], Any]) -> Any:
+        key = (kind, name)
+        resource = self._resources.get(key)
+        if resource is None:
+            with self._lock:
+                resource = self._resources.get(key)
+                if resource is None:
+                    start = time.perf_counter()
+                    logger.info(f"Loading {kind} for {name}...")
+                    resource = self._resources[key] = load()
+                    logger.info(f"Loaded {kind} for {name} in {time.perf_counter() - start:.1f}s")
+        return resource
+
+    def tokenizer(self, model: str | None = None):
+        model = model or Config.EMBEDDING_MODEL
+
+        def load():
+            from transformers import AutoTokenizer
+
+            return AutoTokenizer.from_pretrained(model, use_fast=True, local_files_only=True)
+
+        return self._get("tokenizer", model, load)
+
+    def embedder(self, model: str | None = None):
+        model = model or Config.EMBEDDING_MODEL
+
+        def load():
+            from langchain_huggingface import HuggingFaceEmbeddings
+
+            return HuggingFaceEmbeddings(
+                model_name=model,
+                model_kwargs={"device": "cpu", "local_files_only": True},
+                encode_kwargs={"normalize_embeddings": True},
+            )
+
+        return self._get("embedder", model, load)
+
+    def document_converter(self):
+        """Docling converter; its layout and OCR models load on the first conversion."""
+
+        def load():
+            from docling.document_converter import DocumentConverter
+
+            return DocumentConverter()
+
+        return self._get("document_converter", "docling", load)
+
+    def document_chunker(self):
+        def load():
+            from docling.chunking import HybridChunker
+
+            return HybridChunker()
+
+        return self._get("document_chunker", "docling", load)
+
+    def _warmup(self, embedder: bool) -> None:
+        # Load the weights and run them once: the first forward pass allocates
+        # buffers and is much slower than the following ones
+        if embedder:
+            self.embedder().embed_query("warmup")
+        for model in {Config.EMBEDDING_MODEL, Config.PROMPT_TOKENIZER or Config.EMBEDDING_MODEL}:
+            self.tokenizer(model).encode("warmup", add_special_tokens=False)
+
+    async def warmup(self, embedder: bool = True) -> None:
+        """Load and run the tokenizers, and the embedder unless another process serves it."""
+        start = time.perf_counter()
+        try:
+            await asyncio.to_thread(self._warmup, embedder)
+        except Exception as e:
+            # Readiness stays false; requests still load the models on demand
+            self.warmup_error = repr(e)
+            logger.error(f"Model warmup failed: {e!r}")
+            return
+        self.ready = True
+        self.warmup_error = None
+        logger.info(f"Models warmed up in {time.perf_counter() - start:.1f}s")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._resources.clear()
+            self.ready = False
+
+
+model_registry = ModelRegistry()
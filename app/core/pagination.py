@@ -0,0 +1,113 @@
+import base64
+from datetime import datetime
+from typing import Any, Generic, Optional, Sequence, TypeVar
+from uuid import UUID
+
+import orjson
+from fastapi import HTTPException, Query
+from fastapi_pagination import Page, Params
+from fastapi_pagination.api import create_page, resolve_params
+from fastapi_pagination.bases import AbstractParams, RawParams
+from fastapi_pagination.ext.sqlmodel import apaginate
+from fastapi_pagination.types import GreaterEqualOne, GreaterEqualZero
+from fastapi_pagination.utils import create_pydantic_model
+from sqlalchemy import asc, desc, tuple_
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlmodel.sql.expression import SelectOfScalar
+
+T = TypeVar("T")
+
+
+class KeysetParams(Params):
+    cursor: str | None = Query(
+        None, description="next_cursor of the previous page; when set, page is ignored"
+    )
+    include_total: bool = Query(
+        True, description="Count all rows (total and pages). Cursor pages are never counted"
+    )
+
+    def to_raw_params(self) -> RawParams:
+        raw_params = super().to_raw_params()
+        raw_params.include_total = self.include_total
+        return raw_params
+
+
+class KeysetPage(Page[T], Generic[T]):
+    """
+    Page-number page that also carries a cursor to the next page.
+
+    Clients can keep using ``page``/``size``, or follow ``next_cursor``: a cursor
+    page seeks on (created_at, id) through an index, so its cost does not grow
+    with the depth of the page and no COUNT(*) is run.
+    """
+
+    total: Optional[GreaterEqualZero] = None
+    page: Optional[GreaterEqualOne] = None
+    pages: Optional[GreaterEqualZero] = None
+    next_cursor: str | None = None
+
+    __params_type__ = KeysetParams
+
+    @classmethod
+    def create(
+        cls,
+        items: Sequence[T],
+        params: AbstractParams,
+        *,
+        total: Optional[int] = None,
+        **kwargs: Any,
+    ) -> "KeysetPage[T]":
+        if not isinstance(params, KeysetParams):
+            raise TypeError("KeysetPage should be used with KeysetParams")
+        if params.cursor is None:
+            return super().create(items, params, total=total, **kwargs)
+        return create_pydantic_model(cls, items=items, total=None, size=params.size, **kwargs)
+
+
+def encode_cursor(created_at: datetime, id: UUID) -> str:
+    return base64.urlsafe_b64encode(orjson.dumps([created_at.isoformat(), str(id)])).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, UUID]:
+    try:
+        created_at, id = orjson.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(created_at), UUID(id)
+    except (ValueError, TypeError, AttributeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+async def keyset_paginate(
+    session: AsyncSession,
+    statement: SelectOfScalar,
+    model: Any,
+    descending: bool = True,
+) -> KeysetPage:
+    """
+    Paginate ``statement`` in (created_at, id) order.
+
+    Without a cursor this is the classic OFFSET page (with COUNT(*) unless
+    ``include_total=false``); with one, the page starts right after the row
+    the cursor points to.
+    """
+    params = resolve_params()
+    key = tuple_(model.created_at, model.id)
+    order = desc if descending else asc
+    statement = statement.order_by(order(model.created_at), order(model.id))
+
+    if params.cursor is None:
+        page = await apaginate(session, statement, params)
+        has_more = len(page.items) == params.size and (
+            page.total is None or params.page * params.size < page.total
+        )
+    else:
+        created_at, id = decode_cursor(params.cursor)
+        after = key < tuple_(created_at, id) if descending else key > tuple_(created_at, id)
+        # One extra row tells whether there is a next page without counting
+        rows = list((await session.exec(statement.where(after).limit(params.size + 1))).all())
+        has_more = len(rows) > params.size
+        page = create_page(rows[: params.size], params=params)
+
+    if has_more:
+        last = page.items[-1]
+        page.next_cursor = encode_cursor(last.created_at, last.id)
+    return page
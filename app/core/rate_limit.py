@@ -0,0 +1,139 @@
+import logging
+from dataclasses import dataclass
+
+import redis.asyncio as aioredis
+from redis.commands.core import AsyncScript
+
+from app.config import Config, RateLimitSettings
+from app.core.metrics import RATE_LIMITED
+from app.core.redis import get_redis
+from app.error import RateLimitExceeded
+
+logger = logging.getLogger(__name__)
+
+# Refill by elapsed time and take ``cost`` tokens in one atomic step, timed with
+# the Redis clock so every app instance agrees. Modes:
+#   take:  take the tokens if there are enough
+#   peek:  only tell whether there are enough
+#   debit: always take them, the balance may go negative (a debt that must be
+#          refilled before the next take or peek succeeds)
+# Returns {allowed, tokens left, seconds until allowed}; numbers as strings,
+# Lua numbers returned to Redis are truncated to integers.
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local mode = ARGV[4]
+
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1])
+local ts = tonumber(state[2])
+if tokens == nil or ts == nil then
+    tokens = capacity
+    ts = now
+end
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+
+local allowed = 0
+local retry_after = 0
+if mode == 'debit' or tokens >= cost then
+    allowed = 1
+    if mode ~= 'peek' then
+        tokens = tokens - cost
+    end
+else
+    retry_after = (math.min(cost, capacity) - tokens) / rate
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+-- Once the bucket would be full again its state carries no information
+redis.call('PEXPIRE', KEYS[1], math.ceil((capacity - tokens) / rate * 1000) + 1000)
+return {allowed, tostring(tokens), tostring(retry_after)}
+"""
+
+
+@dataclass
+class RateLimitResult:
+    allowed: bool
+    remaining: float
+    retry_after: float  # seconds, 0 when allowed
+
+
+class RateLimiter:
+    """
+    Token buckets in Redis, one per limit name and caller.
+
+    A bucket holds up to ``capacity`` tokens and refills at
+    ``refill_per_second``; each request takes one. Limits come from
+    RATE_LIMITS, and RATE_LIMIT_OVERRIDES can replace them for a single user or
+    API key. When Redis is unreachable requests are let through: an outage
+    should not turn into a full denial of service.
+    """
+
+    def __init__(self, client: aioredis.Redis | None = None):
+        self._client = client
+        self._script: AsyncScript | None = None
+
+    @property
+    def r(self) -> aioredis.Redis:
+        return self._client or get_redis()
+
+    @property
+    def script(self) -> AsyncScript:
+        # Re-register when the shared client was replaced (e.g. app restart in tests)
+        if self._script is None or self._script.registered_client is not self.r:
+            self._script = self.r.register_script(TOKEN_BUCKET_SCRIPT)
+        return self._script
+
+    @staticmethod
+    def bucket_key(name: str, caller: str) -> str:
+        return f"ratelimit:{name}:{caller}"
+
+    @staticmethod
+    def limit_for(name: str, caller: str) -> RateLimitSettings | None:
+        override = Config.RATE_LIMIT_OVERRIDES.get(caller, {}).get(name)
+        return override or Config.RATE_LIMITS.get(name)
+
+    async def _call(self, name: str, caller: str, cost: float, mode: str) -> RateLimitResult:
+        limit = self.limit_for(name, caller)
+        if not Config.RATE_LIMIT_ENABLED or limit is None:
+            return RateLimitResult(allowed=True, remaining=float("inf"), retry_after=0.0)
+        try:
+            allowed, remaining, retry_after = await self.script(
+                keys=[self.bucket_key(name, caller)],
+                args=[limit.capacity, limit.refill_per_second, cost, mode],
+            )
+        except aioredis.RedisError as e:
+            logger.warning(f"Rate limiter unavailable, allowing request: {e!r}")
+            return RateLimitResult(allowed=True, remaining=float("inf"), retry_after=0.0)
+        return RateLimitResult(
+            allowed=bool(int(allowed)), remaining=float(remaining), retry_after=float(retry_after)
+        )
+
+    async def hit(self, name: str, caller: str, cost: float = 1) -> RateLimitResult:
+        """Take ``cost`` tokens, raising RateLimitExceeded when there are not enough."""
+        result = await self._call(name, caller, cost, "take")
+        if not result.allowed:
+            RATE_LIMITED.labels(name).inc()
+            raise RateLimitExceeded(name, result.retry_after)
+        return result
+
+    async def ensure_available(self, name: str, caller: str) -> RateLimitResult:
+        """Fail when the bucket is empty or in debt, without taking anything."""
+        result = await self._call(name, caller, 1, "peek")
+        if not result.allowed:
+            RATE_LIMITED.labels(name).inc()
+            raise RateLimitExceeded(name, result.retry_after)
+        return result
+
+    async def debit(self, name: str, caller: str, cost: float) -> RateLimitResult:
+        """Take ``cost`` tokens for work already done; the bucket may go into debt."""
+        if cost <= 0:
+            return RateLimitResult(allowed=True, remaining=float("inf"), retry_after=0.0)
+        return await self._call(name, caller, cost, "debit")
+
+
+rate_limiter = RateLimiter()
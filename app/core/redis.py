@@ -1,13 +1,107 @@
+import contextlib
+import logging
+import time
+
 import redis.asyncio as aioredis
+from redis.asyncio.client import Pipeline
 
 from app.config import Config
+from app.core.metrics import REDIS_COMMAND_DURATION
+
+logger = logging.getLogger(__name__)
+
+
+class TimedPipeline(Pipeline):
+    async def execute(self, raise_on_error: bool = True):
+        start = time.perf_counter()
+        try:
+            return await super().execute(raise_on_error)
+        finally:
+            REDIS_COMMAND_DURATION.labels("pipeline").observe(time.perf_counter() - start)
+
+
+class TimedRedis(aioredis.Redis):
+    """Redis client that records the round trip of every command, by command name."""
+
+    async def execute_command(self, *args, **options):
+        start = time.perf_counter()
+        try:
+            return await super().execute_command(*args, **options)
+        finally:
+            command = args[0] if isinstance(args[0], str) else args[0].decode()
+            REDIS_COMMAND_DURATION.labels(command.lower()).observe(time.perf_counter() - start)
+
+    def pipeline(self, transaction: bool = True, shard_hint: str | None = None) -> Pipeline:
+        return TimedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
+_client: aioredis.Redis | None = None
+
+
+def init_redis() -> aioredis.Redis:
+    """Create the application-wide Redis pool. Called from the app lifespan."""
+    global _client
+    if _client is None:
+        logger.info("Create shared Redis pool.")
+        _client = TimedRedis.from_url(
+            Config.REDIS_URL,
+            decode_responses=True,
+            max_connections=Config.REDIS_MAX_CONNECTIONS,
+            health_check_interval=Config.REDIS_HEALTH_CHECK_INTERVAL,
+        )
+    return _client
+
+
+def get_redis() -> aioredis.Redis:
+    """Shared client for history, token blocklist and caches."""
+    return _client or init_redis()
+
+
+async def close_redis() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+# Blocklist entries used to be bare jti keys on the Celery result backend
+LEGACY_JTI_PATTERN = "????????-????-????-????-????????????"
+
 
+async def copy_legacy_blocklist(legacy: aioredis.Redis | None = None) -> int:
+    """
+    Copy blocklist entries from the Celery result backend, where they were kept
+    before they moved to REDIS_URL, so tokens revoked before the move stay
+    revoked. Runs at startup; after the first JTI_EXPIRY_SECOND every legacy
+    entry has expired and a marker key skips the scan. Returns how many were copied.
+    """
+    r = get_redis()
+    owns_legacy = legacy is None
+    legacy = legacy or aioredis.from_url(Config.BACKEND_URL, decode_responses=True)
+    copied = 0
+    try:
+        if not await r.set("blocklist:legacy_copied", "1", nx=True, ex=Config.JTI_EXPIRY_SECOND):
+            return 0
+        async for jti in legacy.scan_iter(match=LEGACY_JTI_PATTERN, count=1000):
+            ttl = await legacy.ttl(jti)
+            if ttl > 0:
+                await r.set(f"blocklist:{jti}", "", ex=ttl, nx=True)
+                copied += 1
+    except aioredis.RedisError as e:
+        logger.warning(f"Copying the legacy token blocklist failed: {e!r}")
+        # Let the next start try again
+        with contextlib.suppress(aioredis.RedisError):
+            await r.delete("blocklist:legacy_copied")
+    finally:
+        if owns_legacy:
+            await legacy.aclose()
+    if copied:
+        logger.info(f"Copied {copied} revoked tokens from the legacy blocklist")
+    return copied
 
-token_blocklist = aioredis.from_url(Config.BACKEND_URL)
 
 async def add_jti_blocklist(jti:str) -> None:
-    await token_blocklist.set(name=jti, value="", ex=3600)
+    await get_redis().set(name=f"blocklist:{jti}", value="", ex=Config.JTI_EXPIRY_SECOND)
 
 async def token_in_blocklist(jti: str) -> bool:
-    jti = await token_blocklist.get(jti)
-    return jti is not None
\ No newline at end of file
+    return await get_redis().exists(f"blocklist:{jti}") > 0
@@ -1,18 +1,84 @@
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+import asyncpg
+from pgvector.asyncpg import register_vector
+from sqlalchemy.ext.asyncio import create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.config import Config
-from sqlalchemy.ext.asyncio import create_async_engine
-import psycopg
-from pgvector.psycopg import register_vector
+from app.core.metrics import (
+    DB_COMMIT_DURATION,
+    DB_POOL_CHECKED_OUT,
+    DB_POOL_IDLE,
+    DB_POOL_OVERFLOW,
+    DB_POOL_WAIT,
+)
 
 database_url = Config.DATABASE_URL_ASYNCPG_DRIVER
 
-engine = create_async_engine(database_url, future=True)
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Queue pool that records how long each checkout waited for a connection,
+    and updates the pool gauges on every checkout and return (plain values
+    rather than callbacks, so they also add up across worker processes).
+    """
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_WAIT.observe(time.perf_counter() - start)
+            self._update_gauges()
+
+    def _do_return_conn(self, record):
+        try:
+            super()._do_return_conn(record)
+        finally:
+            self._update_gauges()
+
+    def _update_gauges(self) -> None:
+        DB_POOL_CHECKED_OUT.set(self.checkedout())
+        DB_POOL_IDLE.set(self.checkedin())
+        DB_POOL_OVERFLOW.set(max(self.overflow(), 0))
+
+
+class TimedAsyncSession(AsyncSession):
+    """AsyncSession that records the duration of each commit."""
+
+    async def commit(self) -> None:
+        start = time.perf_counter()
+        try:
+            await super().commit()
+        finally:
+            DB_COMMIT_DURATION.observe(time.perf_counter() - start)
+
+
+# The one connection pool of the process, used by the ORM and raw vector queries alike
+engine = create_async_engine(
+    database_url,
+    poolclass=TimedQueuePool,
+    pool_size=Config.DB_POOL_SIZE,
+    max_overflow=Config.DB_MAX_OVERFLOW,
+    pool_timeout=Config.DB_POOL_TIMEOUT,
+    pool_recycle=Config.DB_POOL_RECYCLE,
+    pool_pre_ping=Config.DB_POOL_PRE_PING,
+    connect_args={
+        # SQLAlchemy's and asyncpg's prepared statement caches; set
+        # DB_STATEMENT_CACHE_SIZE=0 behind PgBouncer in transaction mode
+        "prepared_statement_cache_size": Config.DB_STATEMENT_CACHE_SIZE,
+        "statement_cache_size": Config.DB_STATEMENT_CACHE_SIZE,
+    },
+)
 
 AsyncSessionLocal = sessionmaker(
     bind=engine,
-    class_=AsyncSession,
+    class_=TimedAsyncSession,
     expire_on_commit=False,
 )
 
@@ -21,10 +87,27 @@ async def get_session() -> AsyncSession:
     async with AsyncSessionLocal() as session:
         yield session
 
-        await session.rollback()
+        # Only undo work the route left uncommitted; after a commit there is
+        # nothing to roll back and no round trip is needed
+        if session.in_transaction():
+            await session.rollback()
+
+
+@asynccontextmanager
+async def vector_connection() -> AsyncIterator[asyncpg.Connection]:
+    """
+    A raw asyncpg connection from the shared pool, with the pgvector codec,
+    for vector search and COPY. It runs in autocommit mode unless the caller
+    opens a transaction.
+    """
+    async with engine.connect() as conn:
+        raw = (await conn.get_raw_connection()).driver_connection
+        # Codecs belong to the DBAPI connection; register once per connection
+        if not conn.info.get("pgvector"):
+            await register_vector(raw)
+            conn.info["pgvector"] = True
+        yield raw
 
 
-def get_conn():
-    conn = psycopg.connect(dbname=database_url, autocommit=True)
-    register_vector(conn)
-    return conn
+async def close_engine() -> None:
+    await engine.dispose()
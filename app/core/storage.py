@@ -0,0 +1,260 @@
+import asyncio
+import logging
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from functools import partial
+from io import BytesIO
+from itertools import islice
+from typing import Any, Callable, Iterable, TypeVar
+
+import certifi
+import urllib3
+from minio import Minio
+from minio.datatypes import PostPolicy
+from minio.deleteobjects import DeleteObject
+from minio.error import S3Error
+from urllib3.util import Retry, Timeout
+
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def build_minio_client(endpoint: str | None = None, secure: bool | None = None) -> Minio:
+    """MinIO client with a keep-alive pool sized for the storage thread pool."""
+    http_client = urllib3.PoolManager(
+        timeout=Timeout(connect=Config.MINIO_CONNECT_TIMEOUT, read=Config.MINIO_READ_TIMEOUT),
+        maxsize=Config.MINIO_MAX_CONNECTIONS,
+        block=True,  # wait for a pooled connection instead of opening throwaway ones
+        cert_reqs="CERT_REQUIRED",
+        ca_certs=os.environ.get("SSL_CERT_FILE") or certifi.where(),
+        retries=Retry(total=5, backoff_factor=0.2, status_forcelist=[500, 502, 503, 504]),
+    )
+    return Minio(
+        endpoint=endpoint or Config.MINIO_URL,
+        access_key=Config.MINIO_ACCESS_KEY,
+        secret_key=Config.MINIO_SECRET_KEY,
+        secure=Config.MINIO_SECURE if secure is None else secure,
+        # A known region spares the GetBucketLocation round trip, and lets the
+        # presigning client sign without reaching the public endpoint
+        region=Config.MINIO_REGION,
+        http_client=http_client,
+    )
+
+
+def public_bucket_url(bucket: str) -> str:
+    """
+    Path-style URL of ``bucket`` on the endpoint clients reach, the one the
+    presigning client signs for: MINIO_PUBLIC_URL, else MINIO_URL.
+    """
+    if Config.MINIO_PUBLIC_URL:
+        endpoint = Config.MINIO_PUBLIC_URL
+        secure = Config.MINIO_SECURE if Config.MINIO_PUBLIC_SECURE is None else Config.MINIO_PUBLIC_SECURE
+    else:
+        endpoint, secure = Config.MINIO_URL, Config.MINIO_SECURE
+    scheme = "https" if secure else "http"
+    return f"{scheme}://{endpoint}/{bucket}"
+
+
+class ObjectStorage:
+    """
+    Async access to the document bucket through one long-lived MinIO client.
+
+    The client keeps its HTTP connections and the bucket's region between
+    calls. The MinIO SDK is blocking, so every operation runs on a thread pool
+    of ``workers`` threads: at most that many requests are in flight per
+    process, and the event loop never waits on the network.
+
+    Presigned URLs come from ``presign_client``, configured with the public
+    endpoint; presigning is local computation and makes no request.
+    """
+
+    def __init__(
+        self,
+        client: Minio | None = None,
+        bucket: str | None = None,
+        workers: int | None = None,
+        presign_client: Minio | None = None,
+    ):
+        self._owns_client = client is None
+        self.client = client or build_minio_client()
+        if presign_client is None and Config.MINIO_PUBLIC_URL and client is None:
+            presign_client = build_minio_client(Config.MINIO_PUBLIC_URL, Config.MINIO_PUBLIC_SECURE)
+        self.presign_client = presign_client or self.client
+        self.bucket = bucket or Config.BUCKET_NAME
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers or Config.MINIO_IO_WORKERS, thread_name_prefix="storage"
+        )
+        self._bucket_ready = False
+
+    async def _run(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(func, *args, **kwargs))
+
+    async def ensure_bucket(self) -> None:
+        """Create the bucket if it does not exist; checked once per process."""
+        if self._bucket_ready:
+            return
+        if await self._run(self.client.bucket_exists, self.bucket):
+            logger.info(f"Bucket {self.bucket} already exists.")
+        else:
+            logger.info(f"Bucket {self.bucket} does not exist. Creating bucket")
+            await self._run(self.client.make_bucket, self.bucket)
+        self._bucket_ready = True
+
+    async def put_object(
+        self, object_name: str, data: bytes, content_type: str = "application/octet-stream"
+    ) -> None:
+        # Covers a bucket that could not be checked at startup
+        await self.ensure_bucket()
+        await self._run(
+            self.client.put_object,
+            bucket_name=self.bucket,
+            object_name=object_name,
+            data=BytesIO(data),
+            length=len(data),
+            content_type=content_type,
+        )
+
+    async def fget_object(self, object_name: str, file_path: str) -> None:
+        await self._run(
+            self.client.fget_object, bucket_name=self.bucket, object_name=object_name, file_path=file_path
+        )
+
+    async def stat_object(self, object_name: str) -> int | None:
+        """Size of the object in bytes, or None when it does not exist."""
+        try:
+            stat = await self._run(self.client.stat_object, self.bucket, object_name)
+        except S3Error as e:
+            if e.code in ("NoSuchKey", "NoSuchObject"):
+                return None
+            raise
+        return stat.size
+
+    def _sha256(self, object_name: str) -> str:
+        digest = hashlib.sha256()
+        response = self.client.get_object(self.bucket, object_name)
+        try:
+            for block in response.stream(1024 * 1024):
+                digest.update(block)
+        finally:
+            response.close()
+            response.release_conn()
+        return digest.hexdigest()
+
+    async def sha256(self, object_name: str) -> str:
+        """Hex SHA-256 of the object, streamed in 1 MiB blocks."""
+        return await self._run(self._sha256, object_name)
+
+    def presigned_put_url(self, object_name: str, expires: int) -> str:
+        return self.presign_client.presigned_put_object(
+            self.bucket, object_name, expires=timedelta(seconds=expires)
+        )
+
+    def presigned_post_form(
+        self, object_name: str, expires: int, content_type: str, size: int
+    ) -> tuple[str, dict[str, str]]:
+        """
+        URL and form fields of a POST upload of exactly ``size`` bytes to
+        ``object_name``. Unlike a presigned PUT, the signed policy makes MinIO
+        reject a body of any other length.
+        """
+        policy = PostPolicy(self.bucket, datetime.now(timezone.utc) + timedelta(seconds=expires))
+        policy.add_equals_condition("key", object_name)
+        policy.add_equals_condition("Content-Type", content_type)
+        policy.add_content_length_range_condition(size, size)
+        fields = {"key": object_name, "Content-Type": content_type}
+        fields.update(self.presign_client.presigned_post_policy(policy))
+        return public_bucket_url(self.bucket), fields
+
+    def _list_older_than(self, prefix: str, before: datetime) -> list[str]:
+        return [
+            obj.object_name
+            for obj in self.client.list_objects(self.bucket, prefix=prefix, recursive=True)
+            if obj.last_modified is not None and obj.last_modified < before
+        ]
+
+    async def list_older_than(self, prefix: str, before: datetime) -> list[str]:
+        """Names of the objects under ``prefix`` last modified before ``before``."""
+        return await self._run(self._list_older_than, prefix, before)
+
+    def presigned_get_url(self, object_name: str, expires: int, file_name: str | None = None) -> str:
+        response_headers = None
+        if file_name:
+            response_headers = {"response-content-disposition": f'attachment; filename="{file_name}"'}
+        return self.presign_client.presigned_get_object(
+            self.bucket, object_name, expires=timedelta(seconds=expires), response_headers=response_headers
+        )
+
+    def _remove_batch(self, object_paths: list[str]) -> int:
+        errors = self.client.remove_objects(self.bucket, [DeleteObject(path) for path in object_paths])
+        # The delete requests are only sent while the error iterator is consumed
+        failed = 0
+        for error in errors:
+            failed += 1
+            logger.error(f"MinIO cleanup error for {error.name}: {error.message}")
+        return failed
+
+    async def remove_objects(self, object_paths: Iterable[str]) -> tuple[int, int]:
+        """
+        Delete objects with multi-object delete requests of MINIO_REMOVE_BATCH_SIZE
+        keys. Returns (removed, failed); failures are logged, not raised, as the
+        database rows are already gone.
+        """
+        paths = iter(object_paths)
+        removed = failed = 0
+        while batch := list(islice(paths, Config.MINIO_REMOVE_BATCH_SIZE)):
+            try:
+                batch_failed = await self._run(self._remove_batch, batch)
+            except Exception as e:
+                logger.error(f"MinIO cleanup error: {e!r}")
+                batch_failed = len(batch)
+            removed += len(batch) - batch_failed
+            failed += batch_failed
+        return removed, failed
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+        if self._owns_client:
+            self.client._http.clear()
+            if self.presign_client is not self.client:
+                self.presign_client._http.clear()
+
+
+_storage: ObjectStorage | None = None
+_removals: set[asyncio.Task] = set()
+
+
+def init_storage() -> ObjectStorage:
+    """Create the application-wide storage client. Called from the app lifespan."""
+    global _storage
+    if _storage is None:
+        logger.info("Create shared MinIO client.")
+        _storage = ObjectStorage()
+    return _storage
+
+
+def get_storage() -> ObjectStorage:
+    return _storage or init_storage()
+
+
+def remove_objects_in_background(object_paths: list[str]) -> None:
+    """Schedule ``remove_objects`` without making the caller wait for MinIO."""
+    if not object_paths:
+        return
+    task = asyncio.create_task(get_storage().remove_objects(object_paths))
+    _removals.add(task)
+    task.add_done_callback(_removals.discard)
+
+
+async def close_storage() -> None:
+    global _storage
+    # Let scheduled removals finish, or their objects are orphaned
+    await asyncio.gather(*_removals, return_exceptions=True)
+    if _storage is not None:
+        _storage.close()
+        _storage = None
@@ -1,8 +1,9 @@
 from fastapi import APIRouter, UploadFile, status, Depends
-from app.document.schema import DocumentDBResponse, ChunkPreviewResponse
+from app.document.schema import DocumentDBResponse, ChunkPreviewResponse, CreateUpload, UploadSlot, DownloadURL
 from app.document.services import DocumentServices
 from fastapi_pagination import Page, paginate
 from app.core.dependency import SessionDep
+from app.core.pagination import KeysetPage
 from app.auth.dependency import AccessTokenBearer
 from typing import Annotated
 from app.auth.dependency import get_current_user
@@ -12,7 +13,7 @@ document_services = DocumentServices()
 document_router = APIRouter()
 
 
-@document_router.get("/", response_model=Page[DocumentDBResponse], dependencies=[Depends(AccessTokenBearer())])
+@document_router.get("/", response_model=KeysetPage[DocumentDBResponse], dependencies=[Depends(AccessTokenBearer())])
 async def get_all_documents(session: SessionDep):
     docs = await document_services.get_all_document(session)
     return docs
@@ -33,6 +34,34 @@ async def upload_file(
     return uploaded_files
 
 
+@document_router.post("/uploads", response_model=UploadSlot, dependencies=[Depends(AccessTokenBearer())])
+async def create_upload(
+        data: CreateUpload,
+        user: Annotated[UserModel, Depends(get_current_user)],
+        session: SessionDep,
+):
+    return await document_services.create_upload(data, user, session)
+
+
+@document_router.post("/uploads/{upload_id}/finalize", response_model=DocumentDBResponse,
+                      dependencies=[Depends(AccessTokenBearer())])
+async def finalize_upload(
+        upload_id: str,
+        user: Annotated[UserModel, Depends(get_current_user)],
+        session: SessionDep,
+):
+    return await document_services.finalize_upload(upload_id, user, session)
+
+
+@document_router.get("/{doc_id}/download", response_model=DownloadURL, dependencies=[Depends(AccessTokenBearer())])
+async def get_download_url(
+        doc_id: str,
+        user: Annotated[UserModel, Depends(get_current_user)],
+        session: SessionDep,
+):
+    return await document_services.get_download_url(doc_id, user, session)
+
+
 @document_router.delete("/{doc_id}", status_code=status.HTTP_204_NO_CONTENT,
                         dependencies=[Depends(AccessTokenBearer())])
 async def delete_document(doc_id: str, session: SessionDep):
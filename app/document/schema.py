@@ -31,3 +31,21 @@ class UpdateDocumentDB(BaseModel):
 class ChunkPreviewResponse(BaseModel):
     content: str
 
+class CreateUpload(BaseModel):
+    knowledge_base_id: UUID
+    file_name: str = Field(min_length=1, max_length=255)
+    file_size: int = Field(gt=0)
+    file_hash: str = Field(pattern="^[0-9a-f]{64}$")  # hex sha256 of the file
+
+class UploadSlot(BaseModel):
+    upload_id: str
+    object_path: str
+    url: str  # POST a multipart form here: the fields below, then the file as "file"
+    method: str = "POST"
+    fields: dict[str, str]
+    expires_at: datetime
+
+class DownloadURL(BaseModel):
+    url: str  # GET, Range requests supported
+    expires_at: datetime
+
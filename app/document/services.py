@@ -1,33 +1,69 @@
 import logging
 import tempfile
 import hashlib
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
 from fastapi import UploadFile, HTTPException
 from fastapi.responses import JSONResponse
 from app.document.schema import (
     DocumentDBResponse,
     CreateDocumentDB,
     UpdateDocumentDB,
+    CreateUpload,
+    UploadSlot,
+    DownloadURL,
 )
-from app.core.minio import get_minio_client, init_minio
-from app.config import Config
+from app.core.storage import get_storage, remove_objects_in_background
 from pathlib import Path
-from io import BytesIO
 from sqlmodel.ext.asyncio.session import AsyncSession
-from app.core.model import Document
+from app.core.model import Document, KnowledgeBase
+from app.core.redis import get_redis
+from app.config import Config
 from uuid import UUID
-from fastapi_pagination import Page
-from fastapi_pagination.ext.sqlmodel import apaginate
-from sqlmodel import desc, select
-from minio.error import MinioException
+from app.core.pagination import KeysetPage, keyset_paginate
+from sqlmodel import select
 from app.auth.schema import UserModel
 
 logger = logging.getLogger(__name__)
 
+CONTENT_TYPES = {
+    ".pdf": "application/pdf",
+    ".docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",  # word file
+    ".md": "text/markdown",
+    ".txt": "text/plain",
+}
+
+
+# Objects of presigned uploads, finalized or not; see app/document/sweeper.py
+UPLOAD_PREFIX = "uploads/"
+
+
+def clean_file_name(file_name: str) -> str:
+    return "".join(c for c in file_name if c.isalnum() or c in ("-", "_", ".")).strip()
+
+
+def content_type_of(file_name: str) -> str:
+    return CONTENT_TYPES.get(Path(file_name).suffix.lower(), "application/octet-stream")
+
+
+async def unreferenced_object_paths(session: AsyncSession, object_paths: list[str | None]) -> list[str]:
+    """
+    Keep the paths no remaining document points to. Legacy uploads are stored
+    under their content hash, so one object can back documents in several
+    knowledge bases; call this after the deleting transaction has committed.
+    """
+    object_paths = list(dict.fromkeys(path for path in object_paths if path))
+    if not object_paths:
+        return []
+    referenced = set((await session.exec(
+        select(Document.object_path).where(Document.object_path.in_(object_paths)).distinct()
+    )).all())
+    return [path for path in object_paths if path not in referenced]
+
 
 class DocumentServices:
-    async def get_all_document(self, session: AsyncSession) -> Page[DocumentDBResponse]:
-        statement = select(Document).order_by(desc(Document.created_at))
-        return await apaginate(session, statement)
+    async def get_all_document(self, session: AsyncSession) -> KeysetPage[DocumentDBResponse]:
+        return await keyset_paginate(session, select(Document), Document)
 
     async def get_document(self, document_id: str, session: AsyncSession) -> DocumentDBResponse:
         doc = await session.get(Document, UUID(document_id))
@@ -49,17 +85,14 @@ class DocumentServices:
     async def delete_document(self, doc_id: str, session: AsyncSession):
         doc = await self.get_document(doc_id, session)
 
-        minio_client = get_minio_client()
-
-        try:
-            minio_client.remove_object(Config.BUCKET_NAME, doc.object_path)
-            logger.info(f"Object {doc.object_path}' deleted successfully")
-        except MinioException as e:
-            logger.error(f"MinIO cleanup error: {str(e)}")
-
+        # One DELETE; chunks and embeddings follow through ON DELETE CASCADE
         await session.delete(doc)
         await session.commit()
         logger.info(f"Document {doc.id}' deleted successfully")
+
+        # The object is removed after the response, unless another document shares it;
+        # a failure only leaves an orphan object
+        remove_objects_in_background(await unreferenced_object_paths(session, [doc.object_path]))
         return JSONResponse(content={"message": "Deleted is successfully."})
 
     async def upload_document(
@@ -72,34 +105,17 @@ class DocumentServices:
         file_hash = hashlib.sha256(content).hexdigest()
 
         # Clean and normalize filename
-        file_name = "".join(
-            c for c in file.filename if c.isalnum() or c in ("-", "_", ".")
-        ).strip()
+        file_name = clean_file_name(file.filename)
         path = Path(file_name)
         stem = path.stem
         ext = path.suffix.lower()
         object_path = f"tmp/{stem}_{file_hash}{ext}"
 
-        content_types = {
-            ".pdf": "application/pdf",
-            ".docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",  # word file
-            ".md": "text/markdown",
-            ".txt": "text/plain",
-        }
-
-        content_type = content_types.get(ext, "application/octet-stream")
+        content_type = content_type_of(file_name)
 
         # Upload to MinIO
-        _minio_client = init_minio()
-        minio_client = get_minio_client()
         try:
-            minio_client.put_object(
-                bucket_name=Config.BUCKET_NAME,
-                object_name=object_path,
-                data=BytesIO(content),
-                length=file_size,
-                content_type=content_type,
-            )
+            await get_storage().put_object(object_path, content, content_type=content_type)
         except Exception as e:
             logging.error(f"Failed to upload file in MinIO: {str(e)}")
             raise
@@ -120,18 +136,121 @@ class DocumentServices:
         await session.commit()
         return new_doc
 
+    @staticmethod
+    def upload_key(upload_id: str) -> str:
+        return f"upload:{upload_id}"
+
+    async def create_upload(
+            self, data: CreateUpload, user: UserModel, session: AsyncSession
+    ) -> UploadSlot:
+        """
+        Presigned upload, step 1: reserve an object path and return the URL and
+        form fields the client POSTs the file with, straight to MinIO.
+
+        The signed policy only accepts a body of the declared size. The declared
+        hash is kept in Redis until the URL expires and checked by
+        ``finalize_upload``. Each upload gets its own path, so a client can never
+        overwrite an object that belongs to another document; uploads that are
+        never finalized are removed by the upload sweeper.
+        """
+        if data.file_size > Config.UPLOAD_MAX_SIZE:
+            raise HTTPException(status_code=413, detail=f"File is larger than {Config.UPLOAD_MAX_SIZE} bytes")
+        kb = await session.get(KnowledgeBase, data.knowledge_base_id)
+        if kb is None or kb.username != user.username:
+            raise HTTPException(status_code=404, detail="Knowledge base not found")
+
+        upload_id = uuid4().hex
+        file_name = clean_file_name(data.file_name) or "file"
+        object_path = f"{UPLOAD_PREFIX}{upload_id}/{file_name}"
+        content_type = content_type_of(file_name)
+
+        storage = get_storage()
+        url, fields = storage.presigned_post_form(
+            object_path, Config.PRESIGNED_UPLOAD_EXPIRY, content_type, data.file_size
+        )
+        async with get_redis().pipeline(transaction=True) as pipe:
+            pipe.hset(self.upload_key(upload_id), mapping={
+                "object_path": object_path,
+                "file_name": file_name,
+                "file_size": data.file_size,
+                "file_hash": data.file_hash,
+                "content_type": content_type,
+                "knowledge_base_id": str(data.knowledge_base_id),
+                "username": user.username,
+            })
+            # Some slack past the URL expiry for a PUT that started just before it
+            pipe.expire(self.upload_key(upload_id), Config.PRESIGNED_UPLOAD_EXPIRY * 2)
+            await pipe.execute()
+
+        return UploadSlot(
+            upload_id=upload_id,
+            object_path=object_path,
+            url=url,
+            fields=fields,
+            expires_at=datetime.now(timezone.utc) + timedelta(seconds=Config.PRESIGNED_UPLOAD_EXPIRY),
+        )
+
+    async def finalize_upload(self, upload_id: str, user: UserModel, session: AsyncSession):
+        """
+        Presigned upload, step 2: check the uploaded object against the declared
+        size and SHA-256, then create the document.
+
+        The hash is computed by streaming the object from MinIO inside the
+        storage network; the bytes never pass through the client-facing proxy.
+        """
+        redis = get_redis()
+        key = self.upload_key(upload_id)
+        slot = await redis.hgetall(key)
+        if not slot or slot["username"] != user.username:
+            raise HTTPException(status_code=404, detail="Upload not found")
+
+        storage = get_storage()
+        object_path = slot["object_path"]
+        size = await storage.stat_object(object_path)
+        if size is None:
+            raise HTTPException(status_code=409, detail="The file has not been uploaded yet")
+        if size != int(slot["file_size"]) or await storage.sha256(object_path) != slot["file_hash"]:
+            await redis.delete(key)
+            remove_objects_in_background([object_path])
+            raise HTTPException(status_code=422, detail="Uploaded file does not match the declared size or hash")
+
+        # Claim the slot, a concurrent finalize of the same upload gets a 404
+        if not await redis.delete(key):
+            raise HTTPException(status_code=404, detail="Upload not found")
+
+        new_doc = Document(**CreateDocumentDB(
+            object_path=object_path,
+            file_name=slot["file_name"],
+            file_size=size,
+            content_type=slot["content_type"],
+            file_hash=slot["file_hash"],
+            username=user.username,
+            knowledge_base_id=UUID(slot["knowledge_base_id"]),
+        ).model_dump())
+        session.add(new_doc)
+        await session.commit()
+        return new_doc
+
+    async def get_download_url(self, doc_id: str, user: UserModel, session: AsyncSession) -> DownloadURL:
+        """Presigned GET for the document; the client downloads it from MinIO, Range requests included."""
+        doc = await self.get_document(doc_id, session)
+        # Only for the owner of the knowledge base, like uploads to it
+        kb = await session.get(KnowledgeBase, doc.knowledge_base_id)
+        if kb is None or kb.username != user.username:
+            raise HTTPException(status_code=404, detail="Document not found")
+        url = get_storage().presigned_get_url(doc.object_path, Config.PRESIGNED_DOWNLOAD_EXPIRY, doc.file_name)
+        return DownloadURL(
+            url=url,
+            expires_at=datetime.now(timezone.utc) + timedelta(seconds=Config.PRESIGNED_DOWNLOAD_EXPIRY),
+        )
+
     async def download_doc_to_tmp_local(self, object_path: str) -> str:
         """Download document from MinIO"""
-        minio_client = get_minio_client()
         file_path = Path(object_path)
         ext = file_path.suffix.lower()
 
         # Download to temp file
         with tempfile.NamedTemporaryFile(delete=False, suffix=ext) as temp_file:
-            minio_client.fget_object(
-                bucket_name=Config.BUCKET_NAME,
-                object_name=object_path,
-                file_path=temp_file.name,
-            )
             temp_path = temp_file.name
+        await get_storage().fget_object(object_path, temp_path)
         return temp_path
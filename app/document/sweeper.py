@@ -0,0 +1,63 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+
+from app.config import Config
+from app.core.redis import get_redis
+from app.core.session import AsyncSessionLocal
+from app.core.storage import get_storage
+from app.document.services import UPLOAD_PREFIX, unreferenced_object_paths
+
+logger = logging.getLogger(__name__)
+
+
+class UploadSweeper:
+    """
+    Removes the objects of presigned uploads that were never finalized.
+
+    Every ``interval`` seconds one process (whichever takes the Redis key first)
+    lists the objects under ``uploads/`` older than their upload slot, which
+    lives for twice PRESIGNED_UPLOAD_EXPIRY, so they can no longer be finalized.
+    The ones no document references are removed.
+    """
+
+    def __init__(self, interval: float | None = None, session_factory=AsyncSessionLocal):
+        self.interval = interval or Config.UPLOAD_SWEEP_INTERVAL
+        self.session_factory = session_factory
+        self._task: asyncio.Task | None = None
+
+    async def sweep(self) -> int:
+        """Remove abandoned uploads; returns how many objects were removed."""
+        if not await get_redis().set("upload_sweep:lock", "1", nx=True, ex=int(self.interval)):
+            return 0  # another process swept in this interval
+        # A minute of slack for a finalize that claimed its slot just before it expired
+        before = datetime.now(timezone.utc) - timedelta(seconds=Config.PRESIGNED_UPLOAD_EXPIRY * 2 + 60)
+        storage = get_storage()
+        stale = await storage.list_older_than(UPLOAD_PREFIX, before)
+        if not stale:
+            return 0
+        async with self.session_factory() as session:
+            abandoned = await unreferenced_object_paths(session, stale)
+        removed, failed = await storage.remove_objects(abandoned)
+        logger.info(f"Removed {removed} abandoned uploads ({failed} failed)")
+        return removed
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.warning(f"Sweeping abandoned uploads failed: {e!r}")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+upload_sweeper = UploadSweeper()
@@ -0,0 +1,274 @@
+import asyncio
+import itertools
+import logging
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from typing import Protocol
+
+import numpy as np
+import orjson
+
+from app.config import Config
+from app.core.model_registry import ModelRegistry, model_registry
+from app.error import EmbeddingUnavailable
+
+logger = logging.getLogger(__name__)
+
+# Frames on the worker socket: a 4 byte big-endian header length, a JSON
+# header, then ``nbytes`` of raw array data when the header has them.
+#   request:  {"op": "encode", "texts": [...]} or {"op": "ping"}
+#   response: {"shape": [n, dim], "dtype": "float32", "nbytes": ...} + data,
+#             {"ok": true, "model": ...} or {"error": "..."}
+_HEADER_LENGTH = struct.Struct(">I")
+
+
+async def read_frame(reader: asyncio.StreamReader) -> tuple[dict, bytes | None]:
+    (length,) = _HEADER_LENGTH.unpack(await reader.readexactly(_HEADER_LENGTH.size))
+    header = orjson.loads(await reader.readexactly(length))
+    payload = await reader.readexactly(header["nbytes"]) if header.get("nbytes") else None
+    return header, payload
+
+
+def write_frame(writer: asyncio.StreamWriter, header: dict, array: np.ndarray | None = None) -> None:
+    if array is not None:
+        array = np.ascontiguousarray(array)
+        header = {**header, "shape": list(array.shape), "dtype": str(array.dtype), "nbytes": array.nbytes}
+    data = orjson.dumps(header)
+    writer.write(_HEADER_LENGTH.pack(len(data)) + data)
+    if array is not None and array.nbytes:
+        # The array's own buffer goes to the socket, no bytes copy is made
+        writer.write(memoryview(array).cast("B"))
+
+
+class Encoder(Protocol):
+    async def encode(self, texts: list[str]) -> np.ndarray:
+        """Embeddings of ``texts`` as a float32 array of shape (len(texts), dim)."""
+        ...
+
+    async def is_ready(self) -> bool: ...
+
+    async def close(self) -> None: ...
+
+
+class LocalEncoder:
+    """
+    Encodes with the model of this process, loaded through the model registry.
+
+    Forward passes run on ``threads`` dedicated threads (one by default: the
+    model already uses every core for a batch), off the event loop.
+    """
+
+    def __init__(self, registry: ModelRegistry | None = None, model: str | None = None, threads: int | None = None):
+        self.registry = registry or model_registry
+        self.model = model
+        self._executor = ThreadPoolExecutor(
+            max_workers=threads or Config.EMBEDDING_THREADS, thread_name_prefix="encoder"
+        )
+
+    def _encode(self, texts: list[str]) -> np.ndarray:
+        vectors = self.registry.embedder(self.model).embed_documents(texts)
+        return np.asarray(vectors, dtype=np.float32)
+
+    async def encode(self, texts: list[str]) -> np.ndarray:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._encode, texts)
+
+    async def is_ready(self) -> bool:
+        return self.registry.ready
+
+    async def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class RemoteEncoder:
+    """
+    Thin client of the embedding worker processes (``python -m app.embedding.worker``).
+
+    API workers hold no embedding model; texts go over a unix socket and the
+    vectors come back as raw float32 buffers that ``np.frombuffer`` wraps
+    without copying (the arrays are read-only). Up to ``connections``
+    requests are in flight per process, each on its own connection, spread
+    over the worker sockets round robin.
+    """
+
+    def __init__(self, socket_paths: list[str] | None = None, connections: int | None = None,
+                 timeout: float | None = None):
+        self.socket_paths = socket_paths or Config.EMBEDDING_WORKER_SOCKETS
+        self.timeout = timeout or Config.EMBEDDING_WORKER_TIMEOUT
+        self._paths = itertools.cycle(self.socket_paths)
+        self._slots = asyncio.Semaphore(connections or Config.EMBEDDING_WORKER_CONNECTIONS)
+        self._idle: list[tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+
+    async def _request(self, header: dict) -> tuple[dict, bytes | None]:
+        async with self._slots:
+            connection = self._idle.pop() if self._idle else None
+            try:
+                if connection is None:
+                    connection = await asyncio.open_unix_connection(next(self._paths))
+                reader, writer = connection
+                write_frame(writer, header)
+                await writer.drain()
+                response, payload = await asyncio.wait_for(read_frame(reader), self.timeout)
+            except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError) as e:
+                # The connection may have half a response in it; never reuse it
+                if connection is not None:
+                    connection[1].close()
+                logger.warning(f"Embedding worker request failed: {e!r}")
+                raise EmbeddingUnavailable() from e
+            except BaseException:
+                if connection is not None:
+                    connection[1].close()
+                raise
+            self._idle.append(connection)
+        if "error" in response:
+            raise EmbeddingUnavailable(response["error"])
+        return response, payload
+
+    async def encode(self, texts: list[str]) -> np.ndarray:
+        response, payload = await self._request({"op": "encode", "texts": texts})
+        return np.frombuffer(payload or b"", dtype=response["dtype"]).reshape(response["shape"])
+
+    async def is_ready(self) -> bool:
+        try:
+            response, _ = await self._request({"op": "ping"})
+        except EmbeddingUnavailable:
+            return False
+        return bool(response.get("ok"))
+
+    async def close(self) -> None:
+        while self._idle:
+            _, writer = self._idle.pop()
+            writer.close()
+
+
+class BatchingEncoder:
+    """
+    Merges concurrent ``encode`` calls into batched forward passes.
+
+    A burst of single-query calls costs one pass of N texts instead of N
+    passes of one. Calls are queued; a batch is sent as soon as it holds
+    ``max_batch_size`` texts or ``max_wait`` seconds after its first call,
+    and each caller gets its own rows back. Up to ``concurrency`` batches
+    run at once (the threads of a local encoder, the connections to the
+    workers). Calls of ``max_batch_size`` texts or more are a batch already
+    and go straight to the wrapped encoder.
+    """
+
+    def __init__(self, encoder: Encoder, max_batch_size: int | None = None, max_wait: float | None = None,
+                 concurrency: int = 1):
+        self.encoder = encoder
+        self.max_batch_size = max_batch_size or Config.EMBEDDING_BATCH_MAX_SIZE
+        self.max_wait = Config.EMBEDDING_BATCH_MAX_WAIT if max_wait is None else max_wait
+        self.concurrency = concurrency
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._queue: asyncio.Queue[tuple[list[str], asyncio.Future]] | None = None
+        self._tasks: list[asyncio.Task] = []
+
+    def _start(self) -> asyncio.Queue:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Queues and tasks belong to one event loop
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._tasks = [loop.create_task(self._run()) for _ in range(self.concurrency)]
+        return self._queue
+
+    async def encode(self, texts: list[str]) -> np.ndarray:
+        if len(texts) >= self.max_batch_size:
+            return await self.encoder.encode(texts)
+        future = asyncio.get_running_loop().create_future()
+        self._start().put_nowait((texts, future))
+        return await future
+
+    async def _collect(self, first: tuple | None) -> tuple[list[tuple[list[str], asyncio.Future]], tuple | None]:
+        """The next batch, and the call that did not fit in it."""
+        batch = [first or await self._queue.get()]
+        size = len(batch[0][0])
+        deadline = self._loop.time() + self.max_wait
+        try:
+            while size < self.max_batch_size:
+                if self._queue.empty():
+                    timeout = deadline - self._loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    item = self._queue.get_nowait()
+                if size + len(item[0]) > self.max_batch_size:
+                    return batch, item
+                batch.append(item)
+                size += len(item[0])
+        except asyncio.CancelledError:
+            # Closed while filling: the calls taken off the queue so far are not
+            # in the batch or carry of _run yet, so nobody else would answer them
+            for _, future in batch:
+                future.cancel()
+            raise
+        return batch, None
+
+    async def _run(self) -> None:
+        batch, carry = [], None
+        try:
+            while True:
+                batch, carry = await self._collect(carry)
+                # Callers that gave up while queued are left out
+                batch = [(texts, future) for texts, future in batch if not future.done()]
+                if not batch:
+                    continue
+                try:
+                    vectors = await self.encoder.encode([text for texts, _ in batch for text in texts])
+                except Exception as e:
+                    for _, future in batch:
+                        if not future.done():
+                            future.set_exception(e)
+                    continue
+                offset = 0
+                for texts, future in batch:
+                    if not future.done():
+                        future.set_result(vectors[offset:offset + len(texts)])
+                    offset += len(texts)
+        finally:
+            # Closed: nobody will answer the calls this task holds
+            for _, future in batch + ([carry] if carry else []):
+                future.cancel()
+
+    async def is_ready(self) -> bool:
+        return await self.encoder.is_ready()
+
+    async def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._queue is not None:
+            while not self._queue.empty():
+                _, future = self._queue.get_nowait()
+                future.cancel()
+        self._loop = self._queue = None
+        await self.encoder.close()
+
+
+_encoder: Encoder | None = None
+
+
+def get_encoder() -> Encoder:
+    """The encoder of this process: the local model, or the embedding workers."""
+    global _encoder
+    if _encoder is None:
+        if Config.EMBEDDING_MODE == "worker":
+            _encoder, concurrency = RemoteEncoder(), Config.EMBEDDING_WORKER_CONNECTIONS
+        else:
+            _encoder, concurrency = LocalEncoder(), Config.EMBEDDING_THREADS
+        if Config.EMBEDDING_BATCHING:
+            _encoder = BatchingEncoder(_encoder, concurrency=concurrency)
+    return _encoder
+
+
+async def close_encoder() -> None:
+    global _encoder
+    if _encoder is not None:
+        await _encoder.close()
+        _encoder = None
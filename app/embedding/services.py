@@ -2,24 +2,39 @@ from sqlmodel.ext.asyncio.session import AsyncSession
 from fastapi.responses import JSONResponse
 
 from app.auth.schema import UserModel
-from app.utility.doc_processor import DocProcessor
 from app.document.services import DocumentServices
 from app.document.schema import UpdateDocumentDB
 from app.core.model import Chunk
 from sqlmodel import select
 from fastapi import HTTPException
-import psycopg
-from pgvector.psycopg import register_vector
-from app.config import Config
+from app.core.session import vector_connection
+from app.embedding.encoder import get_encoder
+from uuid import UUID
+import asyncpg
 import numpy as np
 import logging
 
-PSYCOPG_CONNECT = Config.PSYCOPG_CONNECT
-doc_processor = DocProcessor()
 document_services = DocumentServices()
 logger = logging.getLogger(__name__)
 
 
+async def copy_embeddings(
+    conn: asyncpg.Connection,
+    username: str,
+    document_ids: list[UUID],
+    chunk_ids: list[UUID],
+    vectors: np.ndarray,
+    table: str = "embedding",
+) -> None:
+    """Binary COPY of embedding rows; vectors are encoded by the pgvector codec of ``conn``."""
+    records = zip([username] * len(chunk_ids), document_ids, chunk_ids, vectors)
+    await conn.copy_records_to_table(
+        table,
+        records=records,
+        columns=["username", "document_id", "chunk_id", "vector"],
+    )
+
+
 class EmbeddingServices:
     async def create_embedding(
         self, user: UserModel, document_id: str, session: AsyncSession
@@ -35,40 +50,16 @@ class EmbeddingServices:
         collect_chunk_id = [chunk.id for chunk in collect_chunks]
         collect_doc_id = [chunk.document_id for chunk in collect_chunks]
 
-        with psycopg.connect(PSYCOPG_CONNECT, autocommit=True) as conn:
-            register_vector(conn)
-            with conn.cursor() as cur:
-                chunk_count = 0
-                with cur.copy(
-                    "COPY embedding (username, document_id, chunk_id, vector) FROM STDIN WITH (FORMAT BINARY)",
-                ) as copy:
-                    copy.set_types(["text", "uuid", "uuid", "vector"])
-
-                    # Batch encode
-                    vectors = doc_processor.encode(texts=collect_content_chunks)
+        # Batch encode, in this process or on the embedding worker
+        vectors_np = await get_encoder().encode(collect_content_chunks)  # Shape: (num_chunks, embedding_dim)
 
-                    # Convert to Numpy array
-                    vectors_np = np.array(
-                        vectors, dtype=np.float32
-                    )  # Shape: (num_chunks, embedding_dim)
+        async with vector_connection() as conn:
+            await copy_embeddings(conn, user.username, collect_doc_id, collect_chunk_id, vectors_np)
+        chunk_count = len(collect_chunk_id)
 
-                    # Write to database (fixed zip: repeat document_id for each chunk
-
-                    zipper = zip(
-                        [user.username] * len(collect_content_chunks),
-                        collect_doc_id,
-                        collect_chunk_id,
-                        vectors_np,
-                    )
-                    for u_id, doc_id, chunk, vector in zipper:
-                        copy.write_row(
-                            [u_id, doc_id, chunk, vector.tolist()]
-                        ) # Convert back to list for pgvector
-                        chunk_count += 1
-
-            logger.info(f"Inserted {chunk_count} chunks from {document_id}")
-            _update_doc_status = await document_services.update_document(
-                document_id, user, UpdateDocumentDB(status="embedding"), session
-            )
-            await session.commit()
-            return JSONResponse(status_code=201, content={"message": "Document is embedded successfully"})
+        logger.info(f"Inserted {chunk_count} chunks from {document_id}")
+        _update_doc_status = await document_services.update_document(
+            document_id, user, UpdateDocumentDB(status="embedding"), session
+        )
+        await session.commit()
+        return JSONResponse(status_code=201, content={"message": "Document is embedded successfully"})
@@ -0,0 +1,104 @@
+"""
+Embedding worker: one process that owns the embedding model and serves
+encode requests from the API processes over a unix socket::
+
+    python -m app.embedding.worker --socket /run/embedding/embedding.sock
+
+Run one per socket in EMBEDDING_WORKER_SOCKETS and start the API with
+EMBEDDING_MODE=worker; the API processes then load no embedding model.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import signal
+from pathlib import Path
+
+from app.config import Config
+from app.core.log import close_logging, init_logging
+from app.core.model_registry import model_registry
+from app.embedding.encoder import BatchingEncoder, Encoder, LocalEncoder, read_frame, write_frame
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingWorker:
+    """Serves the framed protocol of ``app.embedding.encoder`` with a local encoder."""
+
+    def __init__(self, socket_path: str, encoder: Encoder | None = None):
+        self.socket_path = socket_path
+        if encoder is None:
+            # Requests from all API processes are batched together
+            encoder = LocalEncoder()
+            if Config.EMBEDDING_BATCHING:
+                encoder = BatchingEncoder(encoder, concurrency=Config.EMBEDDING_THREADS)
+        self.encoder = encoder
+        self._server: asyncio.Server | None = None
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    request, _ = await read_frame(reader)
+                except asyncio.IncompleteReadError:
+                    return  # client closed the connection
+                try:
+                    if request.get("op") == "encode":
+                        vectors = await self.encoder.encode(request["texts"])
+                        write_frame(writer, {}, vectors)
+                    elif request.get("op") == "ping":
+                        write_frame(writer, {"ok": await self.encoder.is_ready(), "model": Config.EMBEDDING_MODEL})
+                    else:
+                        write_frame(writer, {"error": f"unknown op {request.get('op')!r}"})
+                except Exception as e:
+                    logger.error(f"Encoding failed: {e!r}")
+                    write_frame(writer, {"error": repr(e)})
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def start(self) -> None:
+        path = Path(self.socket_path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.unlink(missing_ok=True)  # left over by a worker that did not exit cleanly
+        self._server = await asyncio.start_unix_server(self.handle, path=str(path))
+        os.chmod(path, 0o660)
+        logger.info(f"Embedding worker listening on {path}")
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            Path(self.socket_path).unlink(missing_ok=True)
+        await self.encoder.close()
+
+
+async def serve(socket_path: str) -> None:
+    worker = EmbeddingWorker(socket_path)
+    await worker.start()
+    # Accept connections right away; pings report not ready until warmed up
+    await model_registry.warmup()
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    await stop.wait()
+    await worker.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--socket", default=Config.EMBEDDING_WORKER_SOCKETS[0])
+    args = parser.parse_args()
+    init_logging()
+    try:
+        asyncio.run(serve(args.socket))
+    finally:
+        close_logging()
+
+
+if __name__ == "__main__":
+    main()
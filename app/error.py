@@ -1,8 +1,11 @@
+import math
 from typing import Any, Callable
 from fastapi.responses import JSONResponse
 from fastapi.requests import Request
 from fastapi import FastAPI, status
 
+from app.config import Config
+
 
 class ExceptionRegister(Exception):
     """This is the base class for all exceptions"""
@@ -29,15 +32,60 @@ class UseNotFound(ExceptionRegister):
 
     pass
 
+class LLMQueueFull(ExceptionRegister):
+    """Client already has the maximum number of chat requests queued"""
+
+    pass
+
+class LLMServiceBusy(ExceptionRegister):
+    """The LLM wait queue is full"""
+
+    pass
+
+class UnknownLLMProvider(ExceptionRegister):
+    """The requested LLM provider is not configured"""
+
+    pass
+
+class PasswordHashingBusy(ExceptionRegister):
+    """Too many password hashes are waiting for the hashing pool"""
+
+    pass
+
+class EmbeddingUnavailable(ExceptionRegister):
+    """The embedding worker could not be reached or failed to encode"""
+
+    pass
+
+class RateLimitExceeded(ExceptionRegister):
+    """Client used up its rate limit bucket"""
+
+    def __init__(self, limit: str, retry_after: float):
+        super().__init__(limit, retry_after)
+        self.limit = limit
+        self.retry_after = retry_after
+
 def create_exception_handler(
-    status_code: int, detail: Any
+    status_code: int, detail: Any, headers: dict[str, str] | None = None
 ) -> Callable[[Request, Exception], JSONResponse]:
     async def exception_handler(requests: Request, exc: ExceptionRegister):
-        return JSONResponse(content=detail, status_code=status_code)
+        return JSONResponse(content=detail, status_code=status_code, headers=headers)
 
     return exception_handler
 
 
+async def rate_limit_exception_handler(request: Request, exc: RateLimitExceeded):
+    return JSONResponse(
+        content={
+            "message": "Rate limit exceeded, try again later",
+            "error_code": "rate_limit_exceeded",
+            "limit": exc.limit,
+        },
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        headers={"Retry-After": str(max(1, math.ceil(exc.retry_after)))},
+    )
+
+
 def register_all_errors(app: FastAPI):
     app.add_exception_handler(
         EmailAlreadyExist,
@@ -83,4 +131,65 @@ def register_all_errors(app: FastAPI):
                 "error_code": "username_already_exist"
             }
         )
-    )
\ No newline at end of file
+    )
+
+    app.add_exception_handler(
+        LLMQueueFull,
+        create_exception_handler(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail={
+                "message": "Too many chat requests waiting, try again later",
+                "error_code": "llm_queue_full"
+            },
+            headers={"Retry-After": str(Config.LLM_RETRY_AFTER_SECONDS)}
+        )
+    )
+
+    app.add_exception_handler(
+        LLMServiceBusy,
+        create_exception_handler(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail={
+                "message": "Chat service is busy, try again later",
+                "error_code": "llm_service_busy"
+            },
+            headers={"Retry-After": str(Config.LLM_RETRY_AFTER_SECONDS)}
+        )
+    )
+
+    app.add_exception_handler(
+        UnknownLLMProvider,
+        create_exception_handler(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={
+                "message": "Unknown LLM provider",
+                "error_code": "unknown_llm_provider"
+            }
+        )
+    )
+
+    app.add_exception_handler(
+        PasswordHashingBusy,
+        create_exception_handler(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail={
+                "message": "Too many password operations in progress, try again later",
+                "error_code": "password_hashing_busy"
+            },
+            headers={"Retry-After": "1"}
+        )
+    )
+
+    app.add_exception_handler(
+        EmbeddingUnavailable,
+        create_exception_handler(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail={
+                "message": "Embedding service is unavailable, try again later",
+                "error_code": "embedding_unavailable"
+            },
+            headers={"Retry-After": "5"}
+        )
+    )
+
+    app.add_exception_handler(RateLimitExceeded, rate_limit_exception_handler)
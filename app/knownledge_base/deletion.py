@@ -0,0 +1,136 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
+from uuid import UUID
+
+from redis.asyncio.lock import Lock
+from redis.exceptions import LockError
+from sqlalchemy import delete, func
+from sqlmodel import select
+
+from app.config import Config
+from app.core.model import Document, KnowledgeBase
+from app.core.redis import get_redis
+from app.core.session import AsyncSessionLocal
+from app.core.storage import get_storage
+from app.document.services import unreferenced_object_paths
+
+logger = logging.getLogger(__name__)
+
+
+class KnowledgeBaseDeletion:
+    """
+    Background deletion of knowledge bases too large to delete in one request.
+
+    Documents are deleted ``batch_size`` at a time, one transaction per batch;
+    their chunks and embeddings go with them through ON DELETE CASCADE, and
+    their MinIO objects are removed once the batch is committed, except those
+    another document still references. The knowledge
+    base row is deleted last, so the KB stays visible until the job finishes.
+
+    Progress is kept in the Redis hash ``kb_deletion:{kb_id}`` for
+    ``KB_DELETE_STATUS_TTL`` seconds, and a lock key makes sure one job runs per
+    KB across all processes. A job interrupted by a restart leaves the KB with
+    the documents not deleted yet; deleting it again resumes from there once the
+    lock has expired.
+    """
+
+    def __init__(self, batch_size: int | None = None):
+        self.batch_size = batch_size or Config.KB_DELETE_BATCH_SIZE
+        self._tasks: dict[UUID, asyncio.Task] = {}
+
+    @staticmethod
+    def status_key(kb_id: UUID) -> str:
+        return f"kb_deletion:{kb_id}"
+
+    async def status(self, kb_id: UUID) -> dict | None:
+        status = await get_redis().hgetall(self.status_key(kb_id))
+        return status or None
+
+    async def start(self, kb_id: UUID) -> dict:
+        """Start deleting ``kb_id`` unless a job for it is already running; returns its status."""
+        r = get_redis()
+        lock = r.lock(f"{self.status_key(kb_id)}:lock", timeout=Config.KB_DELETE_LOCK_TTL)
+        if await lock.acquire(blocking=False):
+            async with AsyncSessionLocal() as session:
+                documents_total = await session.scalar(
+                    select(func.count()).select_from(Document).where(Document.knowledge_base_id == kb_id)
+                )
+            status = {
+                "kb_id": str(kb_id),
+                "status": "running",
+                "documents_total": documents_total,
+                "documents_deleted": 0,
+                "objects_removed": 0,
+                "objects_failed": 0,
+                "started_at": datetime.now(timezone.utc).isoformat(),
+            }
+            async with r.pipeline(transaction=True) as pipe:
+                pipe.delete(self.status_key(kb_id))
+                pipe.hset(self.status_key(kb_id), mapping=status)
+                pipe.expire(self.status_key(kb_id), Config.KB_DELETE_STATUS_TTL)
+                await pipe.execute()
+            self._tasks[kb_id] = asyncio.create_task(self.run(kb_id, lock))
+        return await self.status(kb_id)
+
+    async def _delete_batch(self, kb_id: UUID) -> tuple[int, list[str]]:
+        """
+        Delete the next batch of documents and return how many were deleted with
+        the object paths no other document still references, or delete the KB
+        itself and return nothing once no documents are left.
+        """
+        async with AsyncSessionLocal() as session:
+            rows = (await session.exec(
+                select(Document.id, Document.object_path)
+                .where(Document.knowledge_base_id == kb_id)
+                .limit(self.batch_size)
+            )).all()
+            if rows:
+                await session.execute(delete(Document).where(Document.id.in_([row.id for row in rows])))
+            else:
+                await session.execute(delete(KnowledgeBase).where(KnowledgeBase.id == kb_id))
+            await session.commit()
+            object_paths = await unreferenced_object_paths(session, [row.object_path for row in rows])
+        return len(rows), object_paths
+
+    async def run(self, kb_id: UUID, lock: Lock) -> None:
+        r = get_redis()
+        key = self.status_key(kb_id)
+        try:
+            while True:
+                deleted, object_paths = await self._delete_batch(kb_id)
+                if not deleted:
+                    break
+                removed, failed = await get_storage().remove_objects(object_paths)
+                # Fails when the lock expired and another job may have taken over
+                await lock.reacquire()
+                async with r.pipeline(transaction=True) as pipe:
+                    pipe.hincrby(key, "documents_deleted", deleted)
+                    pipe.hincrby(key, "objects_removed", removed)
+                    pipe.hincrby(key, "objects_failed", failed)
+                    await pipe.execute()
+            await r.hset(key, mapping={"status": "done", "finished_at": datetime.now(timezone.utc).isoformat()})
+            logger.info(f"Knowledge base {kb_id} deleted")
+        except LockError as e:
+            # The status now belongs to the job holding the lock
+            logger.warning(f"Deleting knowledge base {kb_id} lost its lock, stopped: {e!r}")
+        except (Exception, asyncio.CancelledError) as e:
+            logger.error(f"Deleting knowledge base {kb_id} failed: {e!r}")
+            await r.hset(key, mapping={"status": "failed", "error": repr(e)})
+            if isinstance(e, asyncio.CancelledError):
+                raise
+        finally:
+            try:
+                await lock.release()
+            except LockError:
+                pass  # expired; another job's lock is left alone
+            self._tasks.pop(kb_id, None)
+
+    async def stop(self) -> None:
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+kb_deletion = KnowledgeBaseDeletion()
@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends, status
 from fastapi.responses import JSONResponse
 from app.core.dependency import SessionDep
 from fastapi_pagination import Page
-from app.knownledge_base.schema import KnowledgeBaseResponse, CreateKnowledgeBase
+from app.knownledge_base.schema import KnowledgeBaseResponse, CreateKnowledgeBase, KnowledgeBaseDeletionStatus
 from app.knownledge_base.services import KnownledgeBaseService
 from app.auth.dependency import AccessTokenBearer
 from typing import Annotated
@@ -44,8 +44,17 @@ async def update_knowledge_base(kb_id: str, user: Annotated[UserModel, Depends(g
 
 @kb_router.delete("/{kb_id}", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(AccessTokenBearer())])
 async def delete_knowledge_base(session: SessionDep, kb_id: str):
-    kb = await kb_services.delete_knowledge_base(kb_id, session)
-    if kb is None:
+    deletion = await kb_services.delete_knowledge_base(kb_id, session)
+    if deletion is None:
         return JSONResponse(content={"message": "Knowledge is deleted!"})
-    else:
-        return kb
+    # Large knowledge base: deleted in the background, follow GET /{kb_id}/deletion
+    return JSONResponse(
+        status_code=status.HTTP_202_ACCEPTED,
+        content=KnowledgeBaseDeletionStatus.model_validate(deletion).model_dump(mode="json"),
+    )
+
+
+@kb_router.get("/{kb_id}/deletion", response_model=KnowledgeBaseDeletionStatus,
+               dependencies=[Depends(AccessTokenBearer())])
+async def get_knowledge_base_deletion(kb_id: str):
+    return await kb_services.get_deletion_status(kb_id)
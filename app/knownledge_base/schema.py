@@ -5,9 +5,22 @@ from datetime import datetime
 class CreateKnowledgeBase(BaseModel):
     name: str = Field(default=None, max_length=64)
     description: str = Field(default=None, max_length=1024)
+    llm_provider: str | None = Field(default=None, max_length=64)
 
 class KnowledgeBaseResponse(CreateKnowledgeBase):
     id: UUID
     username: str
     created_at: datetime
     updated_at: datetime
+
+
+class KnowledgeBaseDeletionStatus(BaseModel):
+    kb_id: UUID
+    status: str  # running, done or failed
+    documents_total: int
+    documents_deleted: int
+    objects_removed: int
+    objects_failed: int
+    started_at: datetime
+    finished_at: datetime | None = None
+    error: str | None = None
@@ -1,19 +1,26 @@
 from app.knownledge_base.schema import CreateKnowledgeBase, KnowledgeBaseResponse
+from app.knownledge_base.deletion import kb_deletion
 from sqlmodel.ext.asyncio.session import AsyncSession
-from app.core.model import KnowledgeBase
+from app.core.model import Chunk, Document, KnowledgeBase
+from app.core.storage import remove_objects_in_background
+from app.document.services import unreferenced_object_paths
+from app.config import Config
 from uuid import UUID
 from fastapi import HTTPException, Depends
-from sqlmodel import desc, select
+from sqlmodel import desc, func, select
 from fastapi_pagination import Page
 from fastapi_pagination.ext.sqlmodel import apaginate
 from typing import Annotated
 from app.auth.schema import UserModel
+from app.llm_model.providers import get_provider
 
 
 class KnownledgeBaseService:
     async def create_knowledge_base(
         self, user: UserModel, new_kb: CreateKnowledgeBase, session: AsyncSession
     ):
+        if new_kb.llm_provider is not None:
+            get_provider(new_kb.llm_provider)  # reject unknown providers
         data_dict = new_kb.model_dump()
         data_dict["username"] = user.username
         new_kb = KnowledgeBase(**data_dict)
@@ -39,6 +46,8 @@ class KnownledgeBaseService:
         kb_item = await self.get_knowledge_base(
             kb_id, session
         )
+        if data_update.llm_provider is not None:
+            get_provider(data_update.llm_provider)  # reject unknown providers
         data_update = data_update.model_dump()
         data_update["username"] = user.username
         for key, value in data_update.items():
@@ -46,8 +55,43 @@ class KnownledgeBaseService:
         await session.commit()
         return kb_item
 
-    async def delete_knowledge_base(self, kb_id: str, session: AsyncSession):
+    async def delete_knowledge_base(self, kb_id: str, session: AsyncSession) -> dict | None:
+        """
+        Delete a knowledge base with its documents, chunks and embeddings.
+
+        Returns None when it was deleted right away, or the status of the
+        background deletion job when the KB has more than
+        KB_DELETE_INLINE_MAX_CHUNKS chunks.
+        """
         kb_item = await self.get_knowledge_base(kb_id, session)
+
+        # Count no further than the threshold, the answer is only "small or not"
+        limited = (
+            select(Chunk.id)
+            .join(Document, Chunk.document_id == Document.id)
+            .where(Document.knowledge_base_id == kb_item.id)
+            .limit(Config.KB_DELETE_INLINE_MAX_CHUNKS + 1)
+            .subquery()
+        )
+        chunk_count = await session.scalar(select(func.count()).select_from(limited))
+        if chunk_count > Config.KB_DELETE_INLINE_MAX_CHUNKS:
+            return await kb_deletion.start(kb_item.id)
+
+        object_paths = (await session.exec(
+            select(Document.object_path).where(Document.knowledge_base_id == kb_item.id)
+        )).all()
+        # One DELETE; documents, chunks and embeddings follow through ON DELETE CASCADE
         await session.delete(kb_item)
         await session.commit()
+        remove_objects_in_background(await unreferenced_object_paths(session, object_paths))
         return None
+
+    async def get_deletion_status(self, kb_id: str) -> dict:
+        try:
+            kb_uuid = UUID(kb_id)
+        except ValueError:
+            raise HTTPException(status_code=404, detail="Knowledge base deletion not found")
+        status = await kb_deletion.status(kb_uuid)
+        if status is None:
+            raise HTTPException(status_code=404, detail="Knowledge base deletion not found")
+        return status
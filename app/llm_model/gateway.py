@@ -0,0 +1,207 @@
+import asyncio
+import logging
+import time
+from collections import deque
+
+from app.config import Config
+from app.core.metrics import LLM_IN_FLIGHT, LLM_QUEUE_DEPTH, LLM_QUEUE_WAIT, LLM_REJECTED
+from app.error import LLMQueueFull, LLMServiceBusy
+from app.llm_model.providers import LLMProvider
+
+logger = logging.getLogger(__name__)
+
+
+class Ticket:
+    """A place in the LLM gateway. Use as ``async with ticket:`` around the LLM calls."""
+
+    def __init__(self, gateway: "LLMGateway", tenant: str, position: int):
+        self.gateway = gateway
+        self.tenant = tenant
+        self.position = position  # 0 means admitted without waiting, otherwise approximate
+        self.enqueued_at = time.perf_counter()
+        self.granted: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.entered = False
+        self.handed_off = False
+        self.released = False
+        self._reclaim_handle: asyncio.TimerHandle | None = None
+
+    async def __aenter__(self) -> "Ticket":
+        self.entered = True
+        if self._reclaim_handle is not None:
+            self._reclaim_handle.cancel()
+        if self.released:
+            # The slot was reclaimed before the stream started; wait for a new one
+            self.gateway._requeue(self)
+        try:
+            await self.granted
+        except asyncio.CancelledError:
+            # Client went away while waiting
+            self.gateway._cancel(self)
+            raise
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        self.gateway._release(self)
+
+    def hand_off(self) -> None:
+        """
+        Mark the ticket as handed to the response stream. From here on an unused
+        slot is reclaimed after ``admission_grace`` seconds, in case the stream
+        never starts because the client went away before the body was sent.
+        """
+        self.handed_off = True
+        if self.granted.done() and not self.released:
+            self.gateway._arm_reclaim(self)
+
+    def release(self) -> None:
+        """Give the place back without using it, whether it was granted yet or not."""
+        self.gateway._cancel(self)
+
+
+class LLMGateway:
+    """
+    Admission control for one LLM provider.
+
+    At most ``max_concurrency`` requests talk to the model at once. Others wait in
+    per-tenant FIFO queues that are served round-robin, so one user or API key
+    cannot push everybody else to the back. When a tenant already has
+    ``max_queued_per_tenant`` requests waiting it gets a 429, and when the whole
+    queue is full everybody gets a 503.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrency: int,
+        max_queue: int,
+        max_queued_per_tenant: int,
+        admission_grace: float,
+    ):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_queued_per_tenant = max_queued_per_tenant
+        self.admission_grace = admission_grace
+
+        self.active = 0
+        self.waiting = 0
+        self._queues: dict[str, deque[Ticket]] = {}
+        self._tenants: deque[str] = deque()  # round-robin order of tenants with waiters
+
+    def enqueue(self, tenant: str) -> Ticket:
+        """Take a place in the queue, or fail fast when there is no room."""
+        if self.active < self.max_concurrency and self.waiting == 0:
+            ticket = Ticket(self, tenant, position=0)
+            self._grant(ticket)
+            return ticket
+
+        if self.waiting >= self.max_queue:
+            LLM_REJECTED.labels(self.name, "queue_full").inc()
+            raise LLMServiceBusy()
+
+        queue = self._queues.get(tenant)
+        if queue is not None and len(queue) >= self.max_queued_per_tenant:
+            LLM_REJECTED.labels(self.name, "tenant_limit").inc()
+            raise LLMQueueFull()
+
+        if queue is None:
+            queue = self._queues[tenant] = deque()
+            self._tenants.append(tenant)
+        ticket = Ticket(self, tenant, position=self.waiting + 1)
+        queue.append(ticket)
+        self.waiting += 1
+        LLM_QUEUE_DEPTH.labels(self.name).set(self.waiting)
+        logger.info(f"LLM request queued for {tenant} at position {ticket.position}")
+        return ticket
+
+    def _grant(self, ticket: Ticket) -> None:
+        self.active += 1
+        LLM_IN_FLIGHT.labels(self.name).set(self.active)
+        LLM_QUEUE_WAIT.labels(self.name).observe(time.perf_counter() - ticket.enqueued_at)
+        ticket.granted.set_result(None)
+        if ticket.handed_off:
+            self._arm_reclaim(ticket)
+
+    def _arm_reclaim(self, ticket: Ticket) -> None:
+        # The stream that owns this ticket may never start (client disconnected
+        # before the body was sent), so do not hold the slot forever.
+        if not ticket.entered and ticket._reclaim_handle is None:
+            ticket._reclaim_handle = asyncio.get_running_loop().call_later(
+                self.admission_grace, self._reclaim, ticket
+            )
+
+    def _reclaim(self, ticket: Ticket) -> None:
+        if not ticket.entered and not ticket.released:
+            logger.warning(f"Reclaiming unused LLM slot of {ticket.tenant}")
+            self._release(ticket)
+
+    def _release(self, ticket: Ticket) -> None:
+        if ticket.released:
+            return
+        ticket.released = True
+        self.active -= 1
+        LLM_IN_FLIGHT.labels(self.name).set(self.active)
+        self._dispatch()
+
+    def _requeue(self, ticket: Ticket) -> None:
+        """Queue a ticket whose slot was reclaimed again, ahead of its tenant's other requests."""
+        ticket.released = False
+        ticket.granted = asyncio.get_running_loop().create_future()
+        if self.active < self.max_concurrency and self.waiting == 0:
+            self._grant(ticket)
+            return
+        queue = self._queues.get(ticket.tenant)
+        if queue is None:
+            queue = self._queues[ticket.tenant] = deque()
+            self._tenants.append(ticket.tenant)
+        queue.appendleft(ticket)
+        self.waiting += 1
+        LLM_QUEUE_DEPTH.labels(self.name).set(self.waiting)
+
+    def _cancel(self, ticket: Ticket) -> None:
+        if ticket.granted.done():
+            self._release(ticket)
+            return
+        queue = self._queues.get(ticket.tenant)
+        if queue is not None and ticket in queue:
+            queue.remove(ticket)
+            self.waiting -= 1
+            if not queue:
+                del self._queues[ticket.tenant]
+                self._tenants.remove(ticket.tenant)
+            LLM_QUEUE_DEPTH.labels(self.name).set(self.waiting)
+        ticket.released = True
+
+    def _dispatch(self) -> None:
+        """Hand free slots to waiting tenants in round-robin order."""
+        while self.active < self.max_concurrency and self._tenants:
+            tenant = self._tenants.popleft()
+            queue = self._queues[tenant]
+            ticket = queue.popleft()
+            self.waiting -= 1
+            if queue:
+                self._tenants.append(tenant)
+            else:
+                del self._queues[tenant]
+            self._grant(ticket)
+        LLM_QUEUE_DEPTH.labels(self.name).set(self.waiting)
+
+
+_gateways: dict[str, LLMGateway] = {}
+
+
+def get_gateway(provider: LLMProvider) -> LLMGateway:
+    """Return the gateway for a provider, creating it from config on first use."""
+    gateway = _gateways.get(provider.name)
+    if gateway is None:
+        max_concurrency = provider.settings.max_concurrency or Config.LLM_MODEL_CONCURRENCY.get(
+            provider.model, Config.LLM_MAX_CONCURRENCY
+        )
+        gateway = _gateways[provider.name] = LLMGateway(
+            name=provider.name,
+            max_concurrency=max_concurrency,
+            max_queue=Config.LLM_MAX_QUEUE,
+            max_queued_per_tenant=Config.LLM_MAX_QUEUED_PER_TENANT,
+            admission_grace=Config.LLM_ADMISSION_GRACE_SECONDS,
+        )
+    return gateway
@@ -0,0 +1,156 @@
+import logging
+
+from langchain_core.messages import BaseMessage
+from redis.exceptions import LockError
+
+from app.config import Config
+from app.llm_model.gateway import get_gateway
+from app.llm_model.prompt import PromptBuilder, summary_prompt
+from app.llm_model.providers import LLMProvider
+from app.llm_model.think_filter import ANSWER, ThinkTagFilter
+from app.utility.chat_history import SimpleRedisHistory
+
+logger = logging.getLogger(__name__)
+
+SPEAKERS = {"human": "Người dùng", "ai": "Trợ lý"}
+
+
+class ConversationMemory:
+    """
+    Rolling summary memory on top of the Redis chat history.
+
+    The history list only keeps the most recent ``window`` messages. After each
+    bot reply, messages beyond the window are folded into the summary by the LLM
+    and trimmed from the head of the list. This runs in the background, off the
+    request path; the prompt gets the summary plus the recent messages.
+    """
+
+    def __init__(
+        self,
+        history: SimpleRedisHistory,
+        prompt_builder: PromptBuilder,
+        window: int | None = None,
+        max_tokens: int | None = None,
+    ):
+        self.history = history
+        self.prompt_builder = prompt_builder
+        self.window = window if window is not None else Config.CHAT_SUMMARY_WINDOW
+        self.max_tokens = max_tokens or Config.CHAT_SUMMARY_MAX_TOKENS
+
+    @property
+    def lock_key(self) -> str:
+        return f"{self.history.summary_key}:lock"
+
+    async def load(self, limit: int | None = None) -> tuple[str, list[BaseMessage]]:
+        """Current summary and the recent messages, oldest first."""
+        summary = await self.history.get_summary()
+        messages = await self.history.get_messages(limit=limit)
+        return summary, messages
+
+    async def fold(self, provider: LLMProvider, tenant: str) -> bool:
+        """
+        Fold the messages beyond the window into the summary.
+
+        Skipped when another fold for the chat is running, or when the LLM is too
+        busy; the messages stay in the list and are folded on a later turn.
+        """
+        r = self.history.r
+        lock = r.lock(self.lock_key, timeout=Config.CHAT_SUMMARY_LOCK_TIMEOUT)
+        if not await lock.acquire(blocking=False):
+            return False
+        try:
+            summary, messages = await self.load()
+            overflow = len(messages) - self.window
+            if overflow <= 0:
+                return False
+            summary = await self._summarize(provider, tenant, summary, messages[:overflow])
+            if not await lock.owned():
+                # Expired during a slow call; another fold may have trimmed the list
+                logger.warning(f"Summary lock of chat {self.history.session_id} expired, fold discarded")
+                return False
+
+            # Messages are only appended at the tail, so trimming the head by the
+            # folded count is safe against replies written in the meantime.
+            async with r.pipeline(transaction=True) as pipe:
+                pipe.set(self.history.summary_key, summary, ex=self.history.ttl or None)
+                pipe.ltrim(self.history.key, overflow, -1)
+                await pipe.execute()
+            logger.info(f"Folded {overflow} messages into summary of chat {self.history.session_id}")
+            return True
+        except Exception as e:
+            logger.warning(f"Summary update for chat {self.history.session_id} failed: {e!r}")
+            return False
+        finally:
+            try:
+                await lock.release()
+            except LockError:
+                pass  # expired while the LLM was busy
+
+    async def rebuild(self, provider: LLMProvider, tenant: str, messages: list[BaseMessage]) -> str:
+        """
+        Recreate summary and recent history from the full conversation.
+
+        Args:
+            messages: Every message of the chat, oldest first, e.g. from the message table
+        """
+        r = self.history.r
+        recent = messages[-self.window:] if self.window else []
+        older = messages[: len(messages) - len(recent)]
+        async with r.lock(self.lock_key, timeout=Config.CHAT_SUMMARY_LOCK_TIMEOUT, blocking_timeout=30) as lock:
+            summary = ""
+            for batch in self._batches(older):
+                summary = await self._summarize(provider, tenant, summary, batch)
+                await lock.reacquire()  # the timeout covers one call, not the whole rebuild
+
+            async with r.pipeline(transaction=True) as pipe:
+                pipe.delete(self.history.key, self.history.summary_key)
+                if recent:
+                    pipe.rpush(self.history.key, *[self.history.serialize(m) for m in recent])
+                if summary:
+                    pipe.set(self.history.summary_key, summary)
+                if self.history.ttl:
+                    pipe.expire(self.history.key, self.history.ttl)
+                    pipe.expire(self.history.summary_key, self.history.ttl)
+                await pipe.execute()
+        logger.info(
+            f"Rebuilt summary of chat {self.history.session_id} from {len(older)} messages"
+        )
+        return summary
+
+    def _format(self, messages: list[BaseMessage]) -> str:
+        # A single very long message must not blow the summary prompt
+        budget = Config.PROMPT_HISTORY_MAX_TOKENS
+        return "\n".join(
+            f"{SPEAKERS.get(m.type, m.type)}: {self.prompt_builder.truncate(m.content, budget)}"
+            for m in messages
+        )
+
+    def _batches(self, messages: list[BaseMessage]) -> list[list[BaseMessage]]:
+        """Split messages into runs that fit one summary prompt."""
+        batches: list[list[BaseMessage]] = []
+        batch: list[BaseMessage] = []
+        tokens = 0
+        for message in messages:
+            cost = min(self.prompt_builder.count(message.content), Config.PROMPT_HISTORY_MAX_TOKENS)
+            if batch and tokens + cost > Config.PROMPT_HISTORY_MAX_TOKENS:
+                batches.append(batch)
+                batch, tokens = [], 0
+            batch.append(message)
+            tokens += cost
+        if batch:
+            batches.append(batch)
+        return batches
+
+    async def _summarize(
+        self, provider: LLMProvider, tenant: str, summary: str, messages: list[BaseMessage]
+    ) -> str:
+        prompt = summary_prompt.format_messages(
+            summary=summary or "(trống)", messages=self._format(messages)
+        )
+        think_filter = ThinkTagFilter()
+        pieces: list[str] = []
+        async with get_gateway(provider).enqueue(tenant):
+            async for text in provider.astream(prompt, operation="summary"):
+                pieces.extend(piece for kind, piece in think_filter.feed(text) if kind == ANSWER)
+        pieces.extend(piece for kind, piece in think_filter.flush() if kind == ANSWER)
+        return self.prompt_builder.truncate("".join(pieces), self.max_tokens)
@@ -0,0 +1,203 @@
+import logging
+from dataclasses import dataclass, field
+
+from langchain_core.messages import BaseMessage
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+
+from app.config import Config
+from app.core.model_registry import model_registry
+from app.utility.search import RetrievedChunk
+
+logger = logging.getLogger(__name__)
+
+# Prompts are laid out static-first: system prompt, then history (append only
+# between turns), then the per-turn context and question last. Keeping the
+# system prompt byte-identical across requests lets the runtime reuse its
+# prompt cache instead of re-running prefill on it.
+
+# Prompt to reformulate the query
+CONTEXTUALIZE_Q_SYSTEM_PROMPT = (
+    "Bạn nhận được lịch sử trò chuyện cùng với câu hỏi mới nhất của người dùng."
+    "nếu câu hỏi này phụ thuộc vào ngữ cảnh trước đó,"
+    "hãy viết lại nó thành một câu hỏi độc lập, có thể hiểu được mà không cần tham chiếu đến lịch sử."
+    "Không được trả lời câu hỏi, chỉ cần định dạng lại và trả về câu hỏi cuối cùng."
+)
+
+contextualize_q_prompt = ChatPromptTemplate.from_messages(
+    [
+        ("system", CONTEXTUALIZE_Q_SYSTEM_PROMPT),
+        MessagesPlaceholder("chat_history"),
+        ("human", "Dữ liệu tham khảo:\n{context}\n\nCâu hỏi:{input}"),
+    ]
+)
+
+# Prompt to generate the full response
+ANSWER_SYSTEM_PROMPT = (
+    "Bạn là một trợ lý AI chuyên cung cấp thông tin chính xác và chi tiết cho khách hàng. "
+    "Dựa trên câu hỏi đã được định dạng lại, lịch sử trò chuyện, và dữ liệu tham khảo, "
+    "hãy cung cấp một câu trả lời đầy đủ, chi tiết và dễ hiểu bằng tiếng Việt. "
+    "Đảm bảo câu trả lời bao quát tất cả các khía cạnh liên quan đến câu hỏi, "
+)
+
+answer_prompt = ChatPromptTemplate.from_messages(
+    [
+        ("system", ANSWER_SYSTEM_PROMPT),
+        MessagesPlaceholder("chat_history"),
+        (
+            "human",
+            "Dữ liệu tham khảo:\n{context}\n\nCâu hỏi: {reformulated_question}",
+        ),
+    ]
+)
+
+# Prompt to fold older messages into the rolling conversation summary
+SUMMARY_SYSTEM_PROMPT = (
+    "Bạn duy trì bản tóm tắt ngắn gọn của một cuộc trò chuyện giữa người dùng và trợ lý. "
+    "Kết hợp bản tóm tắt hiện tại với các tin nhắn mới thành một bản tóm tắt duy nhất, "
+    "giữ lại các sự kiện, yêu cầu, tên riêng và số liệu quan trọng. "
+    "Chỉ trả về bản tóm tắt, không giải thích thêm."
+)
+
+summary_prompt = ChatPromptTemplate.from_messages(
+    [
+        ("system", SUMMARY_SYSTEM_PROMPT),
+        (
+            "human",
+            "Tóm tắt hiện tại:\n{summary}\n\nTin nhắn mới:\n{messages}",
+        ),
+    ]
+)
+
+SUMMARY_PREFIX = "Tóm tắt cuộc trò chuyện trước đó: "
+
+
+@dataclass
+class PromptParts:
+    context: str
+    chat_history: list[tuple[str, str]]
+    fixed_tokens: int = 0
+    summary_tokens: int = 0
+    history_tokens: int = 0
+    context_tokens: int = 0
+    used_chunks: int = 0
+    used_messages: int = 0
+    dropped: dict[str, int] = field(default_factory=dict)
+
+    @property
+    def total_tokens(self) -> int:
+        return self.fixed_tokens + self.summary_tokens + self.history_tokens + self.context_tokens
+
+
+class PromptBuilder:
+    """
+    Pack retrieved chunks and chat history into a fixed token budget.
+
+    The system prompt and the question are always kept. The conversation summary,
+    if any, comes out of the history cap first, then history is packed newest
+    first in the rest of it, then chunks fill what is left in MMR rank order.
+    A chunk that does not fit is skipped in favour of smaller, lower ranked ones;
+    only the top chunk is truncated rather than dropped.
+    """
+
+    def __init__(
+        self,
+        tokenizer_name: str | None = None,
+        max_tokens: int | None = None,
+        history_max_tokens: int | None = None,
+    ):
+        self.tokenizer_name = tokenizer_name or Config.PROMPT_TOKENIZER or Config.EMBEDDING_MODEL
+        self.max_tokens = max_tokens or Config.PROMPT_MAX_TOKENS
+        self.history_max_tokens = history_max_tokens or Config.PROMPT_HISTORY_MAX_TOKENS
+
+    @property
+    def tokenizer(self):
+        # Loaded on first use (or by the lifespan warmup), not at import
+        return model_registry.tokenizer(self.tokenizer_name)
+
+    def count(self, text: str) -> int:
+        return len(self.tokenizer.encode(text, add_special_tokens=False, verbose=False))
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        ids = self.tokenizer.encode(text, add_special_tokens=False, verbose=False)
+        return self.tokenizer.decode(ids[:max_tokens], skip_special_tokens=True)
+
+    @staticmethod
+    def format_chunk(rank: int, chunk: RetrievedChunk) -> str:
+        """Compact context line with a source marker the model can cite."""
+        return f"[{rank}] ({chunk.file_name}) {chunk.content}"
+
+    def build(
+        self,
+        fixed_texts: list[str],
+        chunks: list[RetrievedChunk],
+        history: list[BaseMessage],
+        summary: str = "",
+    ) -> PromptParts:
+        """
+        Args:
+            fixed_texts: Parts that are always sent (system prompt, question, template text)
+            chunks: Retrieved chunks, best first
+            history: Previous messages, oldest first
+            summary: Rolling summary of the messages before ``history``
+        """
+        fixed_tokens = sum(self.count(text) for text in fixed_texts)
+        remaining = max(self.max_tokens - fixed_tokens, 0)
+        history_budget = min(self.history_max_tokens, remaining)
+
+        # Summary, sent as a system message ahead of the recent messages
+        summary_message: tuple[str, str] | None = None
+        summary_tokens = 0
+        if summary and history_budget > 0:
+            text = SUMMARY_PREFIX + summary
+            summary_tokens = self.count(text)
+            if summary_tokens > history_budget:
+                text = self.truncate(text, history_budget)
+                summary_tokens = self.count(text)
+            summary_message = ("system", text)
+            history_budget -= summary_tokens
+            remaining -= summary_tokens
+
+        # History, newest first, within what is left of its cap
+        kept_history: list[tuple[str, str]] = []
+        history_tokens = 0
+        for message in reversed(history):
+            cost = self.count(message.content)
+            if history_tokens + cost > history_budget:
+                break
+            kept_history.append((message.type, message.content))
+            history_tokens += cost
+        kept_history.reverse()
+        remaining -= history_tokens
+        used_messages = len(kept_history)
+        if summary_message is not None:
+            kept_history.insert(0, summary_message)
+
+        # Chunks, best first, in whatever is left
+        lines: list[str] = []
+        context_tokens = 0
+        for chunk in chunks:
+            line = self.format_chunk(len(lines) + 1, chunk)
+            cost = self.count(line) + 1  # newline separator
+            if context_tokens + cost > remaining:
+                if not lines and remaining > 0:
+                    line = self.truncate(line, remaining - 1)
+                    lines.append(line)
+                    context_tokens += self.count(line) + 1
+                continue
+            lines.append(line)
+            context_tokens += cost
+
+        return PromptParts(
+            context="\n".join(lines),
+            chat_history=kept_history,
+            fixed_tokens=fixed_tokens,
+            summary_tokens=summary_tokens,
+            history_tokens=history_tokens,
+            context_tokens=context_tokens,
+            used_chunks=len(lines),
+            used_messages=used_messages,
+            dropped={
+                "chunks": len(chunks) - len(lines),
+                "messages": len(history) - used_messages,
+            },
+        )
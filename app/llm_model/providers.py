@@ -0,0 +1,241 @@
+import asyncio
+import json
+from abc import ABC, abstractmethod
+import logging
+import time
+from contextlib import aclosing
+from typing import AsyncIterator
+
+import httpx
+from langchain_core.messages import BaseMessage
+
+from app.config import Config, LLMProviderSettings
+from app.core.http import get_http_client
+from app.core.metrics import LLM_STREAM_DURATION, LLM_TIME_TO_FIRST_TOKEN, LLM_TOKENS_PER_SECOND
+from app.error import UnknownLLMProvider
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+ROLES = {"system": "system", "human": "user", "ai": "assistant"}
+
+
+class LLMProviderError(Exception):
+    """The provider answered with an error instead of tokens"""
+
+    pass
+
+
+def to_chat_messages(messages: list[BaseMessage]) -> list[dict]:
+    """Convert langchain messages to the role/content dicts both APIs accept."""
+    return [{"role": ROLES.get(m.type, m.type), "content": m.content} for m in messages]
+
+
+class LLMProvider(ABC):
+    """
+    Streaming chat completion over the shared HTTP client.
+
+    Failed requests are retried with exponential backoff, but only while no
+    token has been yielded yet, so a client never sees a repeated prefix.
+    Time to first token, token rate and duration of every stream are
+    recorded by provider and ``operation``.
+    """
+
+    def __init__(self, name: str, settings: LLMProviderSettings):
+        self.name = name
+        self.settings = settings
+        self.model = settings.model
+        self.base_url = settings.base_url.rstrip("/")
+
+    @property
+    def timeout(self) -> httpx.Timeout:
+        return httpx.Timeout(self.settings.timeout, connect=self.settings.connect_timeout)
+
+    async def astream(self, messages: list[BaseMessage], operation: str = "chat") -> AsyncIterator[str]:
+        start = time.perf_counter()
+        first = None
+        deltas = 0
+        attempt = 0
+        while True:
+            started = False
+            try:
+                async with aclosing(self._stream(to_chat_messages(messages))) as stream:
+                    async for text in stream:
+                        if first is None:
+                            first = time.perf_counter()
+                            LLM_TIME_TO_FIRST_TOKEN.labels(self.name, operation).observe(first - start)
+                        started = True
+                        deltas += 1
+                        yield text
+                end = time.perf_counter()
+                LLM_STREAM_DURATION.labels(self.name, operation).observe(end - start)
+                if deltas > 1 and end > first:
+                    LLM_TOKENS_PER_SECOND.labels(self.name, operation).observe((deltas - 1) / (end - first))
+                return
+            except (httpx.TransportError, httpx.HTTPStatusError) as e:
+                retryable = (
+                    isinstance(e, httpx.TransportError)
+                    or e.response.status_code in RETRYABLE_STATUS
+                )
+                if started or not retryable or attempt >= self.settings.max_retries:
+                    raise
+                attempt += 1
+                delay = self.settings.retry_backoff * 2 ** (attempt - 1)
+                logger.warning(f"LLM provider {self.name} failed ({e!r}), retry {attempt} in {delay}s")
+                await asyncio.sleep(delay)
+
+    async def _post_stream(self, path: str, payload: dict, headers: dict | None = None) -> AsyncIterator[str]:
+        client = get_http_client()
+        async with client.stream(
+            "POST", f"{self.base_url}{path}", json=payload, headers=headers, timeout=self.timeout
+        ) as response:
+            if response.status_code >= 400:
+                await response.aread()
+                response.raise_for_status()
+            async for line in response.aiter_lines():
+                if line:
+                    yield line
+
+    @abstractmethod
+    def _stream(self, messages: list[dict]) -> AsyncIterator[str]:
+        """Yield text deltas of one completion. Implemented per API."""
+
+    async def warm(self, *system_prompts: str) -> bool:
+        return True
+
+    async def is_ready(self) -> bool:
+        return True
+
+
+class OllamaProvider(LLMProvider):
+    async def _stream(self, messages: list[dict]) -> AsyncIterator[str]:
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "stream": True,
+            "keep_alive": Config.LLM_KEEP_ALIVE,  # keep weights loaded between requests
+            "options": {
+                "temperature": self.settings.temperature,
+                "num_predict": self.settings.max_tokens,
+            },
+        }
+        async with aclosing(self._post_stream("/api/chat", payload)) as lines:
+            async for line in lines:
+                data = json.loads(line)
+                if data.get("error"):
+                    raise LLMProviderError(data["error"])
+                text = (data.get("message") or {}).get("content")
+                if text:
+                    yield text
+                if data.get("done"):
+                    break
+
+    async def warm(self, *system_prompts: str) -> bool:
+        """
+        Load the model into memory and prefill each system prompt once, in the
+        order a chat turn sends them, so the first user request neither pays the
+        load time nor a cold prompt cache.
+        """
+        try:
+            for system_prompt in system_prompts or (None,):
+                messages = [{"role": "system", "content": system_prompt}] if system_prompt else []
+                payload = {
+                    "model": self.model,
+                    "messages": messages,
+                    "stream": False,
+                    "keep_alive": Config.LLM_KEEP_ALIVE,
+                    "options": {"num_predict": 1},
+                }
+                response = await get_http_client().post(
+                    f"{self.base_url}/api/chat", json=payload, timeout=Config.LLM_WARMUP_TIMEOUT
+                )
+                response.raise_for_status()
+            logger.info(f"Model {self.model} is warm")
+            return True
+        except httpx.HTTPError as e:
+            logger.warning(f"Model {self.model} warmup failed: {e}")
+            return False
+
+    async def unload(self) -> None:
+        await get_http_client().post(
+            f"{self.base_url}/api/generate", json={"model": self.model, "keep_alive": 0}, timeout=self.timeout
+        )
+
+    async def is_ready(self) -> bool:
+        """Ask Ollama whether the model is currently resident in memory."""
+        try:
+            response = await get_http_client().get(f"{self.base_url}/api/ps", timeout=5)
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            logger.warning(f"Ollama readiness check failed: {e}")
+            return False
+        model = self.model if ":" in self.model else f"{self.model}:latest"
+        loaded = response.json().get("models") or []
+        return any(model in (m.get("name"), m.get("model")) for m in loaded)
+
+
+class OpenAICompatibleProvider(LLMProvider):
+    """Any server speaking the OpenAI chat completions API (vLLM, llama.cpp, OpenAI...)."""
+
+    @property
+    def headers(self) -> dict:
+        return {"Authorization": f"Bearer {self.settings.api_key}"} if self.settings.api_key else {}
+
+    async def _stream(self, messages: list[dict]) -> AsyncIterator[str]:
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "stream": True,
+            "temperature": self.settings.temperature,
+            "max_tokens": self.settings.max_tokens,
+        }
+        async with aclosing(self._post_stream("/chat/completions", payload, self.headers)) as lines:
+            async for line in lines:
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                chunk = json.loads(data)
+                if chunk.get("error"):
+                    raise LLMProviderError(chunk["error"])
+                for choice in chunk.get("choices") or []:
+                    text = (choice.get("delta") or {}).get("content")
+                    if text:
+                        yield text
+
+    async def is_ready(self) -> bool:
+        try:
+            response = await get_http_client().get(
+                f"{self.base_url}/models", headers=self.headers, timeout=5
+            )
+            return response.status_code == 200
+        except httpx.HTTPError as e:
+            logger.warning(f"LLM provider {self.name} readiness check failed: {e}")
+            return False
+
+
+PROVIDER_TYPES: dict[str, type[LLMProvider]] = {
+    "ollama": OllamaProvider,
+    "openai": OpenAICompatibleProvider,
+}
+
+
+def build_providers() -> dict[str, LLMProvider]:
+    """Providers from LLM_PROVIDERS, plus the local Ollama from OLLAMA_HOST/LLM_MODEL."""
+    settings = {
+        "ollama": LLMProviderSettings(type="ollama", base_url=Config.OLLAMA_HOST, model=Config.LLM_MODEL),
+        **Config.LLM_PROVIDERS,
+    }
+    return {name: PROVIDER_TYPES[s.type](name, s) for name, s in settings.items()}
+
+
+providers = build_providers()
+
+
+def get_provider(name: str | None = None) -> LLMProvider:
+    provider = providers.get(name or Config.LLM_DEFAULT_PROVIDER)
+    if provider is None:
+        raise UnknownLLMProvider()
+    return provider
@@ -1,13 +1,72 @@
 from fastapi import APIRouter, Depends
-from app.llm_model.services import generate_response
+from typing import Annotated
+from app.llm_model.services import generate_response, rebuild_summary, resolve_provider
+from app.llm_model.gateway import get_gateway
 from fastapi.responses import StreamingResponse
 from app.core.dependency import SessionDep
-from app.auth.dependency import AccessTokenBearer
+from app.auth.dependency import RateLimit, principal_key, principal_user
 
 
 conversation_router = APIRouter()
 
-@conversation_router.post("/{chat_id}", dependencies=[Depends(AccessTokenBearer())])
-async def chat_endpoint(chat_id: str, question: str, session: SessionDep):
-    event_stream = await generate_response(query=question, chat_id=chat_id, session=session)
-    return StreamingResponse(event_stream(), media_type="text/plain")
+
+def tenant_of(principal: dict) -> str:
+    """Fairness key in the LLM gateway: each API key queues on its own."""
+    return principal_key(principal)
+
+
+@conversation_router.post("/{chat_id}")
+async def chat_endpoint(
+    chat_id: str,
+    question: str,
+    session: SessionDep,
+    token_details: Annotated[dict, Depends(RateLimit("chat", output_tokens=True))],
+    provider: str | None = None,
+    kb_id: str | None = None,
+    reasoning: bool = False,
+):
+    user = await principal_user(token_details, session)
+    llm_provider = await resolve_provider(provider, kb_id, session, user.username)
+
+    # Admission control first, so a full queue is rejected before any work is done
+    ticket = get_gateway(llm_provider).enqueue(tenant_of(token_details))
+    try:
+        event_stream = await generate_response(
+            query=question,
+            chat_id=chat_id,
+            session=session,
+            provider=llm_provider,
+            ticket=ticket,
+            reasoning=reasoning,
+            caller=principal_key(token_details),
+        )
+    except Exception:
+        ticket.release()
+        raise
+    response = StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream" if reasoning else "text/plain",
+        headers={"X-Queue-Position": str(ticket.position)},
+    )
+    ticket.hand_off()
+    return response
+
+
+@conversation_router.post("/{chat_id}/summary")
+async def rebuild_chat_summary(
+    chat_id: str,
+    session: SessionDep,
+    token_details: Annotated[dict, Depends(RateLimit("summary", output_tokens=True))],
+    provider: str | None = None,
+    kb_id: str | None = None,
+):
+    """Rebuild the chat's rolling summary memory from its stored messages."""
+    user = await principal_user(token_details, session)
+    llm_provider = await resolve_provider(provider, kb_id, session, user.username)
+    return await rebuild_summary(
+        chat_id=chat_id,
+        session=session,
+        provider=llm_provider,
+        tenant=tenant_of(token_details),
+        username=user.username,
+    )
@@ -1,42 +1,130 @@
-from langchain_core.messages import HumanMessage, AIMessage
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_ollama import ChatOllama
+from fastapi import HTTPException
+from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
 from sqlmodel.ext.asyncio.session import AsyncSession
-from langchain_core.prompts import MessagesPlaceholder
 from uuid import UUID
 from app.utility.search import SearchServices
 from app.config import Config
 from app.message.services import MessageService
 from app.message.schema import MessageSchema
 from app.utility.chat_history import SimpleRedisHistory
+from app.llm_model.gateway import Ticket
+from app.llm_model.prompt import (
+    PromptBuilder,
+    ANSWER_SYSTEM_PROMPT,
+    answer_prompt,
+    contextualize_q_prompt,
+)
+from app.llm_model.providers import LLMProvider, get_provider
+from app.llm_model.think_filter import ANSWER, ThinkTagFilter
+from app.llm_model.memory import ConversationMemory
+from app.core.model import Chat, KnowledgeBase, Message
+from app.core.rate_limit import rate_limiter
+from app.core.metrics import STAGE_DURATION
+from app.core.session import AsyncSessionLocal
+import asyncio
 import logging
 import re
 
 logger = logging.getLogger("__name__")
 
-search_services = SearchServices(db=Config.PSYCOPG_CONNECT, vector_table="embedding")
+search_services = SearchServices(vector_table="embedding")
 message_services = MessageService()
+prompt_builder = PromptBuilder()
+
+# Keep references to fire-and-forget tasks so they are not garbage collected
+background_tasks: set[asyncio.Task] = set()
+
+
+def run_in_background(coro) -> asyncio.Task:
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
 
 # Remove thinking from llm model response
 def clean_think_tags(text: str) -> str:
     """Remove <think> and </think> tags and their contents from the text."""
     return re.sub(r'<think>.*?</think>', '', text, flags=re.DOTALL).strip()
 
-# LLM config
-llm = ChatOllama(
-    model=Config.LLM_MODEL,
-    base_url=Config.OLLAMA_HOST,
-    temperature=0.01,
-    num_predict=1024,
-    verbose=True,
-    validate_model_on_init=True, # Connection checking
-)
+def format_sse(event: str, text: str) -> str:
+    """One server-sent event; multi-line text becomes several data lines."""
+    data = "\n".join(f"data: {line}" for line in text.split("\n"))
+    return f"event: {event}\n{data}\n\n"
+
+async def resolve_provider(
+    provider: str | None, kb_id: str | None, session: AsyncSession, username: str
+) -> LLMProvider:
+    """
+    Pick the LLM provider: the request's choice, else the knowledge base's, else
+    the default. A given ``kb_id`` must be a knowledge base of ``username``.
+    """
+    if kb_id is not None:
+        try:
+            kb_uuid = UUID(kb_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid kb_id")
+        kb = await session.get(KnowledgeBase, kb_uuid)
+        if kb is None or kb.username != username:
+            raise HTTPException(status_code=404, detail="Knowledge base not found")
+        if provider is None:
+            provider = kb.llm_provider
+    return get_provider(provider)
+
+
+def to_history_messages(stored: list[Message]) -> list[BaseMessage]:
+    return [
+        HumanMessage(content=m.content) if m.role == "user" else AIMessage(content=m.content)
+        for m in stored
+    ]
+
+
+async def load_recent_history(chat_id: str, limit: int) -> list[BaseMessage]:
+    # Own session: the load is shared by concurrent requests for the chat and may
+    # outlive the request that started it
+    async with AsyncSessionLocal() as session:
+        stored = await message_services.get_recent_messages(chat_id, session, limit=limit)
+    return to_history_messages(stored)
+
+
+async def rebuild_summary(
+    chat_id: str, session: AsyncSession, provider: LLMProvider, tenant: str, username: str
+) -> dict:
+    """Recreate the rolling summary and recent history of a chat of ``username`` from the message table."""
+    try:
+        chat = await session.get(Chat, UUID(chat_id))
+    except ValueError:
+        chat = None
+    if chat is None or chat.username != username:
+        raise HTTPException(status_code=404, detail="Chat not found")
+    stored = await message_services.get_chat_history(chat_id, session)
+    messages = to_history_messages(stored)
+    history_service = SimpleRedisHistory(session_id=chat_id)
+    memory = ConversationMemory(history_service, prompt_builder)
+    summary = await memory.rebuild(provider, tenant, messages)
+    await rate_limiter.debit("llm_output_tokens", tenant, prompt_builder.count(summary))
+    return {
+        "chat_id": chat_id,
+        "summary": summary,
+        "messages": len(messages),
+        "recent_messages": min(len(messages), memory.window),
+    }
+
 
 async def generate_response(
     query: str,
     chat_id: str,
     session: AsyncSession,
+    provider: LLMProvider,
+    ticket: Ticket,
+    reasoning: bool = False,
+    caller: str | None = None,
 ):
+    """
+    Args:
+        reasoning: Stream <think> content as "reasoning" server-sent events next
+            to "answer" events. Otherwise only answer text is streamed.
+        caller: Principal whose LLM output-token budget pays for the reply
+    """
     # Validate chat_id
     try:
         chat_uuid = UUID(chat_id)
@@ -44,6 +132,13 @@ async def generate_response(
         logger.error(f"Invalid chat_id: {chat_id}")
         raise ValueError("Invalid chat_id")
 
+    # Refill the Redis history from the database if it expired, before the new
+    # question is stored so it is neither loaded nor added twice
+    history_service = SimpleRedisHistory(session_id=chat_id)
+    await history_service.rehydrate(
+        lambda: load_recent_history(chat_id, Config.CHAT_HISTORY_REHYDRATE_LIMIT)
+    )
+
     # Create user message in db
     chat_uuid = UUID(chat_id)
     user_message = await message_services.create_message(
@@ -55,57 +150,39 @@ async def generate_response(
         session=session,
     )
 
-    # Initialize Redis history
-    history_service = SimpleRedisHistory(
-        session_id=str(user_message.chat_id), redis_url=Config.REDIS_URL, ttl=3600
-    )
+    # Add it to the Redis history
     await history_service.add_message(HumanMessage(content=user_message.content))
+    memory = ConversationMemory(history_service, prompt_builder)
 
-    # Get history (limit to 3 messages)
-    messages = await history_service.get_messages(limit=3)
-    chat_history = [(m.type, m.content) for m in messages]
+    # Get summary and history, without the question just added
+    summary = ""
+    if Config.CHAT_MEMORY_MODE == "summary":
+        summary, messages = await memory.load(limit=Config.PROMPT_HISTORY_MAX_MESSAGES + 1)
+    else:
+        messages = await history_service.get_messages(limit=Config.PROMPT_HISTORY_MAX_MESSAGES + 1)
+    messages = messages[:-1]
     logger.info(f"Human message added to chat history with session_id: {chat_id} ")
 
     # Get context
-    context = await search_services.mmr_search(query=query, session=session)
-
-    # Prompt to reformulate the query
-    contextualize_q_system_prompt = (
-        "Bạn nhận được lịch sử trò chuyện cùng với câu hỏi mới nhất của người dùng."
-        "nếu câu hỏi này phụ thuộc vào ngữ cảnh trước đó,"
-        "hãy viết lại nó thành một câu hỏi độc lập, có thể hiểu được mà không cần tham chiếu đến lịch sử."
-        "Không được trả lời câu hỏi, chỉ cần định dạng lại và trả về câu hỏi cuối cùng."
-    )
+    chunks = await search_services.mmr_search(query=query, session=session) or []
 
-    contextualize_q_prompt = ChatPromptTemplate.from_messages(
-        [
-            ("system", contextualize_q_system_prompt),
-            MessagesPlaceholder("chat_history"),
-            ("human", "Câu hỏi:{input}\n\nDữ liệu tham khảo:\n{context}"),
-        ]
+    # Pack history and context into the token budget
+    prompt_parts = prompt_builder.build(
+        fixed_texts=[ANSWER_SYSTEM_PROMPT, f"Dữ liệu tham khảo:\n\n\nCâu hỏi: {query}"],
+        chunks=chunks,
+        history=messages,
+        summary=summary,
     )
-
-    # Prompt to generate the full response
-    answer_system_prompt = (
-        "Bạn là một trợ lý AI chuyên cung cấp thông tin chính xác và chi tiết cho khách hàng. "
-        "Dựa trên câu hỏi đã được định dạng lại, lịch sử trò chuyện, và dữ liệu tham khảo, "
-        "hãy cung cấp một câu trả lời đầy đủ, chi tiết và dễ hiểu bằng tiếng Việt. "
-        "Đảm bảo câu trả lời bao quát tất cả các khía cạnh liên quan đến câu hỏi, "
+    chat_history = prompt_parts.chat_history
+    context = prompt_parts.context
+    logger.info(
+        f"Prompt tokens for chat {chat_id}: total={prompt_parts.total_tokens} "
+        f"fixed={prompt_parts.fixed_tokens} "
+        f"summary={prompt_parts.summary_tokens} "
+        f"history={prompt_parts.history_tokens} ({prompt_parts.used_messages} messages) "
+        f"context={prompt_parts.context_tokens} ({prompt_parts.used_chunks} chunks) "
+        f"dropped={prompt_parts.dropped}"
     )
-    answer_prompt = ChatPromptTemplate.from_messages(
-        [
-            ("system", answer_system_prompt),
-            MessagesPlaceholder("chat_history"),
-            (
-                "human",
-                "Câu hỏi: {reformulated_question}\n\nDữ liệu tham khảo:\n{context}",
-            ),
-        ]
-    )
-
-    # Create chains
-    contextualize_chain = contextualize_q_prompt | llm
-    answer_chain = answer_prompt | llm
 
     inputs = {
         "chat_history": chat_history,
@@ -114,27 +191,48 @@ async def generate_response(
     }
 
     async def event_stream():
-        # Step 1: Reformulate the query
         reformulated_question = ""
-        async for chunk in contextualize_chain.astream(inputs):
-            text = chunk.content
-            if text:
-                reformulated_question += text
+        full_response = ""
+        try:
+            # Hold an LLM slot for both model calls of this turn
+            async with ticket:
+                # Step 1: Reformulate the query
+                with STAGE_DURATION.labels("rewrite_llm").time():
+                    async for text in provider.astream(
+                        contextualize_q_prompt.format_messages(**inputs), operation="rewrite"
+                    ):
+                        reformulated_question += text
 
-        reformulated_question = clean_think_tags(reformulated_question)
+                reformulated_question = clean_think_tags(reformulated_question)
 
-        # Step 2: Generate the full response
-        full_response = ""
-        answer_inputs = {
-            "chat_history": chat_history,
-            "reformulated_question": reformulated_question,
-            "context": context,
-        }
-        async for chunk in answer_chain.astream(answer_inputs):
-            text = chunk.content
-            if text:
-                full_response += text
-                yield text  # Stream the response to the client
+                # Step 2: Generate the full response
+                answer_inputs = {
+                    "chat_history": chat_history,
+                    "reformulated_question": reformulated_question,
+                    "context": context,
+                }
+                think_filter = ThinkTagFilter()
+                async for text in provider.astream(answer_prompt.format_messages(**answer_inputs), operation="answer"):
+                    full_response += text
+                    # Stream the response to the client, without reasoning tokens unless asked for
+                    for kind, piece in think_filter.feed(text):
+                        if reasoning:
+                            yield format_sse(kind, piece)
+                        elif kind == ANSWER:
+                            yield piece
+                for kind, piece in think_filter.flush():
+                    if reasoning:
+                        yield format_sse(kind, piece)
+                    elif kind == ANSWER:
+                        yield piece
+        finally:
+            # Charge what the model generated, also when the client went away
+            if caller is not None:
+                run_in_background(rate_limiter.debit(
+                    "llm_output_tokens",
+                    caller,
+                    prompt_builder.count(reformulated_question) + prompt_builder.count(full_response),
+                ))
 
         # Create bot message in db
         full_response = clean_think_tags(full_response)
@@ -151,4 +249,8 @@ async def generate_response(
         await history_service.add_message(AIMessage(content=bot_message.content))
         logger.info(f"AIbot message added to chat history with session_id: {chat_id} ")
 
+        # Fold older messages into the summary once the reply is out
+        if Config.CHAT_MEMORY_MODE == "summary":
+            run_in_background(memory.fold(provider, tenant=f"summary:{chat_id}"))
+
     return event_stream
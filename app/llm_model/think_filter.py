@@ -0,0 +1,77 @@
+from typing import Iterator, Literal
+
+OPEN_TAG = "<think>"
+CLOSE_TAG = "</think>"
+
+ANSWER = "answer"
+REASONING = "reasoning"
+
+Kind = Literal["answer", "reasoning"]
+
+
+def _partial_tag(text: str, tag: str) -> int:
+    """Length of the longest suffix of text that is a proper prefix of tag."""
+    for size in range(min(len(tag) - 1, len(text)), 0, -1):
+        if text.endswith(tag[:size]):
+            return size
+    return 0
+
+
+class ThinkTagFilter:
+    """
+    Incremental splitter for <think>...</think> blocks in a token stream.
+
+    Chunks are fed as they arrive and come back as (kind, text) pieces, where
+    kind is "answer" or "reasoning". A tag split across chunks is held back
+    until it can be decided. Answer text follows the same rules as
+    clean_think_tags: leading whitespace is dropped and trailing whitespace is
+    only released once more answer text follows it. A <think> that is never
+    closed turns the rest of the stream into reasoning.
+    """
+
+    def __init__(self):
+        self.in_think = False
+        self.started = False  # first non-whitespace answer text was emitted
+        self._buffer = ""
+        self._whitespace = ""
+
+    def feed(self, text: str) -> Iterator[tuple[Kind, str]]:
+        self._buffer += text
+        while self._buffer:
+            tag = CLOSE_TAG if self.in_think else OPEN_TAG
+            index = self._buffer.find(tag)
+            if index >= 0:
+                yield from self._emit(self._buffer[:index])
+                self._buffer = self._buffer[index + len(tag):]
+                self.in_think = not self.in_think
+                continue
+            # No full tag: keep back a possible tag prefix at the end
+            keep = _partial_tag(self._buffer, tag)
+            ready = self._buffer[: len(self._buffer) - keep]
+            self._buffer = self._buffer[len(ready):]
+            yield from self._emit(ready)
+            break
+
+    def flush(self) -> Iterator[tuple[Kind, str]]:
+        """Release what is still held at the end of the stream."""
+        buffer, self._buffer = self._buffer, ""
+        yield from self._emit(buffer)
+        self._whitespace = ""
+
+    def _emit(self, text: str) -> Iterator[tuple[Kind, str]]:
+        if not text:
+            return
+        if self.in_think:
+            yield REASONING, text
+            return
+        if not self.started:
+            text = text.lstrip()
+            if not text:
+                return
+            self.started = True
+        body = text.rstrip()
+        if not body:
+            self._whitespace += text
+            return
+        yield ANSWER, self._whitespace + body
+        self._whitespace = text[len(body):]
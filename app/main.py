@@ -1,4 +1,8 @@
-from fastapi import FastAPI
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, status
+from fastapi.responses import JSONResponse
 from app.error import register_all_errors
 from app.middleware import register_middleware
 from app.config import Config
@@ -12,11 +16,73 @@ from app.chat.routes import chat_router
 from app.llm_model.routes import conversation_router
 from app.message.routes import message_router
 from app.openapi.api_key import api_key_router
+from app.search.routes import search_router
+from app.core.metrics import metrics_response, mark_process_dead
+from app.core.log import init_logging, close_logging
+from app.llm_model.providers import get_provider
+from app.core.http import init_http_client, close_http_client
+from app.core.redis import copy_legacy_blocklist, init_redis, close_redis
+from app.core.storage import init_storage, close_storage
+from app.core.session import close_engine
+from app.message.writer import message_writer
+from app.auth.cache import sync_auth_cache
+from app.auth.api_key_usage import api_key_usage
+from app.knownledge_base.deletion import kb_deletion
+from app.document.sweeper import upload_sweeper
+from app.llm_model.prompt import ANSWER_SYSTEM_PROMPT, CONTEXTUALIZE_Q_SYSTEM_PROMPT
+from app.core.model_registry import model_registry
+from app.embedding.encoder import get_encoder, close_encoder
+from app.utility.security import shutdown_hash_executor
 
 
+logger = logging.getLogger(__name__)
 version_prefix = Config.VERSION
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    init_logging()
+    init_http_client()
+    init_redis()
+    try:
+        await init_storage().ensure_bucket()
+    except Exception as e:
+        # Retried by the first upload; reads do not need it
+        logger.warning(f"MinIO bucket check failed: {e!r}")
+    if Config.MESSAGE_WRITE_MODE == "write_behind":
+        message_writer.start()
+    # Before the auth cache loads the blocklist, so it includes the copied tokens
+    await copy_legacy_blocklist()
+    auth_sync = asyncio.create_task(sync_auth_cache())
+    api_key_usage.start()
+    upload_sweeper.start()
+    # Load the LLM and prefill the system prompts of both calls of a chat turn
+    # in the background; the readiness endpoint reports 503 until the model is resident.
+    warmup = asyncio.create_task(get_provider().warm(CONTEXTUALIZE_Q_SYSTEM_PROMPT, ANSWER_SYSTEM_PROMPT))
+    # Embedding model and tokenizers, off the event loop
+    model_warmup = (
+        asyncio.create_task(model_registry.warmup(embedder=Config.EMBEDDING_MODE == "local"))
+        if Config.MODEL_WARMUP else None
+    )
+    yield
+    warmup.cancel()
+    if model_warmup is not None:
+        model_warmup.cancel()
+    auth_sync.cancel()
+    await api_key_usage.stop()
+    await upload_sweeper.stop()
+    await kb_deletion.stop()
+    await message_writer.stop()  # flush queued messages before Redis goes away
+    await close_http_client()
+    await close_redis()
+    await close_storage()
+    await close_encoder()
+    await close_engine()
+    shutdown_hash_executor()
+    mark_process_dead()
+    close_logging()
+
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Chatbot Backend with RAG",
@@ -33,6 +99,7 @@ This is a backend service for a **Retrieval-Augmented Generation (RAG)** chatbot
         "name": "MIT License",
         "url": "https://opensource.org/licenses/MIT",
     },
+    lifespan=lifespan,
 )
 # Add middleware
 register_middleware(app)
@@ -50,6 +117,37 @@ async def health_check():
     return {"status": "Welcome to Chat API!"}
 
 
+# Liveness: the process serves requests; never depends on models or backends
+@app.get(f"/{version_prefix}/health/live", tags=["Health"])
+async def liveness_check():
+    return {"status": "alive"}
+
+
+# Readiness: the LLM and the embedding models are loaded (or the embedding
+# worker answers) and can serve without a cold start
+@app.get(f"/{version_prefix}/health/ready", tags=["Health"])
+async def readiness_check():
+    llm_loaded = await get_provider().is_ready()
+    models_loaded = (model_registry.ready or not Config.MODEL_WARMUP) and (
+        Config.EMBEDDING_MODE == "local" or await get_encoder().is_ready()
+    )
+    ready = llm_loaded and models_loaded
+    return JSONResponse(
+        status_code=status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={
+            "status": "ready" if ready else "not_ready",
+            "llm_loaded": llm_loaded,
+            "models_loaded": models_loaded,
+        },
+    )
+
+
+# Prometheus scrape endpoint
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return metrics_response()
+
+
 # Add route
 app.include_router(
     oauth_router, prefix=f"/{version_prefix}/oauth", tags=["authenticate"]
@@ -74,3 +172,6 @@ app.include_router(
 app.include_router(
     api_key_router, prefix=f"/{version_prefix}/api-key", tags=["api_key"]
 )
+app.include_router(
+    search_router, prefix=f"/{version_prefix}/search", tags=["search"]
+)
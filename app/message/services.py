@@ -5,21 +5,48 @@ from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlmodel import select, desc, delete
 from fastapi.responses import JSONResponse
 
+from app.config import Config
 from app.core.model import Message
-from fastapi_pagination.ext.sqlmodel import apaginate
+from app.message.writer import message_writer
+from app.core.pagination import keyset_paginate
 from app.message.schema import MessageSchema, MessageResponse
 
 
 class MessageService:
     async def get_messages(self, session:AsyncSession):
-        statement = select(Message).order_by(desc(Message.created_at))
-        return await apaginate(session, statement)
+        return await keyset_paginate(session, select(Message), Message)
 
     async def get_message_from_chat_id(self, chat_id: str, session:AsyncSession):
         statement = select(Message).where(Message.chat_id == UUID(chat_id))
-        return await apaginate(session, statement)
+        return await keyset_paginate(session, statement, Message, descending=False)
+
+    async def get_chat_history(self, chat_id: str, session: AsyncSession) -> list[Message]:
+        """Every message of a chat, oldest first."""
+        statement = (
+            select(Message)
+            .where(Message.chat_id == UUID(chat_id))
+            .order_by(Message.created_at, Message.id)
+        )
+        result = await session.exec(statement)
+        return list(result.all())
+
+    async def get_recent_messages(
+        self, chat_id: str, session: AsyncSession, limit: int
+    ) -> list[Message]:
+        """The last ``limit`` messages of a chat, oldest first."""
+        statement = (
+            select(Message)
+            .where(Message.chat_id == UUID(chat_id))
+            .order_by(desc(Message.created_at), desc(Message.id))
+            .limit(limit)
+        )
+        result = await session.exec(statement)
+        return list(reversed(result.all()))
 
     async def create_message(self, message: MessageSchema, session:AsyncSession):
+        if Config.MESSAGE_WRITE_MODE == "write_behind":
+            # Persisted later by the message writer, see app/message/writer.py
+            return await message_writer.append(message)
         data_dict = message.model_dump()
         new_message = Message(**data_dict)
         session.add(new_message)
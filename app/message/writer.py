@@ -0,0 +1,253 @@
+import asyncio
+import logging
+import os
+import socket
+from datetime import datetime, timezone
+from typing import Awaitable, Callable
+from uuid import UUID, uuid4
+
+import redis.asyncio as aioredis
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import DBAPIError, IntegrityError, InterfaceError, OperationalError
+
+from app.config import Config
+from app.core.model import Message
+from app.core.redis import get_redis
+from app.core.session import AsyncSessionLocal
+from app.message.schema import MessageSchema
+
+logger = logging.getLogger(__name__)
+
+MessageSink = Callable[[list[dict]], Awaitable[None]]
+
+# (entry id, stream fields, decoded row)
+Entry = tuple[str, dict, dict]
+
+
+async def insert_messages(rows: list[dict]) -> None:
+    """Insert a batch into the message table; rows whose id already exists are skipped."""
+    async with AsyncSessionLocal() as session:
+        statement = insert(Message).values(rows).on_conflict_do_nothing(index_elements=["id"])
+        await session.execute(statement)
+        await session.commit()
+
+
+class MessageWriter:
+    """
+    Write-behind persistence of chat messages.
+
+    ``append`` gives the message its id and created_at, adds it to a Redis
+    Stream and returns without touching Postgres. A background consumer (one per
+    process, all in one consumer group) reads the stream in batches, inserts each
+    batch into the message table and only then acknowledges and deletes the
+    entries.
+
+    Semantics:
+
+    * Durability: a message is accepted once XADD returns, so it is as durable as
+      Redis persistence (AOF) is configured. Postgres is written within about
+      ``flush_interval`` under normal load.
+    * Delivery is at least once. A batch that fails to insert stays pending and
+      is retried; entries left pending by a crashed process are claimed by
+      another consumer after ``claim_idle``. Ids are generated here, and the
+      insert skips ids that exist, so a retried batch never duplicates rows.
+    * Ordering: rows may be inserted in any order, but created_at is taken at
+      append time, so ordering a chat by created_at (as every reader does) gives
+      the order in which messages were appended.
+    * Reads are eventually consistent: until its batch is flushed, a message is
+      in the Redis chat history but not yet in the message endpoints.
+    * A message whose chat was deleted before the flush fails its foreign key;
+      it is dropped and logged instead of blocking the rest of the batch.
+    * An entry that cannot be decoded, or whose row fails for any other reason
+      than a lost connection, is moved to ``dead_letter_stream`` with its error
+      and acknowledged, so one bad entry cannot stall the stream.
+    * ``stop`` drains the stream before returning, so a clean shutdown leaves
+      nothing unwritten. After an unclean one, the entries stay in the stream
+      and are written after the next start.
+    """
+
+    def __init__(
+        self,
+        client: aioredis.Redis | None = None,
+        sink: MessageSink | None = None,
+        stream: str | None = None,
+        dead_letter_stream: str | None = None,
+        group: str | None = None,
+        consumer: str | None = None,
+        batch_size: int | None = None,
+        flush_interval: float | None = None,
+        claim_idle: float | None = None,
+        retry_delay: float = 1.0,
+    ):
+        self._client = client
+        self.sink = sink or insert_messages
+        self.stream = stream or Config.MESSAGE_STREAM
+        self.dead_letter_stream = dead_letter_stream or Config.MESSAGE_DEAD_LETTER_STREAM
+        self.group = group or Config.MESSAGE_STREAM_GROUP
+        self.consumer = consumer or f"{socket.gethostname()}-{os.getpid()}"
+        self.batch_size = batch_size or Config.MESSAGE_FLUSH_BATCH_SIZE
+        self.flush_interval = flush_interval or Config.MESSAGE_FLUSH_INTERVAL
+        self.claim_idle = claim_idle or Config.MESSAGE_CLAIM_IDLE
+        self.retry_delay = retry_delay
+
+        self._task: asyncio.Task | None = None
+        self._stopping = asyncio.Event()
+
+    @property
+    def r(self) -> aioredis.Redis:
+        return self._client or get_redis()
+
+    async def append(self, message: MessageSchema) -> Message:
+        """Queue a message for insertion and return it as it will be stored."""
+        new_message = Message(
+            id=uuid4(),
+            created_at=datetime.now(timezone.utc),
+            **message.model_dump(),
+        )
+        await self.r.xadd(
+            self.stream,
+            {
+                "id": str(new_message.id),
+                "chat_id": str(new_message.chat_id),
+                "role": new_message.role,
+                "content": new_message.content,
+                "created_at": new_message.created_at.isoformat(),
+            },
+        )
+        return new_message
+
+    def start(self) -> None:
+        if self._task is None:
+            self._stopping.clear()
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        """Stop consuming and write out everything still in the stream."""
+        if self._task is None:
+            return
+        self._stopping.set()
+        await self._task
+        self._task = None
+
+    async def run(self) -> None:
+        await self._ensure_group()
+        backlog = True  # entries already delivered to this consumer come first
+        while not self._stopping.is_set():
+            try:
+                if backlog:
+                    entries = await self._claim() or await self._read(pending=True)
+                    backlog = bool(entries)
+                else:
+                    # When idle, look for entries stuck on consumers that died
+                    entries = await self._read(pending=False) or await self._claim()
+                if entries:
+                    await self._flush(entries)
+            except Exception as e:
+                logger.error(f"Message write-behind failed, retrying in {self.retry_delay}s: {e!r}")
+                backlog = True
+                await asyncio.sleep(self.retry_delay)
+        await self.drain()
+
+    async def drain(self) -> None:
+        """Flush until the stream has nothing left for this consumer."""
+        await self._ensure_group()
+        try:
+            while entries := (
+                await self._claim() or await self._read(pending=True) or await self._read(pending=False, block=False)
+            ):
+                await self._flush(entries)
+        except Exception as e:
+            logger.error(f"Message write-behind could not drain on shutdown: {e!r}")
+
+    async def _ensure_group(self) -> None:
+        try:
+            await self.r.xgroup_create(self.stream, self.group, id="0", mkstream=True)
+        except aioredis.ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    async def _read(self, pending: bool, block: bool = True) -> list[tuple[str, dict | None]]:
+        response = await self.r.xreadgroup(
+            self.group,
+            self.consumer,
+            {self.stream: "0" if pending else ">"},
+            count=self.batch_size,
+            block=int(self.flush_interval * 1000) if block and not pending else None,
+        )
+        return response[0][1] if response else []
+
+    async def _claim(self) -> list[tuple[str, dict | None]]:
+        """Take over entries left pending by consumers that went away."""
+        response = await self.r.xautoclaim(
+            self.stream,
+            self.group,
+            self.consumer,
+            min_idle_time=int(self.claim_idle * 1000),
+            start_id="0-0",
+            count=self.batch_size,
+        )
+        return response[1]
+
+    async def _flush(self, entries: list[tuple[str, dict | None]]) -> None:
+        decoded: list[Entry] = []
+        dead: list[tuple[str, dict, Exception]] = []
+        for entry_id, fields in entries:
+            if not fields:
+                continue  # deleted from the stream while pending
+            try:
+                decoded.append((entry_id, fields, self.decode(fields)))
+            except (KeyError, ValueError) as e:
+                dead.append((entry_id, fields, e))
+        if decoded:
+            try:
+                await self.sink([row for _, _, row in decoded])
+            except DBAPIError as e:
+                if self.is_transient(e):
+                    raise
+                dead.extend(await self._flush_one_by_one(decoded))
+
+        ids = [entry_id for entry_id, _ in entries]
+        async with self.r.pipeline(transaction=True) as pipe:
+            for entry_id, fields, error in dead:
+                logger.error(f"Moved message entry {entry_id} to {self.dead_letter_stream}: {error!r}")
+                pipe.xadd(self.dead_letter_stream, {**fields, "entry_id": entry_id, "error": repr(error)})
+            pipe.xack(self.stream, self.group, *ids)
+            pipe.xdel(self.stream, *ids)
+            await pipe.execute()
+        logger.debug(f"Wrote {len(decoded)} messages")
+
+    async def _flush_one_by_one(self, entries: list[Entry]) -> list[tuple[str, dict, Exception]]:
+        """
+        Insert the rows of a failed batch one at a time, so the others are kept.
+        Returns the entries to dead-letter.
+        """
+        dead = []
+        for entry_id, fields, row in entries:
+            try:
+                await self.sink([row])
+            except IntegrityError as e:
+                # Usually the chat was deleted in the meantime
+                logger.warning(f"Dropped message {row['id']} of chat {row['chat_id']}: {e.orig!r}")
+            except DBAPIError as e:
+                if self.is_transient(e):
+                    raise
+                dead.append((entry_id, fields, e))
+        return dead
+
+    @staticmethod
+    def is_transient(error: DBAPIError) -> bool:
+        """Lost connections fail every row; the batch is retried instead."""
+        return isinstance(error, (OperationalError, InterfaceError)) or error.connection_invalidated
+
+    @staticmethod
+    def decode(fields: dict) -> dict:
+        return {
+            "id": UUID(fields["id"]),
+            "chat_id": UUID(fields["chat_id"]),
+            "role": fields["role"],
+            "content": fields["content"],
+            "created_at": datetime.fromisoformat(fields["created_at"]),
+        }
+
+
+message_writer = MessageWriter()
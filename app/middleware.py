@@ -1,25 +1,145 @@
 import logging
+import random
+import re
 import time
+from uuid import uuid4
 
-from fastapi import FastAPI, Request, status
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
+from app.config import Config
+from app.core.log import request_id_var
+from app.core.metrics import HTTP_IN_FLIGHT, HTTP_REQUEST_DURATION
 
-logger = logging.getLogger("uvicorn.access")
-logger.disabled = True
 
+# Replaced by AccessLogMiddleware
+logging.getLogger("uvicorn.access").disabled = True
+access_logger = logging.getLogger("app.access")
+
+REQUEST_ID_HEADER = b"x-request-id"
+# Ids from clients or proxies are kept when they are short and plain
+VALID_REQUEST_ID = re.compile(r"[A-Za-z0-9._:-]{1,128}")
+
+
+class AccessLogMiddleware:
+    """
+    One structured record per request, with its id, route, status, size and
+    duration until the last body chunk was sent (full stream duration for
+    streamed replies).
+
+    The request id comes from the X-Request-ID header, or is generated; it is
+    returned in the response, stored in ``request.state.request_id`` and set
+    in ``request_id_var`` for the log records and outbound LLM requests made
+    while handling the request. Records are sampled per route template with
+    ACCESS_LOG_SAMPLE_RATES; server errors and slow requests are always kept.
+    ACCESS_LOG_ENABLED only turns the records off, request ids are always set.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == REQUEST_ID_HEADER:
+                request_id = value.decode("latin-1")
+                break
+        if request_id is None or not VALID_REQUEST_ID.fullmatch(request_id):
+            request_id = uuid4().hex
+        scope.setdefault("state", {})["request_id"] = request_id
+        token = request_id_var.set(request_id)
+
+        status_code = 500
+        response_bytes = 0
+
+        async def send_with_request_id(message: Message) -> None:
+            nonlocal status_code, response_bytes
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = [*message.get("headers", ()), (REQUEST_ID_HEADER, request_id.encode())]
+            elif message["type"] == "http.response.body":
+                response_bytes += len(message.get("body", b""))
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            if Config.ACCESS_LOG_ENABLED:
+                self.log(scope, status_code, time.perf_counter() - start, response_bytes)
+            request_id_var.reset(token)
+
+    @staticmethod
+    def log(scope: Scope, status_code: int, duration: float, response_bytes: int) -> None:
+        route = scope.get("route")
+        route_path = route.path if route is not None else None
+        sample_rate = Config.ACCESS_LOG_SAMPLE_RATES.get(route_path, Config.ACCESS_LOG_SAMPLE_RATE)
+        always = status_code >= 500 or duration >= Config.ACCESS_LOG_SLOW_SECONDS
+        if not always and (sample_rate <= 0 or (sample_rate < 1 and random.random() >= sample_rate)):
+            return
+        client = scope.get("client")
+        access_logger.info(
+            f"{scope['method']} {scope['path']} {status_code} {duration * 1000:.1f}ms",
+            extra={"http": {
+                "method": scope["method"],
+                "path": scope["path"],
+                "route": route_path,
+                "status": status_code,
+                "duration_ms": round(duration * 1000, 2),
+                "response_bytes": response_bytes,
+                "client": f"{client[0]}:{client[1]}" if client else None,
+                "sample_rate": 1.0 if always else sample_rate,
+            }},
+        )
 
-def register_middleware(app: FastAPI):
 
-    @app.middleware("http")
-    async def custom_loggin(request: Request, call_next):
-        start_time = time.perf_counter()
-        response = await call_next(request)
-        processing_time = time.perf_counter() - start_time
-        message = f"{request.client.host}:{request.client.port} - {request.method} - {request.url.path} - {response.status_code} completed after {processing_time}s"
-        print(message)
-        return response
+class MetricsMiddleware:
+    """
+    Request latency by route template and status, and requests in flight.
+
+    Plain ASGI rather than ``@app.middleware("http")``: no extra task or
+    response wrapping per request, and a streamed response is timed until its
+    last chunk is sent, not until its headers are.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        method = scope["method"]
+        in_flight = HTTP_IN_FLIGHT.labels(method)
+        in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            in_flight.dec()
+            # Set by the router once a route matched; raw paths would be unbounded labels
+            route = scope.get("route")
+            HTTP_REQUEST_DURATION.labels(
+                method, route.path if route is not None else "unmatched", str(status_code)
+            ).observe(time.perf_counter() - start)
+
+
+def register_middleware(app: FastAPI):
 
     app.add_middleware(
         CORSMiddleware,
@@ -31,4 +151,10 @@ def register_middleware(app: FastAPI):
 
     app.add_middleware(
         TrustedHostMiddleware, allowed_hosts=["0.0.0.0", "localhost", "*"]
-    )
\ No newline at end of file
+    )
+
+    # Added last, so they run first: the access log outermost, so every other
+    # middleware sees the request id and is included in the logged duration,
+    # then the metrics, which include the time spent in the rest
+    app.add_middleware(MetricsMiddleware)
+    app.add_middleware(AccessLogMiddleware)
\ No newline at end of file
@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from app.auth.dependency import get_current_user, AccessTokenBearer
 from app.auth.services import APIKeyServices
 from fastapi_pagination import Page
-from app.auth.schema import APIKeyResponse, UserModel, APIKeyCreate, APIKeyUpdate
+from app.auth.schema import APIKeyResponse, APIKeyCreatedResponse, UserModel, APIKeyCreate, APIKeyUpdate
 from app.core.dependency import SessionDep
 from typing import Annotated
 
@@ -25,17 +25,17 @@ async def read_api_keys(
     return api_keys
 
 
-@api_key_router.post("/", response_model=APIKeyResponse)
+@api_key_router.post("/", response_model=APIKeyCreatedResponse)
 async def create_api_key(
     session: SessionDep,
     api_key_in: APIKeyCreate,
     current_user: Annotated[UserModel, Depends(get_current_user)]
 ):
     """
-    Create new API key.
+    Create new API key. The key itself is only shown in this response.
     """
     api_key = await api_key_services.create_api_key(user_id=current_user, name=api_key_in.name, session=session)
-    logger.info(f"API key created: {api_key.key} for user {current_user.id}")
+    logger.info(f"API key created: {api_key.prefix}... for user {current_user.id}")
     return api_key
 
 
@@ -52,7 +52,7 @@ async def update_api_key(
     api_key = await api_key_services.update_api_key(
         session=session, update_data=api_key_in, api_key_id=id
     )
-    logger.info(f"API key updated: {api_key.key} for user {current_user.id}")
+    logger.info(f"API key updated: {api_key.prefix}... for user {current_user.id}")
     return api_key
 
 
@@ -1,14 +1,15 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 from app.core.dependency import SessionDep
+from app.auth.dependency import RateLimit
 from app.utility.search import SearchServices
-from app.config import Config
 
-PSYCOPG_CONNECT = Config.PSYCOPG_CONNECT
-
-search_services = SearchServices(PSYCOPG_CONNECT, "embedding")
+search_services = SearchServices("embedding")
 search_router = APIRouter()
 
-@search_router.get("/")
+@search_router.get("/", dependencies=[Depends(RateLimit("search"))])
 async def vector_search(query: str, session:SessionDep):
-    response = await search_services.mmr_search(query=query, session=session)
-    return response
\ No newline at end of file
+    chunks = await search_services.mmr_search(query=query, session=session)
+    if chunks is None:
+        return None
+    # The response stays a list of chunk contents, best first
+    return [chunk.content for chunk in chunks]
\ No newline at end of file
@@ -0,0 +1,173 @@
+import hashlib
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator
+from urllib.parse import quote
+
+from minio.deleteobjects import DeleteError, DeleteObject
+from minio.error import S3Error
+
+
+@dataclass
+class FakeObject:
+    data: bytes
+    content_type: str
+    etag: str
+    last_modified: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+@dataclass
+class FakeListedObject:
+    object_name: str
+    size: int
+    last_modified: datetime
+
+
+@dataclass
+class FakeStat:
+    bucket_name: str
+    object_name: str
+    size: int
+    etag: str
+    content_type: str
+
+
+class FakeResponse:
+    """The part of urllib3's HTTPResponse that ``get_object`` callers use."""
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.closed = False
+
+    def stream(self, amt: int = 2 ** 16) -> Iterator[bytes]:
+        for start in range(0, len(self.data), amt):
+            yield self.data[start:start + amt]
+
+    def close(self) -> None:
+        self.closed = True
+
+    def release_conn(self) -> None:
+        pass
+
+
+class FakeMinio:
+    """
+    In-memory stand-in for ``minio.Minio`` with the calls the app makes.
+
+    Behaves like MinIO where the app can tell: missing buckets and keys raise
+    S3Error with the S3 error codes, ``remove_objects`` only deletes while its
+    error iterator is consumed and reports failures per key, and deleting a
+    missing key succeeds. ``latency`` makes each call sleep like a network
+    round trip, and ``max_in_flight`` records the highest number of calls that
+    overlapped, to check how many run at once.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.buckets: dict[str, dict[str, FakeObject]] = {}
+        self.latency = latency
+        self.calls: dict[str, int] = {}
+        self.fail_removal: set[str] = set()  # keys that remove_objects reports as failed
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def _call(self, name: str) -> None:
+        with self._lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.latency:
+                time.sleep(self.latency)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def _bucket(self, bucket_name: str) -> dict[str, FakeObject]:
+        if bucket_name not in self.buckets:
+            raise S3Error(
+                code="NoSuchBucket", message="The specified bucket does not exist",
+                resource=f"/{bucket_name}", request_id="", host_id="", response=None,
+                bucket_name=bucket_name,
+            )
+        return self.buckets[bucket_name]
+
+    def _object(self, bucket_name: str, object_name: str) -> FakeObject:
+        bucket = self._bucket(bucket_name)
+        if object_name not in bucket:
+            raise S3Error(
+                code="NoSuchKey", message="The specified key does not exist.",
+                resource=f"/{bucket_name}/{object_name}", request_id="", host_id="", response=None,
+                bucket_name=bucket_name, object_name=object_name,
+            )
+        return bucket[object_name]
+
+    def bucket_exists(self, bucket_name: str) -> bool:
+        self._call("bucket_exists")
+        return bucket_name in self.buckets
+
+    def make_bucket(self, bucket_name: str) -> None:
+        self._call("make_bucket")
+        self.buckets.setdefault(bucket_name, {})
+
+    def put_object(
+        self, bucket_name: str, object_name: str, data: BinaryIO, length: int,
+        content_type: str = "application/octet-stream", **kwargs,
+    ) -> FakeObject:
+        self._call("put_object")
+        content = data.read(length)
+        obj = FakeObject(content, content_type, hashlib.md5(content).hexdigest())
+        self._bucket(bucket_name)[object_name] = obj
+        return obj
+
+    def stat_object(self, bucket_name: str, object_name: str, **kwargs) -> FakeStat:
+        self._call("stat_object")
+        obj = self._object(bucket_name, object_name)
+        return FakeStat(bucket_name, object_name, len(obj.data), obj.etag, obj.content_type)
+
+    def get_object(self, bucket_name: str, object_name: str, **kwargs) -> FakeResponse:
+        self._call("get_object")
+        return FakeResponse(self._object(bucket_name, object_name).data)
+
+    def fget_object(self, bucket_name: str, object_name: str, file_path: str, **kwargs) -> FakeObject:
+        self._call("fget_object")
+        obj = self._object(bucket_name, object_name)
+        Path(file_path).write_bytes(obj.data)
+        return obj
+
+    def list_objects(self, bucket_name: str, prefix: str | None = None, recursive: bool = False, **kwargs):
+        self._call("list_objects")
+        for name, obj in sorted(self._bucket(bucket_name).items()):
+            if name.startswith(prefix or ""):
+                yield FakeListedObject(name, len(obj.data), obj.last_modified)
+
+    def presigned_post_policy(self, policy) -> dict[str, str]:
+        return {"policy": "fake-policy", "x-amz-signature": "fake-signature"}
+
+    def presigned_put_object(self, bucket_name: str, object_name: str, expires=None) -> str:
+        return self._presigned_url(bucket_name, object_name, expires)
+
+    def presigned_get_object(self, bucket_name: str, object_name: str, expires=None, **kwargs) -> str:
+        return self._presigned_url(bucket_name, object_name, expires)
+
+    @staticmethod
+    def _presigned_url(bucket_name: str, object_name: str, expires) -> str:
+        seconds = int(expires.total_seconds()) if expires else 604800
+        return f"http://fake-minio/{bucket_name}/{quote(object_name)}?X-Amz-Expires={seconds}"
+
+    def remove_object(self, bucket_name: str, object_name: str) -> None:
+        self._call("remove_object")
+        self._bucket(bucket_name).pop(object_name, None)
+
+    def remove_objects(self, bucket_name: str, delete_object_list: Iterable[DeleteObject]) -> Iterator[DeleteError]:
+        self._call("remove_objects")
+        bucket = self._bucket(bucket_name)
+        for delete_object in delete_object_list:
+            name = delete_object.name
+            if name in self.fail_removal:
+                yield DeleteError(code="AccessDenied", message="Access Denied.", name=name, version_id=None)
+            else:
+                bucket.pop(name, None)
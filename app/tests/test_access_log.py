@@ -0,0 +1,181 @@
+import asyncio
+import json
+import logging
+import queue
+from logging.handlers import QueueListener
+
+import httpx
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+from app.config import Config
+from app.core.log import JSONFormatter, LocalQueueHandler, RequestIdFilter, request_id_var
+from app.middleware import AccessLogMiddleware, MetricsMiddleware, register_middleware
+
+handler_logger = logging.getLogger("app.tests.handler")
+
+
+@pytest.fixture
+def app():
+    app = FastAPI()
+    app.add_middleware(AccessLogMiddleware)
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: int, request: Request):
+        handler_logger.info("handling item")
+        return {"id": item_id, "request_id": request.state.request_id}
+
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            for _ in range(3):
+                await asyncio.sleep(0.05)
+                yield b"12345"
+
+        return StreamingResponse(chunks())
+
+    @app.get("/boom")
+    async def boom():
+        raise RuntimeError("boom")
+
+    return app
+
+
+@pytest.fixture
+def access_records(caplog):
+    caplog.set_level(logging.INFO, logger="app")
+    return lambda: [r for r in caplog.records if r.name == "app.access"]
+
+
+async def get(app: FastAPI, path: str, headers: dict | None = None) -> httpx.Response:
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.get(path, headers=headers)
+
+
+@pytest.mark.asyncio
+async def test_request_id_is_generated_and_returned(app, access_records):
+    response = await get(app, "/items/7")
+
+    request_id = response.headers["x-request-id"]
+    assert len(request_id) == 32
+    assert response.json()["request_id"] == request_id
+    [record] = access_records()
+    assert record.http["route"] == "/items/{item_id}"
+    assert record.http["path"] == "/items/7"
+    assert record.http["status"] == 200
+    assert record.http["response_bytes"] == len(response.content)
+    assert request_id_var.get() is None
+
+
+@pytest.mark.asyncio
+async def test_incoming_request_id_is_propagated(app, caplog):
+    caplog.set_level(logging.INFO, logger="app")
+    caplog.handler.addFilter(RequestIdFilter())
+
+    response = await get(app, "/items/1", headers={"X-Request-ID": "edge-42"})
+
+    assert response.headers["x-request-id"] == "edge-42"
+    [handled] = [r for r in caplog.records if r.name == "app.tests.handler"]
+    assert handled.request_id == "edge-42"
+
+
+@pytest.mark.asyncio
+async def test_malformed_request_id_is_replaced(app):
+    response = await get(app, "/items/1", headers={"X-Request-ID": "bad id\twith spaces"})
+
+    assert response.headers["x-request-id"] != "bad id\twith spaces"
+
+
+@pytest.mark.asyncio
+async def test_stream_is_timed_to_the_last_chunk(app, access_records):
+    response = await get(app, "/stream")
+
+    [record] = access_records()
+    assert response.content == b"12345" * 3
+    assert record.http["response_bytes"] == 15
+    assert record.http["duration_ms"] >= 150
+
+
+@pytest.mark.asyncio
+async def test_sampled_routes(app, access_records, monkeypatch):
+    monkeypatch.setattr(Config, "ACCESS_LOG_SAMPLE_RATES", {"/items/{item_id}": 0.0})
+
+    for item_id in range(5):
+        await get(app, f"/items/{item_id}")
+    await get(app, "/stream")
+
+    assert [r.http["route"] for r in access_records()] == ["/stream"]
+
+
+@pytest.mark.asyncio
+async def test_errors_and_slow_requests_are_always_logged(app, access_records, monkeypatch):
+    monkeypatch.setattr(Config, "ACCESS_LOG_SAMPLE_RATE", 0.0)
+
+    await get(app, "/items/1")
+    await get(app, "/boom")
+    monkeypatch.setattr(Config, "ACCESS_LOG_SLOW_SECONDS", 0.1)
+    await get(app, "/stream")
+
+    records = access_records()
+    assert [(r.http["route"], r.http["status"]) for r in records] == [("/boom", 500), ("/stream", 200)]
+    assert all(r.http["sample_rate"] == 1.0 for r in records)
+
+
+def test_records_are_written_as_json_by_the_listener_thread():
+    lines: list[str] = []
+
+    class Collect(logging.Handler):
+        def emit(self, record):
+            lines.append(self.format(record))
+
+    output = Collect()
+    output.setFormatter(JSONFormatter())
+    log_queue = queue.SimpleQueue()
+    handler = LocalQueueHandler(log_queue)
+    handler.addFilter(RequestIdFilter())
+    listener = QueueListener(log_queue, output)
+    logger = logging.getLogger("app.tests.json")
+    logger.addHandler(handler)
+    logger.propagate = False
+    listener.start()
+    token = request_id_var.set("req-1")
+    try:
+        logger.warning("chunk %s of %s", 1, 3, extra={"http": {"status": 200}})
+        try:
+            raise ValueError("bad")
+        except ValueError:
+            logger.exception("failed")
+    finally:
+        request_id_var.reset(token)
+        listener.stop()
+        logger.removeHandler(handler)
+
+    first, second = (json.loads(line) for line in lines)
+    assert first["message"] == "chunk 1 of 3"
+    assert first["request_id"] == "req-1"
+    assert first["http"] == {"status": 200}
+    assert first["level"] == "WARNING"
+    assert "ValueError: bad" in second["exc_info"]
+
+
+@pytest.mark.asyncio
+async def test_request_id_without_the_access_log(app, caplog, access_records, monkeypatch):
+    monkeypatch.setattr(Config, "ACCESS_LOG_ENABLED", False)
+    caplog.handler.addFilter(RequestIdFilter())
+
+    response = await get(app, "/items/1", headers={"X-Request-ID": "edge-42"})
+
+    assert response.headers["x-request-id"] == "edge-42"
+    assert response.json()["request_id"] == "edge-42"
+    [handled] = [r for r in caplog.records if r.name == "app.tests.handler"]
+    assert handled.request_id == "edge-42"
+    assert access_records() == []
+
+
+def test_access_log_is_the_outermost_middleware():
+    app = FastAPI()
+    register_middleware(app)
+
+    assert [m.cls for m in app.user_middleware[:2]] == [AccessLogMiddleware, MetricsMiddleware]
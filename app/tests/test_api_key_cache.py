@@ -0,0 +1,58 @@
+import fakeredis
+import pytest
+
+from app.auth import cache
+from app.auth.cache import APIKeyCache, invalidate_user
+from app.core import redis as core_redis
+
+KEYS = {
+    "hash-a1": {"id": "1", "is_active": True, "user": {"email": "a@x", "user_id": "user-a", "role": "admin"}},
+    "hash-a2": {"id": "2", "is_active": True, "user": {"email": "a@x", "user_id": "user-a", "role": "admin"}},
+    "hash-b": {"id": "3", "is_active": True, "user": {"email": "b@x", "user_id": "user-b", "role": "user"}},
+}
+
+
+@pytest.fixture
+def keys(monkeypatch):
+    client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    monkeypatch.setattr(core_redis, "_client", client)
+    api_key_cache = APIKeyCache(maxsize=3)
+    monkeypatch.setattr(cache, "api_key_cache", api_key_cache)
+    loads = []
+
+    async def load(key_hash, session):
+        loads.append(key_hash)
+        return dict(KEYS.get(key_hash, {}))
+
+    monkeypatch.setattr(APIKeyCache, "_load", staticmethod(load))
+    return api_key_cache, client, loads
+
+
+@pytest.mark.asyncio
+async def test_invalidate_user_evicts_their_keys(keys):
+    api_key_cache, client, loads = keys
+    for key_hash in KEYS:
+        await api_key_cache.get(key_hash, session=None)
+
+    await invalidate_user("user-a")
+
+    assert set(api_key_cache._keys) == {"hash-b"}
+    assert not await client.exists("apikey:hash-a1", "apikey:hash-a2")
+    assert await client.exists("apikey:hash-b")
+    # The next request sees the new role
+    await api_key_cache.get("hash-a1", session=None)
+    assert loads.count("hash-a1") == 2
+
+
+@pytest.mark.asyncio
+async def test_unknown_keys_do_not_evict_valid_ones(keys):
+    api_key_cache, client, loads = keys
+    await api_key_cache.get("hash-b", session=None)
+
+    for i in range(10):
+        assert await api_key_cache.get(f"guess-{i}", session=None) is None
+    assert await api_key_cache.get("guess-0", session=None) is None
+
+    assert set(api_key_cache._keys) == {"hash-b"}
+    assert loads.count("guess-0") == 1
+    assert not await client.exists("apikey:guess-0")
@@ -0,0 +1,126 @@
+import asyncio
+from uuid import uuid4
+
+import fakeredis
+import pytest
+import pytest_asyncio
+
+from app.auth import cache
+from app.auth.cache import RevokedTokenCache, UserCache, publish, sync_auth_cache
+from app.core import redis as core_redis
+from app.core.model import User
+
+
+class FakeSession:
+    def __init__(self, *users: User):
+        self.users = {user.id: user for user in users}
+        self.gets = 0
+
+    async def get(self, model, ident):
+        self.gets += 1
+        return self.users.get(ident)
+
+
+def make_user(role: str = "user") -> User:
+    return User(
+        id=uuid4(), email="a@example.com", username="a", last_name="L", first_name="F",
+        hashed_password="x", is_verified=True, role=role,
+    )
+
+
+async def eventually(condition, timeout: float = 2.0) -> None:
+    """Wait for an event published by another instance to be handled."""
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "event not handled"
+        await asyncio.sleep(0.01)
+
+
+@pytest_asyncio.fixture
+async def synced(monkeypatch):
+    """This instance's caches, kept in sync with the shared Redis."""
+    client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    monkeypatch.setattr(core_redis, "_client", client)
+    monkeypatch.setattr(cache, "revoked_tokens", RevokedTokenCache())
+    monkeypatch.setattr(cache, "user_cache", UserCache(ttl=60))
+    # Revoked on another instance before this one started
+    await client.set("blocklist:revoked-before", "", ex=60)
+
+    task = asyncio.create_task(sync_auth_cache(retry_delay=0.01))
+    await eventually(lambda: cache.revoked_tokens.synced)
+    yield client
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_revocation_on_another_instance_reaches_the_local_cache(synced):
+    assert await cache.is_token_revoked("revoked-before")
+    assert not await cache.is_token_revoked("jti-1")
+
+    # What revoke_token does on the other instance
+    await synced.set("blocklist:jti-1", "", ex=60)
+    await publish({"type": "revoked", "jti": "jti-1", "ttl": 60})
+
+    await eventually(lambda: "jti-1" in cache.revoked_tokens._expiry)
+    # Answered locally: the Redis blocklist is not asked while synced
+    await synced.delete("blocklist:jti-1")
+    assert await cache.is_token_revoked("jti-1")
+
+
+@pytest.mark.asyncio
+async def test_user_change_on_another_instance_evicts_the_local_copy(synced):
+    user = make_user()
+    session = FakeSession(user)
+    assert (await cache.user_cache.get(str(user.id), session)).role == "user"
+    await cache.user_cache.get(str(user.id), session)
+    assert session.gets == 1
+
+    session.users[user.id] = User(**{**user.model_dump(), "role": "admin"})
+    await publish({"type": "user", "user_id": str(user.id)})
+
+    await eventually(lambda: str(user.id) not in cache.user_cache._users)
+    assert (await cache.user_cache.get(str(user.id), session)).role == "admin"
+    assert session.gets == 2
+
+
+@pytest.mark.asyncio
+async def test_lost_subscription_falls_back_to_redis(monkeypatch):
+    client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    monkeypatch.setattr(core_redis, "_client", client)
+    revoked = RevokedTokenCache()
+    await client.set("blocklist:jti-1", "", ex=60)
+
+    assert not revoked.synced
+    assert await revoked.contains("jti-1")
+    assert not await revoked.contains("jti-2")
+
+
+@pytest.mark.asyncio
+async def test_revoked_tokens_expire():
+    revoked = RevokedTokenCache()
+    revoked.synced = True
+    revoked.add("short", ttl=0.05)
+    revoked.add("long", ttl=60)
+    assert await revoked.contains("short")
+
+    await asyncio.sleep(0.1)
+
+    assert not await revoked.contains("short")
+    revoked.prune()
+    assert set(revoked._expiry) == {"long"}
+
+
+@pytest.mark.asyncio
+async def test_cached_users_expire():
+    user = make_user()
+    session = FakeSession(user)
+    users = UserCache(ttl=0.05)
+
+    await users.get(str(user.id), session)
+    await users.get(str(user.id), session)
+    await asyncio.sleep(0.1)
+    await users.get(str(user.id), session)
+
+    assert session.gets == 2
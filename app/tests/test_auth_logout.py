@@ -0,0 +1,51 @@
+import fakeredis
+import httpx
+import jwt
+import pytest
+from fastapi import FastAPI
+
+from app.auth import cache
+from app.auth.routes import oauth_router
+from app.core import redis as core_redis
+from app.utility.security import create_access_token
+
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.setattr(core_redis, "_client", fakeredis.FakeAsyncRedis(decode_responses=True))
+    monkeypatch.setattr(cache.revoked_tokens, "synced", False)
+    app = FastAPI()
+    app.include_router(oauth_router, prefix="/oauth")
+    return app
+
+
+@pytest.mark.asyncio
+async def test_logout_revokes_the_token(app):
+    token = create_access_token({"email": "a@example.com", "user_id": "1", "role": "user"})
+    headers = {"Authorization": f"Bearer {token}"}
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/oauth/logout", headers=headers)
+        assert response.status_code == 200
+
+        # The same token is refused afterwards, locally and through the Redis blocklist
+        assert (await client.get("/oauth/logout", headers=headers)).status_code == 401
+        cache.revoked_tokens._expiry.clear()
+        assert (await client.get("/oauth/logout", headers=headers)).status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_tokens_revoked_in_the_legacy_blocklist_stay_revoked(app):
+    token = create_access_token({"email": "a@example.com", "user_id": "1", "role": "user"})
+    jti = jwt.decode(token, options={"verify_signature": False})["jti"]
+    legacy = fakeredis.FakeAsyncRedis(decode_responses=True)
+    await legacy.set(jti, "", ex=3600)
+    await legacy.set("celery-task-meta-1", "{}", ex=3600)
+
+    assert await core_redis.copy_legacy_blocklist(legacy) == 1
+    # Done once per expiry window
+    assert await core_redis.copy_legacy_blocklist(legacy) == 0
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/oauth/logout", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 401
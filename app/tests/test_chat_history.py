@@ -0,0 +1,71 @@
+import asyncio
+
+import fakeredis
+import pytest
+import pytest_asyncio
+from langchain_core.messages import AIMessage, HumanMessage
+
+from app.config import Config
+from app.utility.chat_history import SimpleRedisHistory
+
+
+@pytest_asyncio.fixture
+async def client():
+    client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    yield client
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_window_mode_caps_the_list(client, monkeypatch):
+    monkeypatch.setattr(Config, "CHAT_MEMORY_MODE", "window")
+    history = SimpleRedisHistory("chat", client=client, max_length=None)
+
+    for i in range(Config.CHAT_HISTORY_MAX_LENGTH + 5):
+        await history.add_message(HumanMessage(content=str(i)))
+
+    assert await client.llen(history.key) == Config.CHAT_HISTORY_MAX_LENGTH
+
+
+@pytest.mark.asyncio
+async def test_summary_mode_leaves_trimming_to_the_fold(client, monkeypatch):
+    monkeypatch.setattr(Config, "CHAT_MEMORY_MODE", "summary")
+    history = SimpleRedisHistory("chat", client=client)
+
+    for i in range(Config.CHAT_HISTORY_MAX_LENGTH + 5):
+        await history.add_message(AIMessage(content=str(i)))
+
+    # Nothing is dropped before it has been folded into the summary
+    messages = await history.get_messages()
+    assert [m.content for m in messages] == [str(i) for i in range(Config.CHAT_HISTORY_MAX_LENGTH + 5)]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_load(client):
+    calls = 0
+
+    async def load():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return [HumanMessage(content="hi"), AIMessage(content="hello")]
+
+    results = await asyncio.gather(*(SimpleRedisHistory("chat", client=client).rehydrate(load) for _ in range(5)))
+
+    assert calls == 1
+    assert results == [True] * 5
+    assert [m.content for m in await SimpleRedisHistory("chat", client=client).get_messages()] == ["hi", "hello"]
+
+
+@pytest.mark.asyncio
+async def test_busy_rehydration_lock_does_not_fail_the_turn(client, monkeypatch):
+    history = SimpleRedisHistory("chat", client=client)
+    await client.set(f"{history.key}:rehydrate", "other-process", ex=30)
+    real_lock = client.lock
+    monkeypatch.setattr(client, "lock", lambda name, **kwargs: real_lock(name, **{**kwargs, "blocking_timeout": 0.1}))
+
+    async def load():
+        raise AssertionError("loaded without the lock")
+
+    assert await history.rehydrate(load) is False
+    assert await history.get_messages() == []
@@ -0,0 +1,87 @@
+import asyncio
+from uuid import uuid4
+
+import fakeredis
+import pytest
+import pytest_asyncio
+from fastapi import HTTPException
+from langchain_core.messages import AIMessage, HumanMessage
+
+from app.config import Config, LLMProviderSettings
+from app.core.model import Chat
+from app.llm_model.memory import ConversationMemory
+from app.llm_model.providers import LLMProvider
+from app.llm_model.services import rebuild_summary
+from app.utility.chat_history import SimpleRedisHistory
+
+
+class SlowProvider(LLMProvider):
+    def __init__(self, delay: float):
+        super().__init__("slow", LLMProviderSettings(type="ollama", base_url="http://x", model="m"))
+        self.delay = delay
+
+    async def _stream(self, messages):
+        await asyncio.sleep(self.delay)
+        yield "tóm tắt"
+
+
+class WordPromptBuilder:
+    """Counts words instead of model tokens."""
+
+    def count(self, text: str) -> int:
+        return len(text.split())
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        return " ".join(text.split()[:max_tokens])
+
+
+@pytest_asyncio.fixture
+async def history():
+    client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    history = SimpleRedisHistory("chat", client=client, max_length=0)
+    for i in range(4):
+        await history.add_message(HumanMessage(content=f"q{i}") if i % 2 == 0 else AIMessage(content=f"a{i}"))
+    yield history
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_fold_trims_what_it_summarized(history):
+    memory = ConversationMemory(history, WordPromptBuilder(), window=2)
+
+    assert await memory.fold(SlowProvider(0), "tenant")
+
+    summary, messages = await memory.load()
+    assert summary == "tóm tắt"
+    assert [m.content for m in messages] == ["q2", "a3"]
+
+
+@pytest.mark.asyncio
+async def test_fold_is_discarded_when_its_lock_expired(history, monkeypatch):
+    monkeypatch.setattr(Config, "CHAT_SUMMARY_LOCK_TIMEOUT", 0.05)
+    memory = ConversationMemory(history, WordPromptBuilder(), window=2)
+
+    assert not await memory.fold(SlowProvider(0.2), "tenant")
+
+    summary, messages = await memory.load()
+    assert summary == ""
+    assert len(messages) == 4
+
+
+class FakeSession:
+    def __init__(self, *chats: Chat):
+        self.chats = {chat.id: chat for chat in chats}
+
+    async def get(self, model, ident):
+        return self.chats.get(ident)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("chat_id", ["not-a-uuid", None, str(uuid4())], ids=["malformed", "other_user", "missing"])
+async def test_rebuild_needs_a_chat_of_the_caller(chat_id):
+    chat = Chat(id=uuid4(), username="owner")
+
+    with pytest.raises(HTTPException) as error:
+        await rebuild_summary(chat_id or str(chat.id), FakeSession(chat), SlowProvider(0), "tenant", "intruder")
+
+    assert error.value.status_code == 404
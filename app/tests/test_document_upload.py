@@ -0,0 +1,203 @@
+import asyncio
+import hashlib
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+import fakeredis
+import pytest
+import pytest_asyncio
+from fastapi import HTTPException
+from minio import Minio
+
+from app.auth.schema import UserModel
+from app.config import Config
+from app.core import redis as core_redis
+from app.core import storage as core_storage
+from app.core.model import Document, KnowledgeBase
+from app.core.storage import ObjectStorage
+from app.document import sweeper as sweeper_module
+from app.document.schema import CreateUpload
+from app.document.services import DocumentServices
+from app.document.sweeper import UploadSweeper
+from app.tests.fake_minio import FakeMinio
+
+CONTENT = b"# Report\n" * 1000
+
+
+class FakeSession:
+    """The part of AsyncSession the upload services use."""
+
+    def __init__(self, *knowledge_bases: KnowledgeBase):
+        self.knowledge_bases = {kb.id: kb for kb in knowledge_bases}
+        self.documents = {}
+        self.added = []
+
+    async def get(self, model, ident):
+        rows = self.documents if model is Document else self.knowledge_bases
+        return rows.get(ident)
+
+    def add(self, obj) -> None:
+        self.added.append(obj)
+        if isinstance(obj, Document):
+            self.documents[obj.id] = obj
+
+    async def commit(self) -> None:
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        pass
+
+
+def make_user(username: str) -> UserModel:
+    return UserModel(id=uuid4(), username=username, last_name="L", first_name="F", role="user")
+
+
+@pytest.fixture
+def minio():
+    return FakeMinio()
+
+
+@pytest_asyncio.fixture
+async def storage(minio, monkeypatch):
+    monkeypatch.setattr(Config, "MINIO_PUBLIC_URL", "files.example.com")
+    monkeypatch.setattr(Config, "MINIO_PUBLIC_SECURE", True)
+    public = Minio("files.example.com", access_key="test", secret_key="test", secure=True, region="us-east-1")
+    storage = ObjectStorage(client=minio, bucket="documents", workers=2, presign_client=public)
+    await storage.ensure_bucket()
+    monkeypatch.setattr(core_storage, "_storage", storage)
+    monkeypatch.setattr(core_redis, "_client", fakeredis.FakeAsyncRedis(decode_responses=True))
+    yield storage
+    await asyncio.gather(*core_storage._removals)
+    storage.close()
+
+
+@pytest.fixture
+def owner():
+    return make_user("owner")
+
+
+@pytest.fixture
+def session(owner):
+    return FakeSession(KnowledgeBase(id=uuid4(), name="kb", description="", username=owner.username))
+
+
+@pytest.fixture
+def kb_id(session):
+    return next(iter(session.knowledge_bases))
+
+
+def declare(kb_id, content: bytes = CONTENT) -> CreateUpload:
+    return CreateUpload(
+        knowledge_base_id=kb_id,
+        file_name="report.md",
+        file_size=len(content),
+        file_hash=hashlib.sha256(content).hexdigest(),
+    )
+
+
+@pytest.mark.asyncio
+async def test_finalize_creates_the_document(storage, minio, session, owner, kb_id):
+    services = DocumentServices()
+    slot = await services.create_upload(declare(kb_id), owner, session)
+
+    assert slot.method == "POST"
+    assert slot.url == "https://files.example.com/documents"
+    assert slot.fields["key"] == slot.object_path
+    assert slot.object_path.startswith("uploads/")
+
+    await storage.put_object(slot.object_path, CONTENT)
+    document = await services.finalize_upload(slot.upload_id, owner, session)
+
+    assert document.object_path == slot.object_path
+    assert document.file_size == len(CONTENT)
+    assert document.knowledge_base_id == kb_id
+    assert session.added == [document]
+    assert not await core_redis.get_redis().exists(services.upload_key(slot.upload_id))
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("uploaded", [CONTENT + b"x", CONTENT[:-1] + b"!"], ids=["size", "hash"])
+async def test_mismatch_is_rejected_and_removed(storage, minio, session, owner, kb_id, uploaded):
+    services = DocumentServices()
+    slot = await services.create_upload(declare(kb_id), owner, session)
+    await storage.put_object(slot.object_path, uploaded)
+
+    with pytest.raises(HTTPException) as error:
+        await services.finalize_upload(slot.upload_id, owner, session)
+    await asyncio.gather(*core_storage._removals)
+
+    assert error.value.status_code == 422
+    assert slot.object_path not in minio.buckets["documents"]
+    assert session.added == []
+
+
+@pytest.mark.asyncio
+async def test_concurrent_finalize_creates_one_document(storage, session, owner, kb_id):
+    services = DocumentServices()
+    slot = await services.create_upload(declare(kb_id), owner, session)
+    await storage.put_object(slot.object_path, CONTENT)
+
+    results = await asyncio.gather(
+        services.finalize_upload(slot.upload_id, owner, session),
+        services.finalize_upload(slot.upload_id, owner, session),
+        return_exceptions=True,
+    )
+
+    errors = [r for r in results if isinstance(r, HTTPException)]
+    assert [e.status_code for e in errors] == [404]
+    assert len(session.added) == 1
+
+
+@pytest.mark.asyncio
+async def test_uploads_of_other_users_are_not_found(storage, session, owner, kb_id):
+    services = DocumentServices()
+    intruder = make_user("intruder")
+
+    with pytest.raises(HTTPException) as error:
+        await services.create_upload(declare(kb_id), intruder, session)
+    assert error.value.status_code == 404
+
+    slot = await services.create_upload(declare(kb_id), owner, session)
+    await storage.put_object(slot.object_path, CONTENT)
+    with pytest.raises(HTTPException) as error:
+        await services.finalize_upload(slot.upload_id, intruder, session)
+    assert error.value.status_code == 404
+    assert session.added == []
+
+
+@pytest.mark.asyncio
+async def test_download_url_only_for_the_owner(storage, session, owner, kb_id):
+    services = DocumentServices()
+    slot = await services.create_upload(declare(kb_id), owner, session)
+    await storage.put_object(slot.object_path, CONTENT)
+    document = await services.finalize_upload(slot.upload_id, owner, session)
+
+    download = await services.get_download_url(str(document.id), owner, session)
+    assert download.url.startswith(f"https://files.example.com/documents/{slot.object_path}?")
+
+    with pytest.raises(HTTPException) as error:
+        await services.get_download_url(str(document.id), make_user("intruder"), session)
+    assert error.value.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_sweeper_removes_only_abandoned_uploads(storage, minio, monkeypatch):
+    for name in ("uploads/old/a.pdf", "uploads/kept/b.pdf", "uploads/new/c.pdf", "tmp/d_hash.pdf"):
+        await storage.put_object(name, b"x")
+    long_ago = datetime.now(timezone.utc) - timedelta(days=1)
+    for name in ("uploads/old/a.pdf", "uploads/kept/b.pdf", "tmp/d_hash.pdf"):
+        minio.buckets["documents"][name].last_modified = long_ago
+
+    async def unreferenced(session, paths):
+        return [path for path in paths if path != "uploads/kept/b.pdf"]  # finalized
+
+    monkeypatch.setattr(sweeper_module, "unreferenced_object_paths", unreferenced)
+    sweeper = UploadSweeper(interval=60, session_factory=FakeSession)
+
+    assert await sweeper.sweep() == 1
+    assert set(minio.buckets["documents"]) == {"uploads/kept/b.pdf", "uploads/new/c.pdf", "tmp/d_hash.pdf"}
+    # Once per interval across processes
+    assert await UploadSweeper(interval=60, session_factory=FakeSession).sweep() == 0
@@ -0,0 +1,134 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from app.embedding.encoder import BatchingEncoder
+
+
+class CountingEncoder:
+    """Row i is filled with len(texts[i]); records the size of every batch."""
+
+    def __init__(self, delay: float = 0.0, fail: bool = False):
+        self.delay = delay
+        self.fail = fail
+        self.batches: list[int] = []
+        self.closed = False
+
+    async def encode(self, texts: list[str]) -> np.ndarray:
+        self.batches.append(len(texts))
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("model failed")
+        return np.array([[len(text)] * 4 for text in texts], dtype=np.float32)
+
+    async def is_ready(self) -> bool:
+        return True
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_a_forward_pass():
+    inner = CountingEncoder()
+    encoder = BatchingEncoder(inner, max_batch_size=32, max_wait=0.01)
+
+    results = await asyncio.gather(*(encoder.encode(["q" * n]) for n in range(1, 11)))
+
+    assert inner.batches == [10]
+    assert [r.shape for r in results] == [(1, 4)] * 10
+    assert [int(r[0, 0]) for r in results] == list(range(1, 11))
+    await encoder.close()
+
+
+@pytest.mark.asyncio
+async def test_batches_never_exceed_max_size():
+    inner = CountingEncoder()
+    encoder = BatchingEncoder(inner, max_batch_size=4, max_wait=0.01)
+
+    results = await asyncio.gather(*(encoder.encode(["a", "bb", "ccc"][: 1 + n % 3]) for n in range(12)))
+
+    assert sum(inner.batches) == sum(len(r) for r in results) == 24
+    assert max(inner.batches) <= 4
+    # Each caller gets its own rows back, in order
+    for n, vectors in enumerate(results):
+        assert vectors[:, 0].tolist() == [1.0, 2.0, 3.0][: 1 + n % 3]
+    await encoder.close()
+
+
+@pytest.mark.asyncio
+async def test_lone_call_waits_at_most_max_wait():
+    encoder = BatchingEncoder(CountingEncoder(), max_batch_size=32, max_wait=0.02)
+    loop = asyncio.get_running_loop()
+
+    start = loop.time()
+    await encoder.encode(["q"])
+
+    assert loop.time() - start < 0.5
+    await encoder.close()
+
+
+@pytest.mark.asyncio
+async def test_large_calls_bypass_the_queue():
+    inner = CountingEncoder()
+    encoder = BatchingEncoder(inner, max_batch_size=4, max_wait=10)
+
+    vectors = await asyncio.wait_for(encoder.encode(["x"] * 6), timeout=1)
+
+    assert vectors.shape == (6, 4)
+    assert inner.batches == [6]
+    await encoder.close()
+
+
+@pytest.mark.asyncio
+async def test_failure_reaches_every_caller_of_the_batch():
+    encoder = BatchingEncoder(CountingEncoder(fail=True), max_batch_size=32, max_wait=0.01)
+
+    results = await asyncio.gather(*(encoder.encode(["q"]) for _ in range(3)), return_exceptions=True)
+
+    assert all(isinstance(r, RuntimeError) for r in results)
+    await encoder.close()
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_is_left_out_of_the_batch():
+    inner = CountingEncoder()
+    encoder = BatchingEncoder(inner, max_batch_size=32, max_wait=0.05)
+
+    cancelled = asyncio.create_task(encoder.encode(["gone"]))
+    kept = asyncio.create_task(encoder.encode(["kept"]))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+
+    assert (await kept).shape == (1, 4)
+    assert inner.batches == [1]
+    await encoder.close()
+
+
+@pytest.mark.asyncio
+async def test_close_cancels_pending_calls():
+    inner = CountingEncoder(delay=10)
+    encoder = BatchingEncoder(inner, max_batch_size=32, max_wait=0)
+
+    pending = asyncio.create_task(encoder.encode(["q"]))
+    await asyncio.sleep(0.01)
+    await encoder.close()
+
+    with pytest.raises(asyncio.CancelledError):
+        await pending
+    assert inner.closed
+
+
+@pytest.mark.asyncio
+async def test_close_while_a_batch_is_filling_cancels_its_calls():
+    inner = CountingEncoder()
+    encoder = BatchingEncoder(inner, max_batch_size=32, max_wait=10)
+
+    calls = [asyncio.create_task(encoder.encode([f"q{i}"])) for i in range(3)]
+    await asyncio.sleep(0.01)  # taken off the queue, waiting for more
+    await asyncio.wait_for(encoder.close(), 1)
+
+    results = await asyncio.wait_for(asyncio.gather(*calls, return_exceptions=True), 1)
+    assert all(isinstance(result, asyncio.CancelledError) for result in results)
+    assert inner.batches == []
@@ -0,0 +1,109 @@
+import asyncio
+
+import numpy as np
+import pytest
+import pytest_asyncio
+
+from app.embedding.encoder import RemoteEncoder
+from app.embedding.worker import EmbeddingWorker
+from app.error import EmbeddingUnavailable
+
+
+class FakeEncoder:
+    """Deterministic vectors: row i is filled with len(texts[i])."""
+
+    def __init__(self, dim: int = 8, delay: float = 0.0):
+        self.dim = dim
+        self.delay = delay
+        self.batches: list[list[str]] = []
+        self.closed = False
+
+    async def encode(self, texts: list[str]) -> np.ndarray:
+        if any(text == "boom" for text in texts):
+            raise RuntimeError("model failed")
+        self.batches.append(texts)
+        await asyncio.sleep(self.delay)
+        return np.array([[len(text)] * self.dim for text in texts], dtype=np.float32)
+
+    async def is_ready(self) -> bool:
+        return True
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+@pytest_asyncio.fixture
+async def worker(tmp_path):
+    worker = EmbeddingWorker(str(tmp_path / "embedding.sock"), encoder=FakeEncoder())
+    await worker.start()
+    yield worker
+    await worker.stop()
+
+
+@pytest_asyncio.fixture
+async def client(worker):
+    client = RemoteEncoder([worker.socket_path], connections=2, timeout=5)
+    yield client
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_encode_round_trip(client):
+    vectors = await client.encode(["a", "abc", "abcdef"])
+
+    assert vectors.dtype == np.float32
+    assert vectors.shape == (3, 8)
+    assert vectors[:, 0].tolist() == [1.0, 3.0, 6.0]
+    # Wrapped without copying the received buffer
+    assert not vectors.flags.writeable
+
+
+@pytest.mark.asyncio
+async def test_connections_are_reused(client, worker):
+    for _ in range(5):
+        await client.encode(["x"])
+
+    assert len(client._idle) == 1
+    assert len(worker.encoder.batches) == 5
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_are_answered_in_order(client):
+    texts = [["a" * n] for n in range(1, 21)]
+    results = await asyncio.gather(*(client.encode(t) for t in texts))
+
+    assert [int(r[0, 0]) for r in results] == list(range(1, 21))
+    assert len(client._idle) <= 2
+
+
+@pytest.mark.asyncio
+async def test_encoder_error_keeps_connection_usable(client):
+    with pytest.raises(EmbeddingUnavailable):
+        await client.encode(["boom"])
+
+    vectors = await client.encode(["ok"])
+    assert vectors.shape == (1, 8)
+
+
+@pytest.mark.asyncio
+async def test_ping(client):
+    assert await client.is_ready()
+
+
+@pytest.mark.asyncio
+async def test_missing_worker_is_unavailable(tmp_path):
+    client = RemoteEncoder([str(tmp_path / "missing.sock")], timeout=1)
+
+    with pytest.raises(EmbeddingUnavailable):
+        await client.encode(["a"])
+    assert not await client.is_ready()
+
+
+@pytest.mark.asyncio
+async def test_stop_removes_socket_and_closes_encoder(tmp_path):
+    worker = EmbeddingWorker(str(tmp_path / "embedding.sock"), encoder=FakeEncoder())
+    await worker.start()
+    await worker.stop()
+
+    assert not (tmp_path / "embedding.sock").exists()
+    assert worker.encoder.closed
@@ -0,0 +1,43 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+# Generous enough for a cold CI runner, far below what loading a model costs
+IMPORT_TIME_BUDGET = float(os.environ.get("IMPORT_TIME_BUDGET", "8"))
+
+# Loaded by the model registry on first use or at warmup, never by importing the app
+HEAVY_MODULES = (
+    "torch",
+    "transformers",
+    "sentence_transformers",
+    "langchain_huggingface",
+    "docling",
+    "langchain_docling",
+)
+
+PROBE = f"""
+import json, sys, time
+start = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - start
+print(json.dumps({{"elapsed": elapsed, "loaded": [m for m in {HEAVY_MODULES!r} if m in sys.modules]}}))
+"""
+
+
+def test_import_app_main_is_fast_and_loads_no_models():
+    # A fresh interpreter, so modules imported by other tests do not count
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        cwd=Path(__file__).resolve().parents[2],
+        env=os.environ.copy(),
+        capture_output=True,
+        text=True,
+        timeout=IMPORT_TIME_BUDGET * 6,
+    )
+    assert result.returncode == 0, result.stderr
+    probe = json.loads(result.stdout.strip().splitlines()[-1])
+
+    assert probe["loaded"] == []
+    assert probe["elapsed"] < IMPORT_TIME_BUDGET
@@ -0,0 +1,71 @@
+from uuid import uuid4
+
+import fakeredis
+import pytest
+import pytest_asyncio
+
+from app.core import redis as core_redis
+from app.knownledge_base import deletion as deletion_module
+from app.knownledge_base.deletion import KnowledgeBaseDeletion
+
+
+class FakeStorage:
+    async def remove_objects(self, object_paths):
+        return len(object_paths), 0
+
+
+@pytest_asyncio.fixture
+async def r(monkeypatch):
+    client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    monkeypatch.setattr(core_redis, "_client", client)
+    monkeypatch.setattr(deletion_module, "get_storage", FakeStorage)
+    yield client
+    await client.aclose()
+
+
+def batches(deletion: KnowledgeBaseDeletion, results: list, before_batch=None):
+    """Replace the database work with ``results``, one (deleted, object_paths) per batch."""
+    remaining = list(results)
+
+    async def delete_batch(kb_id):
+        if before_batch is not None:
+            await before_batch()
+        return remaining.pop(0)
+
+    deletion._delete_batch = delete_batch
+
+
+@pytest.mark.asyncio
+async def test_job_releases_its_lock(r):
+    kb_id = uuid4()
+    deletion = KnowledgeBaseDeletion()
+    batches(deletion, [(2, ["a", "b"]), (0, [])])
+    lock = r.lock(f"{deletion.status_key(kb_id)}:lock", timeout=60)
+    assert await lock.acquire(blocking=False)
+
+    await deletion.run(kb_id, lock)
+
+    status = await r.hgetall(deletion.status_key(kb_id))
+    assert (status["status"], status["documents_deleted"], status["objects_removed"]) == ("done", "2", "2")
+    assert not await r.exists(f"{deletion.status_key(kb_id)}:lock")
+
+
+@pytest.mark.asyncio
+async def test_expired_lock_taken_over_by_another_job_is_left_alone(r):
+    kb_id = uuid4()
+    deletion = KnowledgeBaseDeletion()
+    lock_key = f"{deletion.status_key(kb_id)}:lock"
+
+    async def expire_and_take_over():
+        # The lock expired during a slow batch and another process started a job
+        await r.set(lock_key, "other-job", ex=60)
+        await r.hset(deletion.status_key(kb_id), "status", "running")
+
+    batches(deletion, [(1, []), (0, [])], before_batch=expire_and_take_over)
+    lock = r.lock(lock_key, timeout=60)
+    assert await lock.acquire(blocking=False)
+
+    await deletion.run(kb_id, lock)
+
+    assert await r.get(lock_key) == "other-job"
+    assert await r.hget(deletion.status_key(kb_id), "status") == "running"
@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+
+from app.llm_model.gateway import LLMGateway
+
+
+def make_gateway(**kwargs) -> LLMGateway:
+    settings = dict(name="test", max_concurrency=1, max_queue=10, max_queued_per_tenant=5, admission_grace=0.05)
+    return LLMGateway(**{**settings, **kwargs})
+
+
+@pytest.mark.asyncio
+async def test_slow_setup_before_hand_off_keeps_the_slot():
+    gateway = make_gateway()
+    ticket = gateway.enqueue("a")
+
+    # Retrieval and prompt building take longer than the grace period
+    await asyncio.sleep(0.1)
+    ticket.hand_off()
+    async with ticket:
+        assert gateway.active == 1
+    assert gateway.active == 0
+
+
+@pytest.mark.asyncio
+async def test_unused_slot_is_reclaimed_after_hand_off():
+    gateway = make_gateway()
+    abandoned = gateway.enqueue("a")
+    waiting = gateway.enqueue("b")
+    abandoned.hand_off()
+
+    async with waiting:
+        assert abandoned.released
+        assert gateway.active == 1
+    assert gateway.active == 0
+
+
+@pytest.mark.asyncio
+async def test_reclaimed_ticket_waits_for_a_new_slot():
+    gateway = make_gateway()
+    late = gateway.enqueue("a")
+    late.hand_off()
+    await asyncio.sleep(0.1)
+    assert late.released and gateway.active == 0
+
+    other = gateway.enqueue("b")
+    entering = asyncio.create_task(late.__aenter__())
+    await asyncio.sleep(0)
+    assert not entering.done()
+
+    async with other:
+        pass
+    await entering
+    assert gateway.active == 1
+    await late.__aexit__(None, None, None)
+    assert gateway.active == 0
@@ -0,0 +1,50 @@
+from uuid import uuid4
+
+import pytest
+from fastapi import HTTPException
+
+from app.config import LLMProviderSettings
+from app.core.model import KnowledgeBase
+from app.llm_model.providers import LLMProvider, get_provider
+from app.llm_model.services import resolve_provider
+
+
+class FakeSession:
+    def __init__(self, *knowledge_bases: KnowledgeBase):
+        self.knowledge_bases = {kb.id: kb for kb in knowledge_bases}
+
+    async def get(self, model, ident):
+        return self.knowledge_bases.get(ident)
+
+
+@pytest.fixture
+def kb():
+    return KnowledgeBase(id=uuid4(), name="kb", description="", username="owner")
+
+
+@pytest.mark.asyncio
+async def test_knowledge_base_of_the_caller_is_used(kb):
+    provider = await resolve_provider(None, str(kb.id), FakeSession(kb), "owner")
+
+    assert provider is get_provider(None)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "kb_id, username, status",
+    [("not-a-uuid", "owner", 400), (None, "intruder", 404), (str(uuid4()), "owner", 404)],
+    ids=["malformed", "other_user", "missing"],
+)
+async def test_invalid_knowledge_base_is_rejected(kb, kb_id, username, status):
+    with pytest.raises(HTTPException) as error:
+        await resolve_provider(None, kb_id or str(kb.id), FakeSession(kb), username)
+
+    assert error.value.status_code == status
+
+
+def test_provider_without_stream_cannot_be_created():
+    class Incomplete(LLMProvider):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete("x", LLMProviderSettings(type="ollama", base_url="http://x", model="m"))
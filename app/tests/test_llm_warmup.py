@@ -0,0 +1,27 @@
+import json
+
+import httpx
+import pytest
+
+from app.config import LLMProviderSettings
+from app.core import http as core_http
+from app.llm_model.prompt import ANSWER_SYSTEM_PROMPT, CONTEXTUALIZE_Q_SYSTEM_PROMPT
+from app.llm_model.providers import OllamaProvider
+
+
+@pytest.mark.asyncio
+async def test_warm_prefills_every_prompt_of_a_turn(monkeypatch):
+    prefilled = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        prefilled.append([m["content"] for m in json.loads(request.content)["messages"]])
+        return httpx.Response(200, json={"done": True})
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(core_http, "_client", client)
+    provider = OllamaProvider("ollama", LLMProviderSettings(type="ollama", base_url="http://ollama", model="m"))
+
+    assert await provider.warm(CONTEXTUALIZE_Q_SYSTEM_PROMPT, ANSWER_SYSTEM_PROMPT)
+    await client.aclose()
+
+    assert prefilled == [[CONTEXTUALIZE_Q_SYSTEM_PROMPT], [ANSWER_SYSTEM_PROMPT]]
@@ -0,0 +1,234 @@
+import asyncio
+from uuid import uuid4
+
+import fakeredis
+import pytest
+from sqlalchemy.exc import DataError, IntegrityError, OperationalError
+
+from app.message.schema import MessageSchema
+from app.message.writer import MessageWriter
+
+
+class FakeSink:
+    """Collects inserted rows by id, like the ON CONFLICT DO NOTHING insert."""
+
+    def __init__(self):
+        self.rows: dict = {}
+        self.calls = 0
+        self.fail = 0  # number of calls that fail with a connection error
+        self.deleted_chats: set = set()
+        self.bad_contents: set = set()  # rows the database rejects with a data error
+        self.disconnects = 0  # number of calls that fail with a dropped connection
+
+    async def __call__(self, rows: list[dict]) -> None:
+        self.calls += 1
+        if self.fail:
+            self.fail -= 1
+            raise ConnectionError("database is down")
+        if self.disconnects:
+            self.disconnects -= 1
+            raise OperationalError("INSERT", {}, Exception("connection was closed"))
+        if any(row["content"] in self.bad_contents for row in rows):
+            raise DataError("INSERT", {}, Exception("invalid byte sequence"))
+        if any(row["chat_id"] in self.deleted_chats for row in rows):
+            raise IntegrityError("INSERT", {}, Exception("foreign key violation"))
+        for row in rows:
+            self.rows.setdefault(row["id"], row)
+
+
+class BlockingFakeRedis(fakeredis.FakeAsyncRedis):
+    """fakeredis answers XREADGROUP BLOCK at once; wait like Redis does."""
+
+    async def xreadgroup(self, *args, block=None, **kwargs):
+        response = await super().xreadgroup(*args, block=block, **kwargs)
+        if block and not any(entries for _, entries in response or []):
+            await asyncio.sleep(block / 1000)
+        return response
+
+
+@pytest.fixture
+def redis_client():
+    return BlockingFakeRedis(decode_responses=True)
+
+
+@pytest.fixture
+def sink():
+    return FakeSink()
+
+
+def make_writer(redis_client, sink, **kwargs) -> MessageWriter:
+    options = dict(
+        client=redis_client,
+        sink=sink,
+        stream="test:messages",
+        dead_letter_stream="test:messages:dead",
+        group="test-writer",
+        consumer="test-1",
+        batch_size=10,
+        flush_interval=0.01,
+        claim_idle=60,
+        retry_delay=0.01,
+    )
+    options.update(kwargs)
+    return MessageWriter(**options)
+
+
+def message(chat_id, content: str, role: str = "user") -> MessageSchema:
+    return MessageSchema(content=content, role=role, chat_id=chat_id)
+
+
+async def wait_for(condition, timeout: float = 2.0) -> None:
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        if asyncio.get_running_loop().time() > deadline:
+            raise AssertionError("condition not met in time")
+        await asyncio.sleep(0.01)
+
+
+@pytest.mark.asyncio
+async def test_append_returns_message_with_id_before_flush(redis_client, sink):
+    writer = make_writer(redis_client, sink)
+    chat_id = uuid4()
+
+    stored = await writer.append(message(chat_id, "hello"))
+
+    assert stored.id is not None
+    assert stored.created_at is not None
+    assert stored.content == "hello"
+    assert sink.rows == {}
+    assert await redis_client.xlen("test:messages") == 1
+
+
+@pytest.mark.asyncio
+async def test_consumer_flushes_in_batches_and_cleans_stream(redis_client, sink):
+    writer = make_writer(redis_client, sink)
+    chat_id = uuid4()
+    writer.start()
+
+    stored = [await writer.append(message(chat_id, f"m{i}")) for i in range(25)]
+    await wait_for(lambda: len(sink.rows) == 25)
+    await writer.stop()
+
+    assert sink.calls <= 25
+    assert await redis_client.xlen("test:messages") == 0
+    pending = await redis_client.xpending("test:messages", "test-writer")
+    assert pending["pending"] == 0
+
+    # created_at comes from append time, so it reproduces append order
+    rows = sorted(sink.rows.values(), key=lambda row: row["created_at"])
+    assert [row["id"] for row in rows] == [m.id for m in stored]
+
+
+@pytest.mark.asyncio
+async def test_stop_flushes_everything_queued(redis_client, sink):
+    writer = make_writer(redis_client, sink, flush_interval=5)
+    chat_id = uuid4()
+    writer.start()
+    await asyncio.sleep(0.05)  # consumer is blocked waiting for entries
+
+    for i in range(15):
+        await writer.append(message(chat_id, f"m{i}"))
+    await writer.stop()
+
+    assert len(sink.rows) == 15
+    assert await redis_client.xlen("test:messages") == 0
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_is_retried_without_duplicates(redis_client, sink):
+    writer = make_writer(redis_client, sink)
+    chat_id = uuid4()
+    sink.fail = 2
+    for i in range(5):
+        await writer.append(message(chat_id, f"m{i}"))
+
+    writer.start()
+    await wait_for(lambda: len(sink.rows) == 5)
+    await writer.stop()
+
+    assert sink.calls >= 3
+    assert len(sink.rows) == 5
+    assert await redis_client.xlen("test:messages") == 0
+
+
+@pytest.mark.asyncio
+async def test_entries_of_a_dead_consumer_are_claimed(redis_client, sink):
+    chat_id = uuid4()
+    crashed = make_writer(redis_client, FakeSink(), consumer="crashed")
+    await crashed._ensure_group()
+    for i in range(3):
+        await crashed.append(message(chat_id, f"m{i}"))
+    # Delivered to the crashed consumer but never acknowledged
+    assert len(await crashed._read(pending=False, block=False)) == 3
+
+    writer = make_writer(redis_client, sink, claim_idle=0.001)
+    await asyncio.sleep(0.01)
+    writer.start()
+    await wait_for(lambda: len(sink.rows) == 3)
+    await writer.stop()
+
+    assert await redis_client.xlen("test:messages") == 0
+
+
+@pytest.mark.asyncio
+async def test_message_of_deleted_chat_does_not_block_batch(redis_client, sink):
+    writer = make_writer(redis_client, sink)
+    kept_chat, deleted_chat = uuid4(), uuid4()
+    sink.deleted_chats.add(deleted_chat)
+
+    kept = await writer.append(message(kept_chat, "kept"))
+    await writer.append(message(deleted_chat, "orphan"))
+    writer.start()
+    await wait_for(lambda: kept.id in sink.rows)
+    await writer.stop()
+
+    assert list(sink.rows) == [kept.id]
+    assert await redis_client.xlen("test:messages") == 0
+
+
+@pytest.mark.asyncio
+async def test_rejected_row_is_dead_lettered(redis_client, sink):
+    writer = make_writer(redis_client, sink)
+    chat_id = uuid4()
+    sink.bad_contents.add("bad")
+
+    kept = await writer.append(message(chat_id, "kept"))
+    await writer.append(message(chat_id, "bad"))
+    writer.start()
+    await wait_for(lambda: kept.id in sink.rows)
+    await writer.stop()
+
+    assert list(sink.rows) == [kept.id]
+    assert await redis_client.xlen("test:messages") == 0
+    [(_, fields)] = await redis_client.xrange("test:messages:dead")
+    assert fields["content"] == "bad"
+    assert "DataError" in fields["error"]
+
+
+@pytest.mark.asyncio
+async def test_undecodable_entry_is_dead_lettered(redis_client, sink):
+    writer = make_writer(redis_client, sink)
+    kept = await writer.append(message(uuid4(), "kept"))
+    await redis_client.xadd("test:messages", {"id": "not-a-uuid", "content": "x"})
+
+    writer.start()
+    await wait_for(lambda: kept.id in sink.rows)
+    await writer.stop()
+
+    assert await redis_client.xlen("test:messages") == 0
+    [(_, fields)] = await redis_client.xrange("test:messages:dead")
+    assert fields["id"] == "not-a-uuid"
+
+
+@pytest.mark.asyncio
+async def test_lost_connection_retries_instead_of_dead_lettering(redis_client, sink):
+    writer = make_writer(redis_client, sink)
+    sink.disconnects = 2
+    for i in range(3):
+        await writer.append(message(uuid4(), f"m{i}"))
+
+    writer.start()
+    await wait_for(lambda: len(sink.rows) == 3)
+    await writer.stop()
+
+    assert await redis_client.xlen("test:messages:dead") == 0
@@ -0,0 +1,159 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import fakeredis
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from prometheus_client import REGISTRY
+
+from app.config import LLMProviderSettings
+from app.core.redis import TimedRedis
+from app.llm_model.providers import LLMProvider
+from app.middleware import MetricsMiddleware
+
+
+def sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+@pytest.fixture
+def app():
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: int):
+        return {"id": item_id}
+
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            for _ in range(3):
+                await asyncio.sleep(0.05)
+                yield b"chunk"
+
+        return StreamingResponse(chunks())
+
+    return app
+
+
+async def get(app: FastAPI, path: str) -> httpx.Response:
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        return await client.get(path)
+
+
+@pytest.mark.asyncio
+async def test_requests_are_counted_by_route_template(app):
+    labels = {"method": "GET", "route": "/items/{item_id}", "status": "200"}
+    before = sample("http_request_duration_seconds_count", **labels)
+
+    for item_id in (1, 2, 3):
+        assert (await get(app, f"/items/{item_id}")).status_code == 200
+
+    assert sample("http_request_duration_seconds_count", **labels) == before + 3
+    assert sample("http_requests_in_flight", method="GET") == 0
+
+
+@pytest.mark.asyncio
+async def test_unmatched_paths_share_one_label(app):
+    labels = {"method": "GET", "route": "unmatched", "status": "404"}
+    before = sample("http_request_duration_seconds_count", **labels)
+
+    await get(app, "/nope/1")
+    await get(app, "/nope/2")
+
+    assert sample("http_request_duration_seconds_count", **labels) == before + 2
+
+
+@pytest.mark.asyncio
+async def test_streamed_response_is_timed_to_the_last_chunk(app):
+    labels = {"method": "GET", "route": "/stream", "status": "200"}
+    before = sample("http_request_duration_seconds_sum", **labels)
+
+    response = await get(app, "/stream")
+
+    assert response.content == b"chunk" * 3
+    assert sample("http_request_duration_seconds_sum", **labels) - before >= 0.15
+
+
+class FakeProvider(LLMProvider):
+    async def _stream(self, messages):
+        for text in ("Xin", " chào", " bạn"):
+            await asyncio.sleep(0.01)
+            yield text
+
+
+@pytest.mark.asyncio
+async def test_llm_stream_metrics():
+    provider = FakeProvider("fake", LLMProviderSettings(type="ollama", base_url="http://x", model="m"))
+    labels = {"provider": "fake", "operation": "answer"}
+
+    text = "".join([t async for t in provider.astream([], operation="answer")])
+
+    assert text == "Xin chào bạn"
+    assert sample("llm_time_to_first_token_seconds_count", **labels) == 1
+    assert sample("llm_stream_duration_seconds_count", **labels) == 1
+    assert sample("llm_tokens_per_second_count", **labels) == 1
+    # Two deltas after the first one, about 10 ms apart
+    assert 0 < sample("llm_tokens_per_second_sum", **labels) < 200
+
+
+@pytest.mark.asyncio
+async def test_redis_commands_and_pipelines_are_timed():
+    client = TimedRedis(connection_pool=fakeredis.FakeAsyncRedis().connection_pool)
+    before = {c: sample("redis_command_duration_seconds_count", command=c) for c in ("set", "get", "pipeline")}
+
+    await client.set("k", "v")
+    assert await client.get("k") == b"v"
+    async with client.pipeline() as pipe:
+        await pipe.incr("n").expire("n", 10).execute()
+
+    for command in ("set", "get", "pipeline"):
+        assert sample("redis_command_duration_seconds_count", command=command) == before[command] + 1
+    await client.aclose()
+
+
+WORKER = """
+from app.core.metrics import HTTP_IN_FLIGHT, STAGE_DURATION
+STAGE_DURATION.labels("mmr").observe(0.5)
+HTTP_IN_FLIGHT.labels("GET").inc()
+"""
+
+SCRAPE = """
+from prometheus_client.parser import text_string_to_metric_families
+from app.core.metrics import metrics_response
+import json
+samples = {
+    (s.name, s.labels.get("stage") or s.labels.get("method")): s.value
+    for family in text_string_to_metric_families(metrics_response().body.decode())
+    for s in family.samples
+}
+print(json.dumps({
+    "mmr_count": samples.get(("rag_stage_duration_seconds_count", "mmr")),
+    "in_flight": samples.get(("http_requests_in_flight", "GET")),
+}))
+"""
+
+
+def test_metrics_add_up_across_worker_processes(tmp_path):
+    env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path)}
+    cwd = Path(__file__).resolve().parents[2]
+
+    def run(code: str) -> str:
+        result = subprocess.run([sys.executable, "-c", code], cwd=cwd, env=env, capture_output=True, text=True)
+        assert result.returncode == 0, result.stderr
+        return result.stdout
+
+    run(WORKER)
+    run(WORKER)
+    scraped = json.loads(run(SCRAPE).strip().splitlines()[-1])
+
+    assert scraped["mmr_count"] == 2
+    # Live gauges of exited workers still count until they are marked dead
+    assert scraped["in_flight"] == 2
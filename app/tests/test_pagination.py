@@ -0,0 +1,153 @@
+import base64
+import os
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+import httpx
+import orjson
+import pytest
+import pytest_asyncio
+from fastapi import FastAPI, HTTPException
+from fastapi_pagination import add_pagination
+from fastapi_pagination.api import set_page, set_params
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.chat.schema import ChatResponse
+from app.core.model import Chat
+from app.core.pagination import KeysetPage, KeysetParams, decode_cursor, encode_cursor, keyset_paginate
+
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+SCHEMA = "pagination_test"
+
+needs_database = pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL is not set")
+
+
+def b64(value) -> str:
+    return base64.urlsafe_b64encode(orjson.dumps(value)).decode()
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2025, 3, 1, 12, 30, 15, 123456, tzinfo=timezone.utc)
+    id = uuid4()
+
+    assert decode_cursor(encode_cursor(created_at, id)) == (created_at, id)
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "",
+        "not base64!",
+        base64.urlsafe_b64encode(b"\xff\xfe").decode(),
+        b64("just a string"),
+        b64(5),
+        b64(["2025-03-01T12:30:15", str(uuid4()), "extra"]),
+        b64(["yesterday", str(uuid4())]),
+        b64(["2025-03-01T12:30:15", "not-a-uuid"]),
+        b64(["2025-03-01T12:30:15", 5]),
+        b64([None, None]),
+    ],
+)
+def test_garbage_cursor_is_rejected(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor)
+    assert error.value.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_tampered_cursor_is_a_client_error():
+    app = FastAPI()
+
+    @app.get("/chats")
+    async def chats() -> KeysetPage[ChatResponse]:
+        return await keyset_paginate(None, select(Chat), Chat)  # the cursor is decoded before any query
+
+    add_pagination(app)
+    tampered = encode_cursor(datetime.now(timezone.utc), uuid4())[:-3]
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/chats", params={"cursor": tampered})
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Invalid cursor"}
+
+
+@contextmanager
+def page_params(**params):
+    """The pagination context FastAPI sets up for a paginated route."""
+    with set_page(KeysetPage[ChatResponse]), set_params(KeysetParams(**params)):
+        yield
+
+
+@pytest_asyncio.fixture
+async def session():
+    engine = create_async_engine(
+        TEST_DATABASE_URL,
+        connect_args={"server_settings": {"search_path": SCHEMA}},
+    )
+    async with engine.begin() as conn:
+        await conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        await conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+        await conn.run_sync(lambda sync_conn: Chat.__table__.create(sync_conn))
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        yield session
+    async with engine.begin() as conn:
+        await conn.execute(text(f"DROP SCHEMA {SCHEMA} CASCADE"))
+    await engine.dispose()
+
+
+async def seed(session: AsyncSession, created: list[datetime]) -> list[Chat]:
+    chats = [Chat(id=uuid4(), username="u", created_at=at) for at in created]
+    session.add_all(chats)
+    await session.commit()
+    # Newest first, ties broken by id
+    return sorted(chats, key=lambda chat: (chat.created_at, chat.id), reverse=True)
+
+
+async def walk(session: AsyncSession, size: int) -> list[list[Chat]]:
+    """Follow next_cursor from the first page to the last."""
+    pages = []
+    cursor = None
+    while True:
+        params = {"size": size} if cursor is None else {"size": size, "cursor": cursor}
+        with page_params(**params):
+            page = await keyset_paginate(session, select(Chat), Chat)
+        pages.append(page.items)
+        cursor = page.next_cursor
+        if cursor is None:
+            return pages
+
+
+@needs_database
+@pytest.mark.asyncio
+async def test_equal_created_at_is_ordered_by_id(session):
+    now = datetime.now(timezone.utc)
+    # Five rows share a timestamp, and a page boundary falls among them
+    expected = await seed(session, [now] * 5 + [now - timedelta(seconds=1), now + timedelta(seconds=1)])
+
+    pages = await walk(session, size=3)
+
+    assert [[chat.id for chat in page] for page in pages] == [
+        [chat.id for chat in expected[i:i + 3]] for i in range(0, 7, 3)
+    ]
+
+
+@needs_database
+@pytest.mark.asyncio
+async def test_no_next_page_at_the_exact_page_size(session):
+    now = datetime.now(timezone.utc)
+    expected = await seed(session, [now - timedelta(seconds=i) for i in range(6)])
+
+    pages = await walk(session, size=3)
+    assert [len(page) for page in pages] == [3, 3]
+    assert [chat.id for page in pages for chat in page] == [chat.id for chat in expected]
+
+    # Counted page-number pages know the last page is full and final
+    with page_params(page=2, size=3):
+        page = await keyset_paginate(session, select(Chat), Chat)
+    assert page.total == 6 and page.next_cursor is None
+    with page_params(page=1, size=6):
+        assert (await keyset_paginate(session, select(Chat), Chat)).next_cursor is None
@@ -0,0 +1,85 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import pytest_asyncio
+
+from app.config import Config
+from app.error import PasswordHashingBusy
+from app.utility import security
+from app.utility.security import build_pwd_context, verify_and_update_password
+
+
+@pytest_asyncio.fixture
+async def executor(monkeypatch):
+    executor = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(security, "_hash_executor", executor)
+    monkeypatch.setattr(Config, "PASSWORD_HASH_MAX_PENDING", 2)
+    yield executor
+    executor.shutdown(wait=True)
+
+
+@pytest.mark.asyncio
+async def test_busy_once_the_pending_bound_is_reached(executor):
+    release = threading.Event()
+    running = [asyncio.create_task(security._run_hashing(release.wait)) for _ in range(2)]
+    await asyncio.sleep(0)
+    assert security._hash_pending == 2
+
+    with pytest.raises(PasswordHashingBusy):
+        await security._run_hashing(lambda: "never run")
+
+    release.set()
+    assert await asyncio.gather(*running) == [True, True]
+    assert security._hash_pending == 0
+    assert await security._run_hashing(lambda: "ran") == "ran"
+
+
+@pytest.mark.asyncio
+async def test_failed_hashing_frees_its_slot(executor):
+    def fail():
+        raise ValueError("malformed hash")
+
+    for _ in range(3):  # more than the bound
+        with pytest.raises(ValueError):
+            await security._run_hashing(fail)
+    assert security._hash_pending == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_frees_its_slot(executor):
+    release = threading.Event()
+    waiting = asyncio.create_task(security._run_hashing(release.wait))
+    await asyncio.sleep(0)
+    waiting.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiting
+    release.set()
+
+    assert security._hash_pending == 0
+
+
+@pytest.mark.asyncio
+async def test_login_rehashes_when_the_rounds_change(monkeypatch):
+    old_hash = build_pwd_context("sha512_crypt", rounds=1000).hash("secret")
+    monkeypatch.setattr(security, "pwd_context", build_pwd_context("sha512_crypt", rounds=2000))
+
+    valid, new_hash = await verify_and_update_password("secret", old_hash)
+    assert valid and new_hash.startswith("$6$rounds=2000$")
+
+    # The upgraded hash is current, and a wrong password never yields one
+    assert await verify_and_update_password("secret", new_hash) == (True, None)
+    assert await verify_and_update_password("wrong", old_hash) == (False, None)
+
+
+@pytest.mark.asyncio
+async def test_login_rehashes_a_legacy_scheme(monkeypatch):
+    old_hash = build_pwd_context("sha512_crypt", rounds=1000).hash("secret")
+    monkeypatch.setattr(Config, "PASSWORD_LEGACY_SCHEMES", ["sha512_crypt"])
+    monkeypatch.setattr(security, "pwd_context", build_pwd_context("pbkdf2_sha256", rounds=1000))
+
+    valid, new_hash = await verify_and_update_password("secret", old_hash)
+
+    assert valid and new_hash.startswith("$pbkdf2-sha256$1000$")
+    assert await verify_and_update_password("secret", new_hash) == (True, None)
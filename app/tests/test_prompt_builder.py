@@ -0,0 +1,74 @@
+from uuid import uuid4
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from app.llm_model.prompt import SUMMARY_PREFIX, PromptBuilder
+from app.utility.search import RetrievedChunk
+
+
+class WordPromptBuilder(PromptBuilder):
+    """Counts words instead of model tokens."""
+
+    def count(self, text: str) -> int:
+        return len(text.split())
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        return " ".join(text.split()[:max_tokens])
+
+
+def chunk(content: str) -> RetrievedChunk:
+    return RetrievedChunk(chunk_id=uuid4(), document_id=uuid4(), file_name="f.md", content=content)
+
+
+FIXED = ["system prompt", "the question"]  # 4 tokens
+SUMMARY = "s1 s2"  # 9 tokens with SUMMARY_PREFIX
+
+
+def test_summary_then_newest_history_then_chunks():
+    builder = WordPromptBuilder(tokenizer_name="words", max_tokens=30, history_max_tokens=14)
+    history = [HumanMessage(content="old one two"), HumanMessage(content="mid a b"), AIMessage(content="new c")]
+    chunks = [chunk("w w w w w"), chunk("w " * 10), chunk("x")]
+
+    parts = builder.build(FIXED, chunks, history, summary=SUMMARY)
+
+    # The summary leaves 5 tokens of the history cap: the two newest messages
+    assert parts.chat_history == [("system", SUMMARY_PREFIX + SUMMARY), ("human", "mid a b"), ("ai", "new c")]
+    # 12 tokens left for chunks: the second does not fit, the smaller third does
+    assert parts.context.split("\n") == ["[1] (f.md) w w w w w", "[2] (f.md) x"]
+    assert parts.dropped == {"chunks": 1, "messages": 1}
+    assert (parts.fixed_tokens, parts.summary_tokens, parts.history_tokens, parts.context_tokens) == (4, 9, 5, 12)
+    assert parts.total_tokens == 30
+
+
+def test_history_cap_leaves_the_rest_to_chunks():
+    builder = WordPromptBuilder(tokenizer_name="words", max_tokens=30, history_max_tokens=4)
+    history = [HumanMessage(content=f"m{i} x") for i in range(5)]
+
+    parts = builder.build(FIXED, [chunk("w " * 20)], history)
+
+    assert [content for _, content in parts.chat_history] == ["m3 x", "m4 x"]
+    assert parts.used_chunks == 1
+    assert parts.total_tokens <= 30
+
+
+def test_oversized_summary_and_top_chunk_are_truncated():
+    builder = WordPromptBuilder(tokenizer_name="words", max_tokens=20, history_max_tokens=8)
+
+    parts = builder.build(FIXED, [chunk("w " * 50), chunk("y")], [HumanMessage(content="hi")], summary="s " * 50)
+
+    assert parts.chat_history == [("system", builder.truncate(SUMMARY_PREFIX + "s " * 50, 8))]
+    assert parts.dropped["messages"] == 1
+    # The top chunk is cut to the 8 tokens left (with its separator); nothing else fits
+    assert parts.context == "[1] (f.md) w w w w w"
+    assert parts.used_chunks == 1
+    assert parts.total_tokens == 20
+
+
+def test_fixed_texts_over_budget_leave_nothing_else():
+    builder = WordPromptBuilder(tokenizer_name="words", max_tokens=3, history_max_tokens=10)
+
+    parts = builder.build(FIXED, [chunk("w")], [HumanMessage(content="hi")], summary=SUMMARY)
+
+    assert parts.chat_history == []
+    assert parts.context == ""
+    assert parts.fixed_tokens == 4
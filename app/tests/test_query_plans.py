@@ -0,0 +1,321 @@
+"""
+Query plan regression tests.
+
+Runs the service queries against a seeded Postgres and fails when a plan reads
+a large table with a sequential scan, which means an access-path index is
+missing or no longer used. Needs a throwaway database with pgvector::
+
+    TEST_DATABASE_URL=postgresql+asyncpg://postgres@localhost:5432/test pytest app/tests/test_query_plans.py
+
+The tables are created in their own schema, which is dropped afterwards.
+QUERY_PLAN_SEQ_SCAN_MAX_ROWS sets the table size above which a sequential scan
+fails (default 1000).
+"""
+import json
+import os
+from contextlib import contextmanager
+from uuid import UUID
+
+import pytest
+import pytest_asyncio
+from fastapi_pagination import Page
+from fastapi_pagination.api import set_page, set_params
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.auth.cache import APIKeyCache
+from app.auth.schema import APIKeyResponse, UserModel
+from app.auth.services import APIKeyServices
+from app.chat.schema import ChatResponse
+from app.chat.services import ChatService
+from app.chunks.schema import ChunkResponse
+from app.chunks.services import ChunkService
+from app.core.model import APIKey, Chat, Chunk, Document, Embedding, KnowledgeBase, Message, User
+from app.core.pagination import KeysetPage, encode_cursor
+from app.document.schema import DocumentDBResponse
+from app.document.services import DocumentServices, unreferenced_object_paths
+from app.message.schema import MessageResponse
+from app.message.services import MessageService
+
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+SEQ_SCAN_MAX_ROWS = int(os.environ.get("QUERY_PLAN_SEQ_SCAN_MAX_ROWS", "1000"))
+SCHEMA = "query_plan_test"
+
+pytestmark = [
+    pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL is not set"),
+    pytest.mark.asyncio(loop_scope="module"),
+]
+
+# Rows per table; every table a query filters on is well above SEQ_SCAN_MAX_ROWS
+SEED = [
+    """
+    INSERT INTO "user" (id, email, username, last_name, first_name, hashed_password, is_verified, role)
+    SELECT gen_random_uuid(), 'user' || i || '@example.com', 'user' || i, 'Last', 'First', 'x', true, 'user'
+    FROM generate_series(1, 2000) AS i
+    """,
+    """
+    INSERT INTO api_key (id, key_hash, prefix, name, user_id, is_active)
+    SELECT gen_random_uuid(), md5(i::text) || md5((-i)::text), 'sk-' || i, 'key', u.ids[1 + i % array_length(u.ids, 1)], true
+    FROM generate_series(1, 10000) AS i, (SELECT array_agg(id) AS ids FROM "user") AS u
+    """,
+    """
+    INSERT INTO knowledge_base (id, name, description, username)
+    SELECT gen_random_uuid(), 'kb' || i, 'seed', 'user1'
+    FROM generate_series(1, 2000) AS i
+    """,
+    """
+    INSERT INTO document (id, username, knowledge_base_id, object_path, file_name, file_size, content_type, file_hash, status, created_at)
+    SELECT gen_random_uuid(), 'user1', kb.ids[1 + i % array_length(kb.ids, 1)], 'seed/' || i, 'doc' || i || '.pdf', 1000,
+           'application/pdf', md5(i::text), 'embedding', now() - i * interval '1 second'
+    FROM generate_series(1, 10000) AS i, (SELECT array_agg(id) AS ids FROM knowledge_base) AS kb
+    """,
+    """
+    INSERT INTO chunk (id, username, document_id, content, created_at)
+    SELECT gen_random_uuid(), 'user1', d.ids[1 + i % array_length(d.ids, 1)], 'chunk ' || i, now() - i * interval '1 second'
+    FROM generate_series(1, 100000) AS i, (SELECT array_agg(id) AS ids FROM document) AS d
+    """,
+    """
+    INSERT INTO embedding (username, chunk_id, document_id, created_at)
+    SELECT username, id, document_id, created_at FROM chunk
+    """,
+    """
+    INSERT INTO chat (id, username, created_at)
+    SELECT gen_random_uuid(), 'user1', now() - i * interval '1 second'
+    FROM generate_series(1, 10000) AS i
+    """,
+    """
+    INSERT INTO message (id, content, role, chat_id, created_at)
+    SELECT gen_random_uuid(), 'message ' || i, CASE WHEN i % 2 = 0 THEN 'user' ELSE 'bot' END,
+           c.ids[1 + i % array_length(c.ids, 1)], now() - i * interval '1 second'
+    FROM generate_series(1, 100000) AS i, (SELECT array_agg(id) AS ids FROM chat) AS c
+    """,
+]
+
+
+@pytest_asyncio.fixture(scope="module", loop_scope="module")
+async def engine():
+    engine = create_async_engine(
+        TEST_DATABASE_URL,
+        connect_args={"server_settings": {"search_path": f"{SCHEMA}, public"}},
+    )
+    async with engine.begin() as conn:
+        await conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+        await conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        await conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+        await conn.run_sync(SQLModel.metadata.create_all)
+        for statement in SEED:
+            await conn.execute(text(statement))
+    async with engine.connect() as conn:
+        await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text("ANALYZE"))
+    yield engine
+    async with engine.begin() as conn:
+        await conn.execute(text(f"DROP SCHEMA {SCHEMA} CASCADE"))
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture(loop_scope="module")
+async def session(engine):
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        yield session
+        await session.rollback()
+
+
+class StatementRecorder:
+    """Collects the SQL a block of service code sends, to EXPLAIN it afterwards."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements: list[tuple[str, tuple]] = []
+
+    def __enter__(self) -> "StatementRecorder":
+        event.listen(self.engine.sync_engine, "before_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        event.remove(self.engine.sync_engine, "before_cursor_execute", self._record)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+            # Batched statements share one plan; explain it with the first row
+            self.statements.append((statement, parameters[0] if executemany else parameters))
+
+
+def seq_scans(plan: dict) -> list[str]:
+    scans = []
+    if plan["Node Type"] == "Seq Scan":
+        scans.append(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        scans.extend(seq_scans(child))
+    return scans
+
+
+async def assert_no_large_seq_scans(engine, statements: list[tuple[str, tuple]]) -> None:
+    assert statements, "no statements were recorded"
+    async with engine.connect() as conn:
+        sizes = dict(
+            (
+                await conn.execute(
+                    text(
+                        "SELECT c.relname, c.reltuples FROM pg_class c "
+                        "JOIN pg_namespace n ON n.oid = c.relnamespace "
+                        "WHERE n.nspname = :schema AND c.relkind = 'r'"
+                    ),
+                    {"schema": SCHEMA},
+                )
+            ).all()
+        )
+        failures = []
+        for statement, parameters in statements:
+            result = await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters)
+            plan = result.scalar()
+            plan = (json.loads(plan) if isinstance(plan, str) else plan)[0]["Plan"]
+            for table in seq_scans(plan):
+                if sizes.get(table, 0) > SEQ_SCAN_MAX_ROWS:
+                    failures.append(f"Seq Scan on {table} ({sizes[table]:.0f} rows) in:\n{statement}")
+        await conn.rollback()
+    assert not failures, "\n\n".join(failures)
+
+
+@contextmanager
+def page_params(page_cls, **params):
+    """The pagination context FastAPI sets up for a paginated route."""
+    with set_page(page_cls), set_params(page_cls.__params_type__(**params)):
+        yield
+
+
+async def first(session: AsyncSession, statement):
+    return (await session.exec(statement.limit(1))).one()
+
+
+async def test_chunks_of_document(engine, session):
+    document_id = await first(session, select(Chunk.document_id))
+    chunk = await first(session, select(Chunk).where(Chunk.document_id == document_id))
+    cursor = encode_cursor(chunk.created_at, chunk.id)
+
+    with StatementRecorder(engine) as recorder:
+        with page_params(KeysetPage[ChunkResponse]):
+            await ChunkService().get_chunk_from_doc_id(str(document_id), session)
+        with page_params(KeysetPage[ChunkResponse], cursor=cursor):
+            await ChunkService().get_chunk_from_doc_id(str(document_id), session)
+        # create_embedding reads all chunks of the document
+        await session.exec(select(Chunk).where(Chunk.document_id == document_id))
+
+    await assert_no_large_seq_scans(engine, recorder.statements)
+
+
+async def test_messages_of_chat(engine, session):
+    chat_id = str(await first(session, select(Message.chat_id)))
+    message = await first(session, select(Message).where(Message.chat_id == UUID(chat_id)))
+    cursor = encode_cursor(message.created_at, message.id)
+    service = MessageService()
+
+    with StatementRecorder(engine) as recorder:
+        with page_params(KeysetPage[MessageResponse]):
+            await service.get_message_from_chat_id(chat_id, session)
+        with page_params(KeysetPage[MessageResponse], cursor=cursor):
+            await service.get_message_from_chat_id(chat_id, session)
+        await service.get_recent_messages(chat_id, session, limit=20)
+        await service.get_chat_history(chat_id, session)
+
+    await assert_no_large_seq_scans(engine, recorder.statements)
+
+
+async def test_list_pages_without_count(engine, session):
+    """Cursor pages and count-free page-number pages of every large list."""
+    chunk = await first(session, select(Chunk).order_by(Chunk.created_at))
+    message = await first(session, select(Message).order_by(Message.created_at))
+    document = await first(session, select(Document).order_by(Document.created_at))
+    chat = await first(session, select(Chat).order_by(Chat.created_at))
+    lists = [
+        (KeysetPage[ChunkResponse], ChunkService().get_all_chunks, chunk),
+        (KeysetPage[MessageResponse], MessageService().get_messages, message),
+        (KeysetPage[DocumentDBResponse], DocumentServices().get_all_document, document),
+        (KeysetPage[ChatResponse], ChatService().get_all_chat, chat),
+    ]
+
+    with StatementRecorder(engine) as recorder:
+        for page_cls, list_rows, row in lists:
+            with page_params(page_cls, page=20, include_total=False):
+                await list_rows(session)
+            with page_params(page_cls, cursor=encode_cursor(row.created_at, row.id)):
+                await list_rows(session)
+
+    await assert_no_large_seq_scans(engine, recorder.statements)
+
+
+async def test_api_keys(engine, session):
+    api_key = await first(session, select(APIKey))
+    user = UserModel.model_validate(await session.get(User, api_key.user_id), from_attributes=True)
+
+    with StatementRecorder(engine) as recorder:
+        await APIKeyCache._load(api_key.key_hash, session)
+        with page_params(Page[APIKeyResponse]):
+            await APIKeyServices().get_api_keys(user, session)
+
+    await assert_no_large_seq_scans(engine, recorder.statements)
+
+
+@pytest.mark.parametrize(
+    "column",
+    [
+        Chunk.document_id,
+        Embedding.document_id,
+        Embedding.chunk_id,
+        Message.chat_id,
+        Document.knowledge_base_id,
+        APIKey.user_id,
+    ],
+    ids=lambda column: f"{column.table.name}.{column.name}",
+)
+async def test_foreign_key_lookups(engine, session, column):
+    """The lookup Postgres runs on the referencing table for each deleted parent row."""
+    value = await first(session, select(column))
+
+    with StatementRecorder(engine) as recorder:
+        await session.exec(select(column.table.c.id).where(column == value))
+
+    await assert_no_large_seq_scans(engine, recorder.statements)
+
+
+@pytest.mark.parametrize(
+    "model",
+    [KnowledgeBase, Document, Chat],
+    ids=lambda model: model.__tablename__,
+)
+async def test_cascade_deletes(engine, session, model):
+    """Deleting a parent is one DELETE; the children go through ON DELETE CASCADE."""
+    parent = await first(session, select(model))
+
+    with StatementRecorder(engine) as recorder:
+        await session.delete(parent)
+        await session.flush()
+    await session.rollback()
+
+    await assert_no_large_seq_scans(engine, recorder.statements)
+
+
+async def test_shared_objects_are_not_removed(engine, session):
+    """A content-addressed object uploaded to two knowledge bases outlives one of its documents."""
+    first_kb, second_kb = (await session.exec(select(KnowledgeBase.id).limit(2))).all()
+    shared, single = "tmp/report_abc.pdf", "tmp/notes_def.pdf"
+    documents = [
+        Document(
+            username="user1", knowledge_base_id=kb_id, object_path=path, file_name="doc.pdf",
+            file_size=1, content_type="application/pdf", file_hash="abc",
+        )
+        for kb_id, path in [(first_kb, shared), (second_kb, shared), (first_kb, single)]
+    ]
+    session.add_all(documents)
+    await session.flush()
+    await session.delete(documents[0])
+    await session.delete(documents[2])
+    await session.flush()
+
+    with StatementRecorder(engine) as recorder:
+        paths = await unreferenced_object_paths(session, [shared, single, None])
+
+    assert paths == [single]
+    await assert_no_large_seq_scans(engine, recorder.statements)
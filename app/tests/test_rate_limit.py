@@ -0,0 +1,81 @@
+import asyncio
+
+import fakeredis
+import pytest
+import pytest_asyncio
+from pydantic import ValidationError
+
+from app.config import Config, RateLimitSettings
+from app.core.rate_limit import RateLimiter
+from app.error import RateLimitExceeded
+
+
+@pytest_asyncio.fixture
+async def limiter(monkeypatch):
+    monkeypatch.setattr(Config, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(Config, "RATE_LIMITS", {"test": RateLimitSettings(capacity=2, refill_per_second=20)})
+    monkeypatch.setattr(Config, "RATE_LIMIT_OVERRIDES", {})
+    client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    yield RateLimiter(client)
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_bucket_refills_over_time(limiter):
+    await limiter.hit("test", "user:a")
+    await limiter.hit("test", "user:a")
+    with pytest.raises(RateLimitExceeded) as error:
+        await limiter.hit("test", "user:a")
+    assert 0 < error.value.retry_after <= 0.05
+
+    await asyncio.sleep(0.1)
+    assert (await limiter.hit("test", "user:a")).allowed
+    # Other callers have their own bucket
+    assert (await limiter.hit("test", "user:b")).remaining == 1
+
+
+@pytest.mark.asyncio
+async def test_peek_does_not_take_tokens(limiter):
+    for _ in range(5):
+        assert (await limiter.ensure_available("test", "user:a")).remaining == 2
+    await limiter.hit("test", "user:a")
+    assert (await limiter.ensure_available("test", "user:a")).remaining == pytest.approx(1, abs=0.1)
+
+
+@pytest.mark.asyncio
+async def test_debit_goes_into_debt(limiter):
+    result = await limiter.debit("test", "user:a", 5)
+    assert result.allowed and result.remaining == pytest.approx(-3, abs=0.1)
+
+    # Nothing is allowed until the debt is paid back
+    with pytest.raises(RateLimitExceeded) as error:
+        await limiter.ensure_available("test", "user:a")
+    assert error.value.retry_after == pytest.approx(0.2, abs=0.05)
+    with pytest.raises(RateLimitExceeded):
+        await limiter.hit("test", "user:a")
+
+
+@pytest.mark.asyncio
+async def test_override_replaces_the_limit_for_one_caller(limiter, monkeypatch):
+    monkeypatch.setattr(
+        Config,
+        "RATE_LIMIT_OVERRIDES",
+        {"api_key:big": {"test": RateLimitSettings(capacity=100, refill_per_second=1)}},
+    )
+
+    assert (await limiter.hit("test", "api_key:big")).remaining == 99
+    assert (await limiter.hit("test", "user:a")).remaining == 1
+    # Limits the override does not name keep the default
+    assert limiter.limit_for("other", "api_key:big") is None
+
+
+@pytest.mark.asyncio
+async def test_unlimited_names_are_not_stored(limiter):
+    assert (await limiter.hit("unknown", "user:a")).allowed
+    assert await limiter.r.keys("ratelimit:*") == []
+
+
+@pytest.mark.parametrize("settings", [{"capacity": 10, "refill_per_second": 0}, {"capacity": 0, "refill_per_second": 1}])
+def test_limits_must_refill_and_hold_tokens(settings):
+    with pytest.raises(ValidationError):
+        RateLimitSettings(**settings)
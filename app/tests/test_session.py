@@ -0,0 +1,108 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+
+import pytest
+import pytest_asyncio
+from prometheus_client import REGISTRY
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core import session as session_module
+from app.core.session import TimedAsyncSession, TimedQueuePool, get_session
+
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+
+needs_database = pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL is not set")
+
+
+def sample(name: str) -> float:
+    return REGISTRY.get_sample_value(name) or 0.0
+
+
+class FakeSession:
+    def __init__(self, in_transaction: bool):
+        self._in_transaction = in_transaction
+        self.rollbacks = 0
+
+    def in_transaction(self) -> bool:
+        return self._in_transaction
+
+    async def rollback(self) -> None:
+        self.rollbacks += 1
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        pass
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("in_transaction, rollbacks", [(True, 1), (False, 0)], ids=["uncommitted", "committed"])
+async def test_rollback_only_when_work_is_left_uncommitted(monkeypatch, in_transaction, rollbacks):
+    session = FakeSession(in_transaction)
+    monkeypatch.setattr(session_module, "AsyncSessionLocal", lambda: session)
+
+    # How FastAPI runs a dependency with yield
+    async with asynccontextmanager(get_session)() as yielded:
+        assert yielded is session
+
+    assert session.rollbacks == rollbacks
+
+
+@pytest_asyncio.fixture
+async def engine():
+    engine = create_async_engine(TEST_DATABASE_URL, poolclass=TimedQueuePool, pool_size=1, max_overflow=0)
+    yield engine
+    await engine.dispose()
+
+
+@needs_database
+@pytest.mark.asyncio
+async def test_pool_wait_is_recorded(engine):
+    count = sample("db_pool_wait_seconds_count")
+    total = sample("db_pool_wait_seconds_sum")
+
+    holder = await engine.connect()
+    await holder.execute(text("SELECT 1"))
+    assert sample("db_pool_checked_out") == 1
+
+    waiting = asyncio.create_task(engine.connect().start())
+    await asyncio.sleep(0.2)
+    assert not waiting.done()  # the only connection is checked out
+    await holder.close()
+    conn = await waiting
+    await conn.execute(text("SELECT 1"))
+    await conn.close()
+
+    assert sample("db_pool_wait_seconds_count") == count + 2
+    assert sample("db_pool_wait_seconds_sum") - total >= 0.2
+    assert (sample("db_pool_checked_out"), sample("db_pool_idle")) == (0, 1)
+
+
+@needs_database
+@pytest.mark.asyncio
+async def test_session_rolls_back_uncommitted_work_on_a_real_connection(engine, monkeypatch):
+    factory = sessionmaker(bind=engine, class_=TimedAsyncSession, expire_on_commit=False)
+    monkeypatch.setattr(session_module, "AsyncSessionLocal", factory)
+    commits = sample("db_commit_duration_seconds_count")
+    rollbacks = []
+    rollback = TimedAsyncSession.rollback
+
+    async def recorded_rollback(self):
+        rollbacks.append(self)
+        await rollback(self)
+
+    monkeypatch.setattr(TimedAsyncSession, "rollback", recorded_rollback)
+
+    async with asynccontextmanager(get_session)() as session:
+        await session.execute(text("CREATE TEMP TABLE t (x int)"))
+        await session.commit()
+        await session.execute(text("INSERT INTO t VALUES (1)"))
+        # Left uncommitted by the route
+        assert session.in_transaction()
+
+    assert rollbacks == [session]
+    assert sample("db_commit_duration_seconds_count") == commits + 1
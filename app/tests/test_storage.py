@@ -0,0 +1,139 @@
+import asyncio
+import hashlib
+import time
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+from minio import Minio
+from minio.error import S3Error
+
+from app.config import Config
+from app.core.storage import ObjectStorage, public_bucket_url
+from app.tests.fake_minio import FakeMinio
+
+
+@pytest.fixture
+def minio():
+    return FakeMinio()
+
+
+@pytest.fixture
+def storage(minio):
+    storage = ObjectStorage(client=minio, bucket="documents", workers=2)
+    yield storage
+    storage.close()
+
+
+@pytest.mark.asyncio
+async def test_bucket_is_checked_once(storage, minio):
+    await storage.ensure_bucket()
+    await storage.put_object("a.txt", b"a")
+    await storage.put_object("b.txt", b"b")
+
+    assert minio.calls["bucket_exists"] == 1
+    assert minio.calls["make_bucket"] == 1
+    assert set(minio.buckets["documents"]) == {"a.txt", "b.txt"}
+
+
+@pytest.mark.asyncio
+async def test_put_and_download_round_trip(storage, minio, tmp_path):
+    await storage.put_object("tmp/report.md", b"# Report", content_type="text/markdown")
+
+    target = tmp_path / "report.md"
+    await storage.fget_object("tmp/report.md", str(target))
+
+    assert target.read_bytes() == b"# Report"
+    assert minio.buckets["documents"]["tmp/report.md"].content_type == "text/markdown"
+
+
+@pytest.mark.asyncio
+async def test_missing_object_raises_s3_error(storage, tmp_path):
+    await storage.ensure_bucket()
+
+    with pytest.raises(S3Error) as error:
+        await storage.fget_object("missing.pdf", str(tmp_path / "missing.pdf"))
+    assert error.value.code == "NoSuchKey"
+
+
+@pytest.mark.asyncio
+async def test_stat_and_hash_of_uploaded_object(storage, minio):
+    content = b"x" * (3 * 1024 * 1024 + 17)  # several stream blocks
+    await storage.put_object("uploads/1/big.pdf", content)
+
+    assert await storage.stat_object("uploads/1/big.pdf") == len(content)
+    assert await storage.stat_object("uploads/2/none.pdf") is None
+    assert await storage.sha256("uploads/1/big.pdf") == hashlib.sha256(content).hexdigest()
+
+
+def test_presigned_urls_use_the_public_endpoint(minio):
+    # Presigning is offline: with the region known no request is made
+    public = Minio("files.example.com", access_key="test", secret_key="test", secure=True, region="us-east-1")
+    storage = ObjectStorage(client=minio, bucket="documents", workers=1, presign_client=public)
+
+    put = urlsplit(storage.presigned_put_url("uploads/1/a.pdf", expires=900))
+    get = urlsplit(storage.presigned_get_url("uploads/1/a.pdf", expires=300, file_name="a.pdf"))
+    storage.close()
+
+    assert (put.scheme, put.netloc, put.path) == ("https", "files.example.com", "/documents/uploads/1/a.pdf")
+    assert parse_qs(put.query)["X-Amz-Expires"] == ["900"]
+    assert parse_qs(get.query)["X-Amz-Expires"] == ["300"]
+    assert parse_qs(get.query)["response-content-disposition"] == ['attachment; filename="a.pdf"']
+    assert minio.calls == {}
+
+
+@pytest.mark.parametrize(
+    "public_url, public_secure, expected",
+    [
+        (None, None, "http://minio:9000/documents"),
+        ("files.example.com", None, "http://files.example.com/documents"),
+        ("files.example.com", True, "https://files.example.com/documents"),
+        (None, True, "http://minio:9000/documents"),  # only applies to MINIO_PUBLIC_URL
+    ],
+)
+def test_public_bucket_url(monkeypatch, public_url, public_secure, expected):
+    monkeypatch.setattr(Config, "MINIO_URL", "minio:9000")
+    monkeypatch.setattr(Config, "MINIO_SECURE", False)
+    monkeypatch.setattr(Config, "MINIO_PUBLIC_URL", public_url)
+    monkeypatch.setattr(Config, "MINIO_PUBLIC_SECURE", public_secure)
+
+    assert public_bucket_url("documents") == expected
+
+
+@pytest.mark.asyncio
+async def test_remove_objects_in_batches(storage, minio, monkeypatch):
+    monkeypatch.setattr(Config, "MINIO_REMOVE_BATCH_SIZE", 2)
+    for i in range(5):
+        await storage.put_object(f"doc-{i}", b"x")
+    minio.fail_removal = {"doc-3"}
+
+    removed, failed = await storage.remove_objects(f"doc-{i}" for i in range(5))
+
+    assert (removed, failed) == (4, 1)
+    assert minio.calls["remove_objects"] == 3
+    assert set(minio.buckets["documents"]) == {"doc-3"}
+
+
+@pytest.mark.asyncio
+async def test_calls_run_off_the_event_loop_and_are_bounded(minio):
+    minio.latency = 0.05
+    storage = ObjectStorage(client=minio, bucket="documents", workers=2)
+    await storage.ensure_bucket()
+
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.005)
+            ticks += 1
+
+    tick = asyncio.create_task(ticker())
+    start = time.perf_counter()
+    await asyncio.gather(*(storage.put_object(f"doc-{i}", b"x") for i in range(6)))
+    elapsed = time.perf_counter() - start
+    tick.cancel()
+    storage.close()
+
+    assert minio.max_in_flight == 2
+    assert elapsed >= 3 * minio.latency  # six calls, two at a time
+    assert ticks > 10  # the loop kept running while the calls waited
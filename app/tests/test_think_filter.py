@@ -0,0 +1,82 @@
+import pytest
+
+from app.llm_model.services import clean_think_tags, format_sse
+from app.llm_model.think_filter import ANSWER, REASONING, ThinkTagFilter
+
+TEXT = "<think>\nThe user asks about X.\n</think>\n\nX is   a  thing.\n\nSee <b>docs</b>. "
+
+
+def run(chunks: list[str]) -> list[tuple[str, str]]:
+    """Feed the chunks and merge consecutive pieces of the same kind."""
+    think_filter = ThinkTagFilter()
+    pieces = [piece for chunk in chunks for piece in think_filter.feed(chunk)]
+    pieces += list(think_filter.flush())
+    merged = []
+    for kind, text in pieces:
+        if merged and merged[-1][0] == kind:
+            merged[-1] = (kind, merged[-1][1] + text)
+        else:
+            merged.append((kind, text))
+    return merged
+
+
+def answer(pieces: list[tuple[str, str]]) -> str:
+    return "".join(text for kind, text in pieces if kind == ANSWER)
+
+
+def test_tags_split_at_every_offset():
+    expected = run([TEXT])
+    assert expected == [(REASONING, "\nThe user asks about X.\n"), (ANSWER, "X is   a  thing.\n\nSee <b>docs</b>.")]
+
+    for i in range(len(TEXT) + 1):
+        for j in range(i, len(TEXT) + 1):
+            assert run([TEXT[:i], TEXT[i:j], TEXT[j:]]) == expected, (i, j)
+
+
+def test_token_by_token_stream():
+    assert run(list(TEXT)) == run([TEXT])
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        TEXT,
+        "no tags at all",
+        "  padded answer  ",
+        "<think>only reasoning</think>",
+        "<think>a</think>first <think>b</think> second",
+        "before <think>x</think> after",
+        "<think></think>",
+        "a < b and c </think> d",
+        "<thinking> is not a tag",
+        "",
+    ],
+)
+def test_answer_matches_clean_think_tags(text):
+    assert answer(run([text])) == clean_think_tags(text)
+    assert answer(run(list(text))) == clean_think_tags(text)
+
+
+def test_unclosed_think_turns_the_rest_into_reasoning():
+    pieces = run(["Answer. <th", "ink>still thinking", " when the stream ends"])
+
+    assert pieces == [(ANSWER, "Answer."), (REASONING, "still thinking when the stream ends")]
+
+
+def test_held_back_tag_prefix_is_released_on_flush():
+    assert run(["a <thi"]) == [(ANSWER, "a <thi")]
+    assert run(["<think>x </thi"]) == [(REASONING, "x </thi")]
+
+
+def test_reasoning_events_split_across_chunks():
+    chunks = ["<thi", "nk>step 1\nstep", " 2</th", "ink>\nThe answer", "\nis 42."]
+    think_filter = ThinkTagFilter()
+    events = [format_sse(kind, piece) for chunk in chunks for kind, piece in think_filter.feed(chunk)]
+    events += [format_sse(kind, piece) for kind, piece in think_filter.flush()]
+
+    assert "".join(events) == (
+        "event: reasoning\ndata: step 1\ndata: step\n\n"
+        "event: reasoning\ndata:  2\n\n"
+        "event: answer\ndata: The answer\n\n"
+        "event: answer\ndata: \ndata: is 42.\n\n"
+    )
@@ -1,30 +1,48 @@
+import asyncio
 import redis.asyncio as redis
-import json
+from redis.exceptions import LockError
+import orjson
 from langchain_core.chat_history import BaseChatMessageHistory
 from langchain_core.messages import BaseMessage, messages_to_dict, messages_from_dict
 import logging
-from typing import List, Optional
+from typing import Awaitable, Callable, List, Optional
+
+from app.config import Config
+from app.core.redis import get_redis
 
 logger = logging.getLogger(__name__)
 
+# Rehydrations in progress in this process, by history key
+_rehydrating: dict[str, asyncio.Task] = {}
+
 class SimpleRedisHistory(BaseChatMessageHistory):
-    def __init__(self, session_id: str, redis_url: str, ttl: Optional[int] = None):
+    def __init__(
+        self,
+        session_id: str,
+        client: Optional[redis.Redis] = None,
+        ttl: Optional[int] = None,
+        max_length: Optional[int] = None,
+    ):
         """
         Initialize Redis-backed chat history.
 
         Args:
             session_id: Unique identifier for the session
-            redis_url: Redis connection URL
-            ttl: Optional time-to-live (in seconds) for Redis keys
+            client: Redis client, defaults to the application-wide pool
+            ttl: Time-to-live (in seconds) for Redis keys, defaults to CHAT_HISTORY_TTL
+            max_length: Number of messages kept in the list, defaults to CHAT_HISTORY_MAX_LENGTH,
+                or no cap in summary memory mode, where ConversationMemory.fold trims the
+                list once the trimmed messages are in the summary
         """
         if not session_id:
             raise ValueError("session_id cannot be empty")
-        if not redis_url:
-            raise ValueError("redis_url cannot be empty")
 
         self.session_id = session_id
-        self.ttl = ttl
-        self.r = redis.from_url(redis_url, decode_responses=True)
+        self.ttl = ttl if ttl is not None else Config.CHAT_HISTORY_TTL
+        if max_length is None:
+            max_length = 0 if Config.CHAT_MEMORY_MODE == "summary" else Config.CHAT_HISTORY_MAX_LENGTH
+        self.max_length = max_length
+        self.r = client or get_redis()
 
     async def ping(self):
         try:
@@ -35,26 +53,92 @@ class SimpleRedisHistory(BaseChatMessageHistory):
             logger.error(f"Failed to connect to Redis: {e}")
             raise
 
+    @property
+    def key(self) -> str:
+        return f"history:{self.session_id}"
+
+    @property
+    def summary_key(self) -> str:
+        return f"summary:{self.session_id}"
+
+    @staticmethod
+    def serialize(message: BaseMessage) -> bytes:
+        return orjson.dumps(messages_to_dict([message])[0])
+
     async def add_message(self, message: BaseMessage) -> None:
-        key = f"history:{self.session_id}"
+        key = self.key
         try:
-            msg_dict = messages_to_dict([message])[0]
-            await self.r.rpush(key, json.dumps(msg_dict))
-            if self.ttl:
-                await self.r.expire(key, self.ttl)
-        except (redis.RedisError, json.JSONEncodeError) as e:
+            # Append, cap and refresh the TTL in one round trip
+            async with self.r.pipeline(transaction=False) as pipe:
+                pipe.rpush(key, self.serialize(message))
+                if self.max_length:
+                    pipe.ltrim(key, -self.max_length, -1)
+                if self.ttl:
+                    pipe.expire(key, self.ttl)
+                await pipe.execute()
+        except (redis.RedisError, TypeError) as e:
             logger.error(f"Failed to add message: {e}")
             raise
 
+    async def rehydrate(self, loader: Callable[[], Awaitable[List[BaseMessage]]]) -> bool:
+        """
+        Refill an expired history from the database.
+
+        ``loader`` returns the recent messages of the chat, oldest first, and is
+        only called on a cache miss. Concurrent misses for the same chat share one
+        load: in this process through a shared task, across processes through a
+        Redis lock after which the key is checked again. ``loader`` must not use
+        the caller's database session, as the shared load can outlive the caller.
+        When the lock cannot be taken in time the turn goes on without the
+        older messages.
+
+        Returns:
+            True when the list was refilled
+        """
+        if await self.r.exists(self.key):
+            return False
+        task = _rehydrating.get(self.key)
+        if task is None:
+            task = asyncio.create_task(self._rehydrate(loader))
+            _rehydrating[self.key] = task
+            task.add_done_callback(lambda _: _rehydrating.pop(self.key, None))
+        return await asyncio.shield(task)
+
+    async def _rehydrate(self, loader: Callable[[], Awaitable[List[BaseMessage]]]) -> bool:
+        lock = self.r.lock(f"{self.key}:rehydrate", timeout=30, blocking_timeout=10)
+        if not await lock.acquire():
+            logger.warning(f"Rehydration lock busy for session_id={self.session_id}, continuing without it")
+            return False
+        try:
+            if await self.r.exists(self.key):
+                return False  # another process got here first
+            messages = await loader()
+            if not messages:
+                return False
+            if self.max_length:
+                messages = messages[-self.max_length:]
+            async with self.r.pipeline(transaction=True) as pipe:
+                pipe.rpush(self.key, *[self.serialize(m) for m in messages])
+                if self.ttl:
+                    pipe.expire(self.key, self.ttl)
+                await pipe.execute()
+        finally:
+            try:
+                await lock.release()
+            except LockError:
+                pass  # expired during a slow load
+        logger.info(f"Rehydrated {len(messages)} messages for session_id={self.session_id}")
+        return True
+
     async def get_messages(self, limit: Optional[int] = None) -> List[BaseMessage]:
-        key = f"history:{self.session_id}"
+        key = self.key
         try:
             if limit is None:
-                raw = [json.loads(m) for m in await self.r.lrange(key, 0, -1)]
+                raw = [orjson.loads(m) for m in await self.r.lrange(key, 0, -1)]
             else:
-                raw = [json.loads(m) for m in await self.r.lrange(key, -limit, -1)]
+                raw = [orjson.loads(m) for m in await self.r.lrange(key, -limit, -1)]
             return messages_from_dict(raw)
-        except (redis.RedisError, json.JSONDecodeError) as e:
+        except (redis.RedisError, orjson.JSONDecodeError) as e:
             logger.error(f"Failed to retrieve messages: {e}")
             return []
 
@@ -63,9 +147,17 @@ class SimpleRedisHistory(BaseChatMessageHistory):
         """Get all messages in the history."""
         return await self.get_messages()
 
+    async def get_summary(self) -> str:
+        """Rolling summary of the messages already trimmed from the list."""
+        try:
+            return await self.r.get(self.summary_key) or ""
+        except redis.RedisError as e:
+            logger.error(f"Failed to retrieve summary: {e}")
+            return ""
+
     async def clear(self) -> None:
         try:
-            await self.r.delete(f"history:{self.session_id}")
+            await self.r.delete(self.key, self.summary_key)
             logger.info(f"Cleared history for session_id={self.session_id}")
         except redis.RedisError as e:
             logger.error(f"Failed to clear history: {e}")
@@ -1,10 +1,7 @@
 import logging
-from transformers import AutoTokenizer
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_docling import DoclingLoader
-from langchain_huggingface import HuggingFaceEmbeddings
+import re
 from app.config import Config
-from typing import Optional, Dict, Any
+from app.core.model_registry import ModelRegistry, model_registry
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -12,60 +9,57 @@ logger = logging.getLogger(__name__)
 EMBEDDING_MODEL = Config.EMBEDDING_MODEL
 PSYCOPG_CONNECT = Config.PSYCOPG_CONNECT
 
-class DocProcessor(DoclingLoader):
-    """Class to split tokens from file and chunk it efficiently."""
+class DocProcessor:
+    """Class to split tokens from file and chunk it efficiently.
 
-    # Class-level cache (shared across instances). Singleton instance
-    _tokenizers: dict[str, Any] = {}
-    _embedders: dict[str, Any] = {}
+    Cheap to create: the tokenizer, embedder and Docling parser come from the
+    model registry and are loaded on first use, not when the processor is built.
+    """
 
     def __init__(
         self,
         model: str = EMBEDDING_MODEL,
         chunk_size: int = 512,
         chunk_overlap: int = 50,
-        model_kwargs: Optional[Dict[str, Any]] = None,
-        encode_kwargs: Optional[Dict[str, Any]] = None,
+        registry: ModelRegistry | None = None,
     ):
-        if model_kwargs is None:
-            model_kwargs = {"device": "cpu", "local_files_only": True}
-        if encode_kwargs is None:
-            encode_kwargs = {"normalize_embeddings": True}
+        self.model = model
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.registry = registry or model_registry
+        self._text_splitter = None
 
-        # Load tokenizer once per model
-        if model not in DocProcessor._tokenizers:
-            logger.info(f"Loading tokenizer for {model}...")
-            DocProcessor._tokenizers[model] = AutoTokenizer.from_pretrained(
-                model,
-                use_fast=True,
-                local_files_only=True,
-            )
+    @property
+    def tokenizer(self):
+        return self.registry.tokenizer(self.model)
 
-        # Load embedder once per model
-        if model not in DocProcessor._embedders:
-            logger.info(f"Loading embedder for {model}...")
-            DocProcessor._embedders[model] = HuggingFaceEmbeddings(
-                model_name=model,
-                model_kwargs=model_kwargs,
-                encode_kwargs=encode_kwargs,
-            )
+    @property
+    def embedder(self):
+        return self.registry.embedder(self.model)
 
-        # Assign references
-        self.tokenizer = DocProcessor._tokenizers[model]
-        self.embedder = DocProcessor._embedders[model]
+    @property
+    def text_splitter(self):
+        if self._text_splitter is None:
+            from langchain.text_splitter import RecursiveCharacterTextSplitter
 
-        # Initialize text splitter
-        self.text_splitter = RecursiveCharacterTextSplitter.from_huggingface_tokenizer(
-            tokenizer=self.tokenizer,
-            chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap,
-        )
+            self._text_splitter = RecursiveCharacterTextSplitter.from_huggingface_tokenizer(
+                tokenizer=self.tokenizer,
+                chunk_size=self.chunk_size,
+                chunk_overlap=self.chunk_overlap,
+            )
+        return self._text_splitter
 
     def load_and_split(self, file_path: str):
-        try:
-            super().__init__(file_path=file_path)
+        from langchain_docling import DoclingLoader
 
-            for doc in self.lazy_load():  # Load each document chunk
+        try:
+            # A loader per file, sharing the converter and chunker of the registry
+            loader = DoclingLoader(
+                file_path=file_path,
+                converter=self.registry.document_converter(),
+                chunker=self.registry.document_chunker(),
+            )
+            for doc in loader.lazy_load():  # Load each document chunk
                 for chunk in self.text_splitter.split_text(
                     doc.page_content
                 ):  # Chunk for each document chunk
@@ -86,8 +80,6 @@ class DocProcessor(DoclingLoader):
 
     def _clean_text(self, text: str) -> str:
         """Clean input text to reduce processing load."""
-        import re
-
         text = re.sub(r"\s+", " ", text)  # Normalize whitespace
         # text = re.sub(r"[^\w\s]", "", text)  # Remove special characters (if needed)
-        return text.strip()
\ No newline at end of file
+        return text.strip()
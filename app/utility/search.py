@@ -1,65 +1,77 @@
-from app.config import Config
-import psycopg
-from pgvector.psycopg import register_vector
 import numpy as np
 from typing import Any
+from dataclasses import dataclass
 from langchain_community.vectorstores.utils import maximal_marginal_relevance
 from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlmodel import select
-from app.core.model import Chunk
+from app.core.model import Chunk, Document
+from app.core.session import vector_connection
 import logging
 from uuid import UUID
-from app.utility.doc_processor import DocProcessor
+from app.embedding.encoder import get_encoder
+from app.error import EmbeddingUnavailable
+from app.core.metrics import STAGE_DURATION
 
 logger = logging.getLogger(__name__)
-PSYCOPG_CONNECT = Config.PSYCOPG_CONNECT
 
-doc_processor = DocProcessor()
+
+@dataclass
+class RetrievedChunk:
+    chunk_id: UUID
+    document_id: UUID
+    file_name: str
+    content: str
+
+
+def select_mmr(query_vector: np.ndarray, rows: list, k: int = 4, lambda_mult: float = 0.7) -> list:
+    """The ``k`` rows of a vector search (vector in column 3) picked by maximal marginal relevance, best first."""
+    vectors_list = np.vstack([np.asarray(row[3], dtype=np.float32) for row in rows])
+    indices = maximal_marginal_relevance(query_vector, vectors_list, k=k, lambda_mult=lambda_mult)
+    return [rows[i] for i in indices]
 
 
 class SearchServices:
-    def __init__(self, db: str, vector_table: str):
+    def __init__(self, vector_table: str):
         super().__init__()
-        self.db = db
         self.vector_table = vector_table
 
-    async def get_content_by_chunk_id(self, chunks_id: list[UUID] | UUID, session: AsyncSession) -> list[str] | str:
+    async def get_content_by_chunk_id(self, chunks_id: list[UUID], session: AsyncSession) -> list[RetrievedChunk]:
+        """Fetch chunk contents with their source document, keeping the order of ``chunks_id``."""
         uuid_list = [i for i in chunks_id]
-        statement = select(Chunk).where(Chunk.id.in_(uuid_list))
+        statement = (
+            select(Chunk.id, Chunk.document_id, Document.file_name, Chunk.content)
+            .join(Document, Document.id == Chunk.document_id)
+            .where(Chunk.id.in_(uuid_list))
+        )
         results = await session.exec(statement)
-        contents = [chunk.content for chunk in results]
-        return contents
+        by_id = {row.id: RetrievedChunk(*row) for row in results}
+        return [by_id[i] for i in uuid_list if i in by_id]
 
     async def search(self,
                      query: str,
                      distance_function: str = str("<=>"),  # <=> cosine distance in pgvector
                      hnsw_ef_search: int = 40,
                      top_k: int = 4,
+                     query_vector: np.ndarray | None = None,
                      ) -> Any:
         try:
-            vector = doc_processor.encode(texts=query)
-            np_vector = np.array(
-                vector, dtype=np.float32
-            )  # Convert to Numpy array
-            with psycopg.connect(self.db, autocommit=True) as conn:
-                register_vector(conn)
-                cur = conn.cursor()
-
-                cur.execute(
-                    f"""
-                        BEGIN;
-                        SET LOCAL hnsw.ef_search = {hnsw_ef_search};
-                        COMMIT;
-                    """
-                )
-
-                cur.execute(
-                    f"SELECT * FROM {self.vector_table} ORDER BY vector {distance_function} %s LIMIT {top_k}",
-                    (np_vector,),
-                )
-                results = cur.fetchall()
-                return results
-
+            if query_vector is None:
+                with STAGE_DURATION.labels("query_encode").time():
+                    query_vector = (await get_encoder().encode([query]))[0]
+            np_vector = np.asarray(query_vector, dtype=np.float32)
+            with STAGE_DURATION.labels("vector_search").time():
+                async with vector_connection() as conn:
+                    # SET LOCAL only lasts until the end of the transaction around the query
+                    async with conn.transaction():
+                        await conn.execute(f"SET LOCAL hnsw.ef_search = {int(hnsw_ef_search)}")
+                        results = await conn.fetch(
+                            f"SELECT * FROM {self.vector_table} ORDER BY vector {distance_function} $1 LIMIT {int(top_k)}",
+                            np_vector,
+                        )
+            return results
+
+        except EmbeddingUnavailable:
+            raise  # answered 503 by its handler
         except Exception as e:
             logger.error(f"Vector search failed {str(e)}")
 
@@ -72,28 +84,26 @@ class SearchServices:
             hnsw_ef_search: int = 40,
             fetch_k: int = 30,
             lambda_mult: float = 0.7
-    ) -> list[str] | str:
-        """Calculate maximal marginal relevance."""
+    ) -> list[RetrievedChunk]:
+        """Calculate maximal marginal relevance. Chunks are returned best first."""
         try:
 
-            vector = doc_processor.encode(query)
-            np_vector = np.array(vector, dtype=np.float32)
+            with STAGE_DURATION.labels("query_encode").time():
+                np_vector = (await get_encoder().encode([query]))[0]
 
+            # The query is encoded once for both the search and the MMR ranking
             search_to_get_vectors = await self.search(query=query, distance_function=distance_function,
                                                 hnsw_ef_search=hnsw_ef_search,
-                                                top_k=fetch_k)
-
-            convert_to_np = [np.array(row[3], dtype=np.float32) for row in search_to_get_vectors]
-
-            vectors_list = np.vstack(convert_to_np)
+                                                top_k=fetch_k, query_vector=np_vector)
 
-            indices = maximal_marginal_relevance(
-                np_vector, vectors_list, k=k, lambda_mult=lambda_mult
-            )
+            with STAGE_DURATION.labels("mmr").time():
+                mmr_results = select_mmr(np_vector, search_to_get_vectors, k=k, lambda_mult=lambda_mult)
 
-            mmr_results = [search_to_get_vectors[i] for i in indices]
             chunks_id = [doc[2] for doc in mmr_results]
-            contents = await self.get_content_by_chunk_id(chunks_id=chunks_id, session=session)
+            with STAGE_DURATION.labels("content_fetch").time():
+                contents = await self.get_content_by_chunk_id(chunks_id=chunks_id, session=session)
             return contents
+        except EmbeddingUnavailable:
+            raise  # answered 503 by its handler
         except Exception as e:
             logger.error(f"MMR search failed {str(e)}")
@@ -1,15 +1,48 @@
+import asyncio
+import hashlib
 import logging
+import secrets
 import uuid
 import jwt
 
 from itsdangerous import URLSafeSerializer
 from passlib.context import CryptContext
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta, timezone, datetime
 from fastapi.security import OAuth2PasswordBearer, APIKeyHeader
 
 from app.config import Config
+from app.error import PasswordHashingBusy
+
+
+def build_pwd_context(scheme: str | None = None, rounds: int | None = None) -> CryptContext:
+    """
+    New hashes use ``scheme`` at ``rounds``. Hashes in a legacy scheme or with
+    fewer rounds still verify, and are flagged so login can rehash them.
+    """
+    scheme = scheme or Config.PASSWORD_HASH_SCHEME
+    rounds = rounds or Config.PASSWORD_HASH_ROUNDS
+    settings = {}
+    if rounds:
+        settings[f"{scheme}__default_rounds"] = rounds
+        settings[f"{scheme}__min_rounds"] = rounds
+    return CryptContext(
+        schemes=list(dict.fromkeys([scheme, *Config.PASSWORD_LEGACY_SCHEMES])),
+        default=scheme,
+        deprecated="auto",
+        **settings,
+    )
+
+
+pwd_context = build_pwd_context()
+
+# Hashing is CPU bound and takes tens to hundreds of milliseconds; it runs on a
+# small pool so it never blocks the event loop that streams chat responses.
+_hash_executor = ThreadPoolExecutor(
+    max_workers=Config.PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash"
+)
+_hash_pending = 0
 
-pwd_context = CryptContext(schemes=["sha512_crypt"], deprecated="auto")
 oauth_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/login")
 api_key_header = APIKeyHeader(name="X-API-Key", auto_error=False)
 
@@ -32,6 +65,49 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+async def _run_hashing(func, *args):
+    """Run a hashing call on the pool; fail fast when too many are queued."""
+    global _hash_pending
+    if _hash_pending >= Config.PASSWORD_HASH_MAX_PENDING:
+        raise PasswordHashingBusy()
+    _hash_pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_hash_executor, func, *args)
+    finally:
+        _hash_pending -= 1
+
+
+async def hash_password(password: str) -> str:
+    return await _run_hashing(pwd_context.hash, password)
+
+
+async def verify_and_update_password(
+    plain_password: str, hashed_password: str
+) -> tuple[bool, str | None]:
+    """
+    Returns:
+        Whether the password matches, and a new hash when the stored one uses
+        an outdated scheme or cost
+    """
+    return await _run_hashing(pwd_context.verify_and_update, plain_password, hashed_password)
+
+
+def shutdown_hash_executor() -> None:
+    _hash_executor.shutdown(wait=False, cancel_futures=True)
+
+
+def generate_api_key() -> str:
+    return f"sk-{secrets.token_hex(32)}"
+
+
+def hash_api_key(api_key: str) -> str:
+    """
+    Keys are 256 random bits, so a plain SHA-256 is enough to store them and,
+    unlike a password hash, cheap enough to compute on every request.
+    """
+    return hashlib.sha256(api_key.encode()).hexdigest()
+
+
 def decode_url_safe_token(token: str):
     try:
         token_data = serialize.loads(token)
@@ -0,0 +1,144 @@
+"""
+Per-request overhead of JWT authentication.
+
+Runs the auth dependencies the way a route with both ``AccessTokenBearer`` and
+``get_current_user`` does, without HTTP around them::
+
+    python -m benchmarks.auth_bench --requests 5000 --redis-latency-ms 0.3 --db-latency-ms 1
+
+Two paths are measured:
+
+* ``uncached``: what every request paid before: the token decoded twice, a
+  blocklist lookup in Redis per decode and a user SELECT;
+* ``cached``: the token decoded once per request, revoked JTIs checked in the
+  local set and the user served from the in-process cache.
+
+Redis and Postgres are replaced by in-memory fakes with a fixed simulated round
+trip, so the numbers isolate the auth code from network noise. Pass
+``--redis-url`` to use a real Redis for the blocklist instead.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from datetime import timedelta
+from types import SimpleNamespace
+from uuid import uuid4
+
+from app.auth import cache
+from app.auth.dependency import AccessTokenBearer, get_current_user
+from app.core import redis as core_redis
+from app.core.model import User
+from app.utility.security import create_access_token
+
+
+class LatencyRedis:
+    """Wraps a Redis client and adds a fixed delay to every command."""
+
+    def __init__(self, client, latency: float):
+        self._client = client
+        self._latency = latency
+
+    def __getattr__(self, name):
+        attribute = getattr(self._client, name)
+        if not callable(attribute):
+            return attribute
+
+        async def command(*args, **kwargs):
+            await asyncio.sleep(self._latency)
+            return await attribute(*args, **kwargs)
+
+        return command
+
+
+class FakeSession:
+    """Stands in for AsyncSession.get with a simulated round trip."""
+
+    def __init__(self, user: User, latency: float):
+        self.user = user
+        self.latency = latency
+        self.queries = 0
+
+    async def get(self, model, ident):
+        self.queries += 1
+        await asyncio.sleep(self.latency)
+        return self.user
+
+
+async def authenticate(token: str, session: FakeSession) -> User:
+    request = SimpleNamespace(state=SimpleNamespace())
+    bearer = AccessTokenBearer()
+    await bearer(request, token)  # route dependency
+    payload = await bearer(request, token)  # inside get_current_user
+    return await get_current_user(payload, session)
+
+
+def summarize(samples: list[float]) -> dict:
+    ordered = sorted(samples)
+    return {
+        "mean_us": round(statistics.mean(samples) * 1e6, 1),
+        "p50_us": round(ordered[len(ordered) // 2] * 1e6, 1),
+        "p99_us": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1e6, 1),
+    }
+
+
+async def run_path(name: str, token: str, session: FakeSession, requests: int, cached: bool) -> dict:
+    user_id = str(session.user.id)
+    cache.revoked_tokens.synced = cached  # unsynced means every lookup goes to Redis
+    cache.user_cache.invalidate(user_id)
+
+    samples = []
+    session.queries = 0
+    for _ in range(requests):
+        start = time.perf_counter()
+        if cached:
+            await authenticate(token, session)
+        else:
+            # No per-request reuse and no user cache: each bearer decodes and
+            # hits Redis, and the user is read from the database
+            cache.user_cache.invalidate(user_id)
+            bearer = AccessTokenBearer()
+            await bearer(SimpleNamespace(state=SimpleNamespace()), token)
+            payload = await bearer(SimpleNamespace(state=SimpleNamespace()), token)
+            await get_current_user(payload, session)
+        samples.append(time.perf_counter() - start)
+    return {"path": name, "db_queries": session.queries, **summarize(samples)}
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--redis-url", default=None, help="real Redis for the blocklist (default: in-memory fake)")
+    parser.add_argument("--redis-latency-ms", type=float, default=0.3)
+    parser.add_argument("--db-latency-ms", type=float, default=1.0)
+    args = parser.parse_args()
+
+    if args.redis_url:
+        import redis.asyncio as aioredis
+
+        client = aioredis.from_url(args.redis_url, decode_responses=True)
+    else:
+        import fakeredis
+
+        client = LatencyRedis(fakeredis.FakeAsyncRedis(decode_responses=True), args.redis_latency_ms / 1000)
+    core_redis._client = client
+
+    user = User(id=uuid4(), email="bench@example.com", username="bench", role="user", is_verified=True)
+    token = create_access_token(
+        user_data={"email": user.email, "user_id": str(user.id), "role": user.role},
+        expire_delta=timedelta(hours=1),
+    )
+    session = FakeSession(user, args.db_latency_ms / 1000)
+
+    results = [
+        await run_path("uncached", token, session, args.requests, cached=False),
+        await run_path("cached", token, session, args.requests, cached=True),
+    ]
+    print(json.dumps({"requests": args.requests, "results": results}, indent=2))
+    if args.redis_url:
+        await client.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
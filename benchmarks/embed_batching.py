@@ -0,0 +1,114 @@
+"""
+Query embedding throughput and latency, one forward pass per call vs
+micro-batched concurrent calls::
+
+    python -m benchmarks.embed_batching --clients 64 --queries 20 --max-batch-size 32 --max-wait-ms 5
+
+``--clients`` coroutines each embed ``--queries`` single queries back to back,
+like concurrent chat turns. Two paths are measured:
+
+* ``unbatched``: every call is its own forward pass on the encoder thread;
+* ``batched``: the same calls through ``BatchingEncoder``.
+
+By default the model is a stand-in whose forward pass holds its thread for
+``--pass-overhead-ms + n * --per-text-ms`` (a small model on CPU pays most
+of a batch-size-1 pass in fixed overhead). Pass ``--model`` to run a real
+sentence-transformers model instead.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from app.embedding.encoder import BatchingEncoder, LocalEncoder
+
+
+class SimulatedEmbedder:
+    def __init__(self, overhead: float, per_text: float, dim: int = 384):
+        self.overhead = overhead
+        self.per_text = per_text
+        self.dim = dim
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        time.sleep(self.overhead + self.per_text * len(texts))
+        return [[0.0] * self.dim for _ in texts]
+
+
+class SimulatedRegistry:
+    def __init__(self, embedder: SimulatedEmbedder):
+        self._embedder = embedder
+
+    def embedder(self, model=None):
+        return self._embedder
+
+
+def summarize(samples: list[float]) -> dict:
+    ordered = sorted(samples)
+    return {
+        "mean_ms": round(statistics.mean(samples) * 1e3, 2),
+        "p50_ms": round(ordered[len(ordered) // 2] * 1e3, 2),
+        "p99_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1e3, 2),
+    }
+
+
+async def run_path(name: str, encoder, clients: int, queries: int) -> dict:
+    samples = []
+
+    async def client(n: int) -> None:
+        for i in range(queries):
+            start = time.perf_counter()
+            await encoder.encode([f"what does section {i} of document {n} say?"])
+            samples.append(time.perf_counter() - start)
+
+    await encoder.encode(["warmup"])
+    start = time.perf_counter()
+    await asyncio.gather(*(client(n) for n in range(clients)))
+    elapsed = time.perf_counter() - start
+    await encoder.close()
+    return {"path": name, "queries_per_second": round(len(samples) / elapsed, 1), **summarize(samples)}
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=64)
+    parser.add_argument("--queries", type=int, default=20, help="queries per client")
+    parser.add_argument("--max-batch-size", type=int, default=32)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    parser.add_argument("--threads", type=int, default=1, help="encoder threads")
+    parser.add_argument("--pass-overhead-ms", type=float, default=8.0)
+    parser.add_argument("--per-text-ms", type=float, default=0.5)
+    parser.add_argument("--model", default=None, help="real embedding model (default: simulated)")
+    args = parser.parse_args()
+
+    if args.model:
+        from app.core.model_registry import ModelRegistry
+
+        registry = ModelRegistry()
+    else:
+        registry = SimulatedRegistry(SimulatedEmbedder(args.pass_overhead_ms / 1000, args.per_text_ms / 1000))
+
+    def local() -> LocalEncoder:
+        return LocalEncoder(registry=registry, model=args.model, threads=args.threads)
+
+    results = [
+        await run_path("unbatched", local(), args.clients, args.queries),
+        await run_path(
+            "batched",
+            BatchingEncoder(local(), args.max_batch_size, args.max_wait_ms / 1000, concurrency=args.threads),
+            args.clients,
+            args.queries,
+        ),
+    ]
+    print(json.dumps({
+        "clients": args.clients,
+        "queries": args.clients * args.queries,
+        "model": args.model or "simulated",
+        "max_batch_size": args.max_batch_size,
+        "max_wait_ms": args.max_wait_ms,
+        "results": results,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
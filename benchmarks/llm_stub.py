@@ -0,0 +1,211 @@
+"""
+Local stand-in for an LLM server, for benchmarks that must run offline. It
+speaks both the Ollama API (``/api/...``) and the OpenAI-compatible chat
+completions API (``/v1/...``).
+
+It streams canned tokens with a configurable delay and models the two costs
+that matter for time-to-first-token:
+
+* loading: the first request after the model was unloaded (or idle longer than
+  ``keep_alive``) waits ``--load-delay`` seconds;
+* prefill: each prompt character not shared with the previous prompt's prefix
+  costs ``--prefill-per-char`` seconds, like a runtime reusing its prompt cache.
+
+Run with::
+
+    python -m benchmarks.llm_stub --port 11500 --load-delay 3 --token-latency 0.02
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from datetime import datetime, timezone
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+class StubState:
+    def __init__(self, load_delay: float, token_latency: float, prefill_per_char: float, tokens: int):
+        self.load_delay = load_delay
+        self.token_latency = token_latency
+        self.prefill_per_char = prefill_per_char
+        self.tokens = tokens
+        self.loaded: dict[str, float] = {}  # model -> unload deadline
+        self.last_prompt = ""
+        self.lock = asyncio.Lock()
+
+    @staticmethod
+    def _keep_alive_seconds(value) -> float:
+        if value is None:
+            return 300.0
+        if isinstance(value, (int, float)):
+            return float(value) if value >= 0 else float("inf")
+        units = {"s": 1, "m": 60, "h": 3600}
+        value = str(value)
+        if value.lstrip("-").isdigit():
+            return float(value) if int(value) >= 0 else float("inf")
+        return float(value[:-1]) * units.get(value[-1], 1)
+
+    def is_loaded(self, model: str) -> bool:
+        return self.loaded.get(model, 0) > time.monotonic()
+
+    async def ensure_loaded(self, model: str, keep_alive) -> float:
+        """Load the model if needed; returns the load time paid by this call."""
+        async with self.lock:
+            paid = 0.0
+            if not self.is_loaded(model):
+                self.last_prompt = ""
+                await asyncio.sleep(self.load_delay)
+                paid = self.load_delay
+            self.loaded[model] = time.monotonic() + self._keep_alive_seconds(keep_alive)
+            return paid
+
+    async def prefill(self, prompt: str) -> float:
+        shared = len(os.path.commonprefix([prompt, self.last_prompt]))
+        self.last_prompt = prompt
+        delay = (len(prompt) - shared) * self.prefill_per_char
+        await asyncio.sleep(delay)
+        return delay
+
+
+def _tagged(model: str) -> str:
+    """Ollama reports untagged model names as ``name:latest``."""
+    return model if ":" in model else f"{model}:latest"
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _prompt_from_messages(messages: list[dict]) -> str:
+    return "".join(f"{m.get('role')}:{m.get('content')}\n" for m in messages)
+
+
+def create_app(state: StubState) -> FastAPI:
+    app = FastAPI(title="LLM stub")
+
+    @app.get("/api/tags")
+    async def tags():
+        return {"models": [{"name": m, "model": m} for m in state.loaded]}
+
+    @app.get("/api/ps")
+    async def ps():
+        return {
+            "models": [
+                {"name": m, "model": m}
+                for m in list(state.loaded)
+                if state.is_loaded(m)
+            ]
+        }
+
+    @app.post("/api/generate")
+    async def generate(request: Request):
+        body = await request.json()
+        model = _tagged(body["model"])
+        if body.get("keep_alive") in (0, "0", "0s"):
+            state.loaded.pop(model, None)
+            return {"model": model, "created_at": _now(), "response": "", "done": True, "done_reason": "unload"}
+        load = await state.ensure_loaded(model, body.get("keep_alive"))
+        return {
+            "model": model,
+            "created_at": _now(),
+            "response": "",
+            "done": True,
+            "done_reason": "load",
+            "load_duration": int(load * 1e9),
+        }
+
+    @app.post("/api/chat")
+    async def chat(request: Request):
+        body = await request.json()
+        model = _tagged(body["model"])
+        num_predict = (body.get("options") or {}).get("num_predict") or state.tokens
+        num_predict = min(num_predict, state.tokens) if num_predict > 0 else state.tokens
+        prompt = _prompt_from_messages(body.get("messages") or [])
+
+        async def events():
+            load = await state.ensure_loaded(model, body.get("keep_alive"))
+            prefill = await state.prefill(prompt)
+            for i in range(num_predict):
+                await asyncio.sleep(state.token_latency)
+                yield json.dumps({
+                    "model": model,
+                    "created_at": _now(),
+                    "message": {"role": "assistant", "content": f"tok{i} "},
+                    "done": False,
+                }) + "\n"
+            yield json.dumps({
+                "model": model,
+                "created_at": _now(),
+                "message": {"role": "assistant", "content": ""},
+                "done": True,
+                "done_reason": "stop",
+                "load_duration": int(load * 1e9),
+                "prompt_eval_count": len(prompt),
+                "prompt_eval_duration": int(prefill * 1e9),
+                "eval_count": num_predict,
+            }) + "\n"
+
+        if body.get("stream", True):
+            return StreamingResponse(events(), media_type="application/x-ndjson")
+        chunks = [json.loads(line) async for line in events()]
+        final = chunks[-1]
+        final["message"]["content"] = "".join(c["message"]["content"] for c in chunks)
+        return JSONResponse(final)
+
+    @app.get("/v1/models")
+    async def openai_models():
+        return {"object": "list", "data": [{"id": m, "object": "model"} for m in state.loaded]}
+
+    @app.post("/v1/chat/completions")
+    async def openai_chat(request: Request):
+        body = await request.json()
+        model = body["model"]
+        num_predict = min(body.get("max_tokens") or state.tokens, state.tokens)
+        prompt = _prompt_from_messages(body.get("messages") or [])
+
+        async def events():
+            await state.ensure_loaded(model, None)
+            await state.prefill(prompt)
+            for i in range(num_predict):
+                await asyncio.sleep(state.token_latency)
+                chunk = {
+                    "id": "chatcmpl-stub",
+                    "object": "chat.completion.chunk",
+                    "model": model,
+                    "choices": [{"index": 0, "delta": {"content": f"tok{i} "}, "finish_reason": None}],
+                }
+                yield f"data: {json.dumps(chunk)}\n\n"
+            done = {
+                "id": "chatcmpl-stub",
+                "object": "chat.completion.chunk",
+                "model": model,
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+            }
+            yield f"data: {json.dumps(done)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline LLM stub server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11500)
+    parser.add_argument("--load-delay", type=float, default=2.0, help="seconds to load a cold model")
+    parser.add_argument("--token-latency", type=float, default=0.02, help="seconds between streamed tokens")
+    parser.add_argument("--prefill-per-char", type=float, default=0.0001, help="seconds per uncached prompt char")
+    parser.add_argument("--tokens", type=int, default=64, help="tokens per response")
+    args = parser.parse_args()
+
+    state = StubState(args.load_delay, args.token_latency, args.prefill_per_char, args.tokens)
+    uvicorn.run(create_app(state), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
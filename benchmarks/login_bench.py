@@ -0,0 +1,100 @@
+"""
+Login throughput and event-loop lag during a login storm.
+
+Fires ``--logins`` concurrent password checks, the CPU-bound part of
+``login_user``, while a ticker coroutine measures how late the event loop wakes
+it up, which is what a chat token stream on the same worker experiences::
+
+    python -m benchmarks.login_bench --logins 32 --scheme pbkdf2_sha256 --workers 2
+
+Two modes are measured:
+
+* ``inline``: what login did before: ``pwd_context.verify`` on the event loop;
+* ``executor``: ``verify_and_update_password`` on the bounded hashing pool.
+
+``--scheme`` and ``--rounds`` pick the hash that is verified, so the cost of a
+scheme change can be seen before rolling it out.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from app.config import Config
+from app.utility import security
+
+
+def percentile(ordered: list[float], fraction: float) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def ticker(interval: float, lags: list[float], stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+
+
+async def storm(name: str, logins: int, password: str, hashed: str, interval: float) -> dict:
+    async def inline() -> None:
+        assert security.pwd_context.verify(password, hashed)
+
+    async def offloaded() -> None:
+        valid, _ = await security.verify_and_update_password(password, hashed)
+        assert valid
+
+    login = inline if name == "inline" else offloaded
+    lags: list[float] = []
+    stop = asyncio.Event()
+    tick = asyncio.create_task(ticker(interval, lags, stop))
+    await asyncio.sleep(interval * 2)  # ticker is running before the storm starts
+
+    start = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await tick
+
+    ordered = sorted(lags) or [0.0]
+    return {
+        "mode": name,
+        "logins_per_sec": round(logins / elapsed, 1),
+        "elapsed_s": round(elapsed, 3),
+        "loop_lag_p50_ms": round(statistics.median(ordered) * 1000, 2),
+        "loop_lag_p99_ms": round(percentile(ordered, 0.99) * 1000, 2),
+        "loop_lag_max_ms": round(ordered[-1] * 1000, 2),
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=32)
+    parser.add_argument("--scheme", default=Config.PASSWORD_HASH_SCHEME)
+    parser.add_argument("--rounds", type=int, default=Config.PASSWORD_HASH_ROUNDS)
+    parser.add_argument("--workers", type=int, default=Config.PASSWORD_HASH_WORKERS)
+    parser.add_argument("--tick-ms", type=float, default=5.0, help="ticker interval standing in for a token stream")
+    args = parser.parse_args()
+
+    Config.PASSWORD_HASH_WORKERS = args.workers
+    Config.PASSWORD_HASH_MAX_PENDING = max(Config.PASSWORD_HASH_MAX_PENDING, args.logins)
+    security.pwd_context = security.build_pwd_context(args.scheme, args.rounds)
+    security._hash_executor = security.ThreadPoolExecutor(
+        max_workers=args.workers, thread_name_prefix="password-hash"
+    )
+
+    password = "correct horse battery staple"
+    hashed = security.pwd_context.hash(password)
+    results = [
+        await storm(mode, args.logins, password, hashed, args.tick_ms / 1000)
+        for mode in ("inline", "executor")
+    ]
+    security.shutdown_hash_executor()
+    print(json.dumps(
+        {"logins": args.logins, "scheme": args.scheme, "rounds": args.rounds, "workers": args.workers, "results": results},
+        indent=2,
+    ))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,101 @@
+"""
+Concurrent streaming load through the provider layer and the LLM gateway.
+
+    python -m benchmarks.llm_stub --port 11500 --token-latency 0.01 &
+    python -m benchmarks.stream_load --type openai --base-url http://127.0.0.1:11500/v1 \\
+        --concurrency 64 --requests 256 --max-concurrency 8
+
+Reports time-to-first-token (including time queued in the gateway), stream
+duration and aggregate tokens/sec.
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from app.config import LLMProviderSettings
+from app.core.http import close_http_client
+from app.error import LLMQueueFull, LLMServiceBusy
+from app.llm_model.gateway import LLMGateway
+from app.llm_model.providers import PROVIDER_TYPES
+
+
+def percentile(samples: list[float], q: float) -> float:
+    ordered = sorted(samples)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * q))] * 1000, 2)
+
+
+async def one_stream(provider, gateway: LLMGateway, tenant: str, results: dict) -> None:
+    start = time.perf_counter()
+    try:
+        ticket = gateway.enqueue(tenant)
+    except (LLMQueueFull, LLMServiceBusy):
+        results["rejected"] += 1
+        return
+    first = None
+    tokens = 0
+    async with ticket:
+        messages = [SystemMessage("stub system prompt"), HumanMessage(f"question from {tenant}")]
+        async for _ in provider.astream(messages):
+            if first is None:
+                first = time.perf_counter() - start
+            tokens += 1
+    results["ttft"].append(first or 0.0)
+    results["duration"].append(time.perf_counter() - start)
+    results["tokens"] += tokens
+
+
+async def run(args) -> dict:
+    settings = LLMProviderSettings(type=args.type, base_url=args.base_url, model=args.model, max_tokens=args.tokens)
+    provider = PROVIDER_TYPES[args.type]("bench", settings)
+    gateway = LLMGateway(
+        name="bench",
+        max_concurrency=args.max_concurrency,
+        max_queue=args.max_queue,
+        max_queued_per_tenant=args.max_queue,
+        admission_grace=10,
+    )
+    results = {"ttft": [], "duration": [], "tokens": 0, "rejected": 0}
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def client(i: int) -> None:
+        async with semaphore:
+            await one_stream(provider, gateway, f"user:{i % args.tenants}", results)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(i) for i in range(args.requests)))
+    elapsed = time.perf_counter() - start
+    await close_http_client()
+
+    return {
+        "requests": args.requests,
+        "completed": len(results["ttft"]),
+        "rejected": results["rejected"],
+        "ttft_p50_ms": percentile(results["ttft"], 0.5),
+        "ttft_p99_ms": percentile(results["ttft"], 0.99),
+        "stream_p50_ms": percentile(results["duration"], 0.5),
+        "stream_p99_ms": percentile(results["duration"], 0.99),
+        "tokens_per_sec": round(results["tokens"] / elapsed, 1),
+        "elapsed_s": round(elapsed, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming load test through the LLM provider layer")
+    parser.add_argument("--type", choices=sorted(PROVIDER_TYPES), default="ollama")
+    parser.add_argument("--base-url", default="http://127.0.0.1:11500")
+    parser.add_argument("--model", default="stub")
+    parser.add_argument("--tokens", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=128)
+    parser.add_argument("--concurrency", type=int, default=32, help="concurrent clients")
+    parser.add_argument("--tenants", type=int, default=8, help="distinct users sharing the load")
+    parser.add_argument("--max-concurrency", type=int, default=4, help="gateway slots")
+    parser.add_argument("--max-queue", type=int, default=1024)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Cold vs warm time-to-first-token of the chat model.
+
+Point it at a real Ollama or at the offline stub::
+
+    python -m benchmarks.llm_stub --port 11500 &
+    python -m benchmarks.ttft --base-url http://127.0.0.1:11500 --model stub --runs 10
+
+Three cases are measured, each on the same prompt layout the chat endpoint uses:
+
+* ``cold``: the model was unloaded, the request pays load + full prefill;
+* ``warmed``: the model was unloaded, then ``OllamaProvider.warm`` ran (as in
+  the app lifespan) before the request;
+* ``warm``: steady state, consecutive requests sharing the system prompt prefix.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from contextlib import aclosing
+
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from app.config import LLMProviderSettings
+from app.core.http import close_http_client
+from app.llm_model.prompt import ANSWER_SYSTEM_PROMPT
+from app.llm_model.providers import OllamaProvider
+
+
+async def time_to_first_token(provider, question: str) -> float:
+    messages = [
+        SystemMessage(ANSWER_SYSTEM_PROMPT),
+        HumanMessage(f"Dữ liệu tham khảo:\n[1] (bench.txt) ...\n\nCâu hỏi: {question}"),
+    ]
+    start = time.perf_counter()
+    async with aclosing(provider.astream(messages)) as stream:
+        async for _ in stream:
+            break
+    return time.perf_counter() - start
+
+
+def summary(samples: list[float]) -> dict:
+    ordered = sorted(samples)
+    return {
+        "runs": len(ordered),
+        "p50_ms": round(statistics.median(ordered) * 1000, 2),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 2),
+        "max_ms": round(ordered[-1] * 1000, 2),
+    }
+
+
+async def run(base_url: str, model: str, runs: int) -> dict:
+    provider = OllamaProvider("bench", LLMProviderSettings(base_url=base_url, model=model))
+
+    await provider.unload()
+    cold = await time_to_first_token(provider, "câu hỏi lạnh")
+
+    await provider.unload()
+    await provider.warm(ANSWER_SYSTEM_PROMPT)
+    warmed = await time_to_first_token(provider, "câu hỏi sau khi làm nóng")
+
+    warm = [await time_to_first_token(provider, f"câu hỏi số {i}") for i in range(runs)]
+    await close_http_client()
+
+    return {
+        "cold_ms": round(cold * 1000, 2),
+        "warmed_ms": round(warmed * 1000, 2),
+        "warm": summary(warm),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold vs warm TTFT")
+    parser.add_argument("--base-url", default="http://127.0.0.1:11500")
+    parser.add_argument("--model", default="stub")
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.base_url, args.model, args.runs)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
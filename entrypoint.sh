@@ -27,6 +27,12 @@ done
 
 echo "Redis started"
 
+# Multiprocess metrics: the directory must be empty when the workers start
+if [ -n "$PROMETHEUS_MULTIPROC_DIR" ]; then
+    rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+    mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+fi
+
 echo "Starting Celery in background..."
 celery -A app.celery_task.c_app worker -l info &
 CELERY_PID=$!
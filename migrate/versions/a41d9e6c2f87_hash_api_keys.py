@@ -0,0 +1,49 @@
+"""hash api keys
+
+Revision ID: a41d9e6c2f87
+Revises: 7c2e5a9f4b13
+Create Date: 2026-10-19 13:48:22.904561
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a41d9e6c2f87'
+down_revision: Union[str, Sequence[str], None] = '7c2e5a9f4b13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('api_key', sa.Column('key_hash', sqlmodel.sql.sqltypes.AutoString(length=64), nullable=True))
+    op.add_column('api_key', sa.Column('prefix', sqlmodel.sql.sqltypes.AutoString(length=16), nullable=True))
+    # Existing keys keep working: store their hash and display prefix, then drop the plaintext
+    op.execute(
+        "UPDATE api_key SET key_hash = encode(sha256(convert_to(key, 'UTF8')), 'hex'), prefix = left(key, 11)"
+    )
+    op.alter_column('api_key', 'key_hash', nullable=False)
+    op.alter_column('api_key', 'prefix', nullable=False)
+    op.drop_index(op.f('ix_api_key_key'), table_name='api_key')
+    op.create_index(op.f('ix_api_key_key_hash'), 'api_key', ['key_hash'], unique=True)
+    op.drop_column('api_key', 'key')
+    op.alter_column('api_key', 'last_user_at', new_column_name='last_used_at')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Plaintext keys cannot be recovered; the old column gets the hash, so
+    # existing keys stop working after a downgrade and must be recreated.
+    op.alter_column('api_key', 'last_used_at', new_column_name='last_user_at')
+    op.add_column('api_key', sa.Column('key', sqlmodel.sql.sqltypes.AutoString(), nullable=True))
+    op.execute("UPDATE api_key SET key = key_hash")
+    op.alter_column('api_key', 'key', nullable=False)
+    op.drop_index(op.f('ix_api_key_key_hash'), table_name='api_key')
+    op.create_index(op.f('ix_api_key_key'), 'api_key', ['key'], unique=True)
+    op.drop_column('api_key', 'prefix')
+    op.drop_column('api_key', 'key_hash')